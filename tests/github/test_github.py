@@ -1,7 +1,13 @@
 """Test the github module.
 """
+import json
+import threading
+import contextlib
 from subprocess import CalledProcessError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
 from requests.exceptions import HTTPError
+from xinstall import fetch, github, store
 from xinstall.utils import run_cmd
 
 
@@ -27,3 +33,162 @@ def test_github():
         if msg in err.stderr.decode():
             return
         raise err
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serve releases (paginated with ETags) as the GitHub API does.
+    """
+    etag = '"v1"'
+    releases = []
+    per_page = 2
+    log = []
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        pass
+
+    def _send(self, data, link: str = "") -> None:
+        etag = f'{self.etag[:-1]}{self.path}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        if link:
+            self.send_header("Link", link)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=C0103
+        self.log.append((self.path, self.headers.get("If-None-Match")))
+        path, _, query = self.path.partition("?")
+        if path.startswith("/releases/tags/"):
+            tag = path.rsplit("/", 1)[-1]
+            releases = [rel for rel in self.releases if rel["tag_name"] == tag]
+            if not releases:
+                self.send_error(404)
+                return
+            self._send(releases[0])
+            return
+        page = int(dict(kv.split("=") for kv in query.split("&")).get("page", 1))
+        first = (page - 1) * self.per_page
+        link = ""
+        if first + self.per_page < len(self.releases):
+            host = self.headers["Host"]
+            link = f'<http://{host}/releases?per_page=100&page={page + 1}>; rel="next"'
+        self._send(self.releases[first:first + self.per_page], link)
+
+
+@contextlib.contextmanager
+def _serve(**attrs):
+    handler = type("Handler", (_Handler, ), attrs)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/releases"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _releases():
+    url = "https://github.com/dclong/xinstall/releases/download"
+    return [
+        {
+            "tag_name": tag,
+            "assets": [{"name": "a.whl", "browser_download_url": f"{url}/{tag}/a.whl"}],
+        } for tag in ("nightly", "v2.0.0", "v1.2.0", "latest", "v1.1.0", "1.0.0")
+    ]
+
+
+def _use_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(store, "STORE_FILE", tmp_path / "xinstall.db")
+    monkeypatch.setattr(store, "LEGACY_FILE", tmp_path / "xinstall.json")
+    monkeypatch.setattr(store, "_CONN", None)
+    monkeypatch.setattr(fetch, "CACHE_DIR", tmp_path / "cache")
+
+
+def test_iter_releases(monkeypatch, tmp_path):
+    """Test that pages of releases are requested lazily and revalidated with ETags.
+    """
+    _use_cache(monkeypatch, tmp_path)
+    log = []
+    with _serve(releases=_releases(), log=log) as api:
+        monkeypatch.setattr(github, "_github_release_url", lambda repo: api)
+        releases = github.iter_releases("dclong/xinstall")
+        assert [next(releases)["version"] for _ in range(3)] == [None, "2.0.0", "1.2.0"]
+        assert len(log) == 2
+        assert [rel["tag_name"] for rel in github.iter_releases("dclong/xinstall")
+               ] == [rel["tag_name"] for rel in _releases()]
+        assert [etag for _, etag in log] == [
+            None,
+            None,
+            '"v1/releases?per_page=100"',
+            '"v1/releases?per_page=100&page=2"',
+            None,
+        ]
+    # the cache is used if GitHub is not available
+    assert len(list(github.iter_releases("dclong/xinstall"))) == 6
+
+
+def test_find_release(monkeypatch, tmp_path):
+    """Test finding releases by exact tags and version specifiers.
+    """
+    _use_cache(monkeypatch, tmp_path)
+    log = []
+    with _serve(releases=_releases(), log=log) as api:
+        monkeypatch.setattr(github, "_github_release_url", lambda repo: api)
+        assert github.find_release("dclong/xinstall", "1.2.0")["tag_name"] == "v1.2.0"
+        assert [path for path, _ in log] == [
+            "/releases/tags/1.2.0", "/releases/tags/v1.2.0"
+        ]
+        assert github.find_release("dclong/xinstall", "v1.0.0")["tag_name"] == "1.0.0"
+        del log[:]
+        assert github.find_release("dclong/xinstall", "<1.2")["tag_name"] == "v1.1.0"
+        assert len(log) == 3
+        assert github.find_release("dclong/xinstall")["tag_name"] == "v2.0.0"
+        with pytest.raises(LookupError):
+            github.find_release("dclong/xinstall", ">3")
+
+
+def test_manifest(monkeypatch, tmp_path):
+    """Test fetching assets of a manifest concurrently.
+    """
+    _use_cache(monkeypatch, tmp_path)
+    toml = tmp_path / "assets.toml"
+    toml.write_text(
+        """
+[[assets]]
+repo = "dclong/xinstall"
+version = "<2"
+keyword = "whl"
+output = "xinstall.whl"
+install_cmd = "pip3 install"
+
+[[assets]]
+repo = "dclong/xinstall"
+version = ">3"
+output = "none.whl"
+"""
+    )
+    manifest = github.load_manifest(toml)
+    assert manifest[0].keyword == ["whl"] and manifest[1].install_cmd == ""
+    path = tmp_path / "assets.json"
+    path.write_text(json.dumps([vars(entry) for entry in manifest]))
+    assert github.load_manifest(path) == manifest
+    downloads, cmds = [], []
+    monkeypatch.setattr(
+        github, "download", lambda url, path, checksum: downloads.append(url)
+    )
+    monkeypatch.setattr(github, "run_cmd", cmds.append)
+    with _serve(releases=_releases()) as api:
+        monkeypatch.setattr(github, "_github_release_url", lambda repo: api)
+        results = github.github_manifest(manifest, jobs=2)
+    assert [res.status.split()[0] for res in results] == ["ok", "failed"]
+    assert downloads == [
+        "https://github.com/dclong/xinstall/releases/download/v1.2.0/a.whl"
+    ]
+    assert cmds == ["pip3 install xinstall.whl"]
@@ -0,0 +1,58 @@
+"""Test the bench module.
+"""
+import os
+import json
+import subprocess as sp
+from pathlib import Path
+import pytest
+from xinstall import bench
+
+
+def test_import_times():
+    """Test parsing the output of `python -X importtime`.
+    """
+    stderr = """import time: self [us] | cumulative | imported package
+import time:       300 |        300 |   xinstall.utils
+import time:       200 |        500 | xinstall.main
+import time:       100 |       1000 | xinstall.dev
+"""
+    assert bench._import_times(stderr) == {"xinstall.main": 500, "xinstall.dev": 1000}
+
+
+def test_measure(monkeypatch):
+    """Test that wall times are measured on runs without `-X importtime`.
+    """
+    cmds = []
+
+    def run(cmd, **kwargs):  # pylint: disable=W0613
+        cmds.append(cmd)
+        stderr = "import time:       100 |        100 | xinstall.main\n"
+        return sp.CompletedProcess(cmd, 0, stderr=stderr)
+
+    monkeypatch.setattr(bench.sp, "run", run)
+    res = bench.measure(["version"], repeat=3)
+    assert res["imports"] == {"xinstall.main": 100}
+    assert ["-X" in cmd for cmd in cmds] == [False, False, False, True]
+
+
+def test_compare():
+    """Test detecting regressions.
+    """
+    baseline = {"version": {"wall": 0.1}, "git -h": {"wall": 0.2}}
+    results = {
+        "version": {"wall": 0.11},
+        "git -h": {"wall": 0.4},
+        "spark -h": {"wall": 0.5},
+    }
+    assert bench.compare(results, baseline) == [("git -h", 0.2, 0.4)]
+
+
+def test_startup():
+    """Test the startup time of xinstall sub commands against the baseline.
+    """
+    baseline = Path(os.environ.get("XINSTALL_BENCH_BASELINE", bench.BASELINE))
+    if not baseline.is_file():
+        pytest.skip(f"The baseline {baseline} does not exist.")
+    results = bench.bench_startup(repeat=3)
+    regressions = bench.compare(results, json.loads(baseline.read_text()))
+    assert not regressions
@@ -0,0 +1,166 @@
+"""Test coalescing package requests of sub commands run concurrently.
+"""
+import time
+import threading
+import subprocess as sp
+from xinstall import utils, scheduler, coalesce
+from xinstall.main import parse_args
+
+
+def _record(monkeypatch):
+    """Record shell commands instead of running them.
+    """
+    cmds = []
+
+    def run(cmd, **kwargs):  # pylint: disable=W0613
+        cmds.append(" ".join(cmd.split()))
+        return sp.CompletedProcess(cmd, 0)
+
+    monkeypatch.setattr(utils.sp, "run", run)
+    monkeypatch.setattr(utils, "update_apt_source", lambda **kwargs: None)
+    monkeypatch.setattr(utils, "installed_packages", lambda manager: frozenset())
+    return cmds
+
+
+def _run(monkeypatch, argvs):
+    """Run sub commands concurrently (as Ubuntu) and return shell commands they issue.
+    """
+    cmds = _record(monkeypatch)
+    monkeypatch.setattr(utils, "distro_id", lambda: "ubuntu")
+    targets = [parse_args(["--prefix", "", "-y"] + argv) for argv in argvs]
+    scheduler.run_targets(targets, jobs=len(targets))
+    return cmds
+
+
+def test_apt_install(monkeypatch):
+    """Test that apt packages of a multi-target run are installed in one transaction.
+    """
+    cmds = _run(
+        monkeypatch,
+        [
+            ["vim", "-i"], ["nodejs", "-i"], ["coreutils", "-i"],
+            ["download_tools", "-i"]
+        ],
+    )
+    assert len(cmds) == 1
+    assert cmds[0].startswith("apt-get install --yes ")
+    assert set(cmds[0].split()[3:]) == {
+        "vim", "vim-nox", "nodejs", "npm", "coreutils", "wget", "curl", "aria2"
+    }
+
+
+def test_apt_purge(monkeypatch):
+    """Test that apt packages of a multi-target run are purged in one transaction
+    which is separated from installation.
+    """
+    cmds = _run(monkeypatch, [["vim", "-u"], ["ssh_server", "-u"], ["coreutils", "-i"]])
+    assert sorted(cmd.split()[1] for cmd in cmds) == ["install", "purge"]
+    purge = next(cmd for cmd in cmds if cmd.split()[1] == "purge")
+    assert set(purge.split()[3:]) == {"vim", "vim-nox", "openssh-server", "fail2ban"}
+
+
+def test_apt_install_single(monkeypatch):
+    """Test that a request outside a concurrent run is flushed immediately.
+    """
+    cmds = _record(monkeypatch)
+    utils.apt_install(["vim"], prefix="sudo")
+    utils.apt_purge("vim vim-nox", prefix="sudo", yes="")
+    assert cmds == ["sudo apt-get install --yes vim", "sudo apt-get purge vim vim-nox"]
+
+
+def test_pip_install(monkeypatch):
+    """Test that requirements of a multi-target run are installed by one pip invocation
+    per pip command (interpreter, --user and pip options).
+    """
+    cmds = _run(
+        monkeypatch,
+        [
+            ["yapf", "-i"],
+            ["pylint", "-i"],
+            ["dask", "-i"],
+            ["autogluon", "-i", "--cuda", "10.1"],
+            ["flake8", "-i", "--user"],
+        ],
+    )
+    assert len(cmds) == 2
+    user = next(cmd for cmd in cmds if "--user" in cmd)
+    assert user.split()[-1] == "flake8"
+    cmd = next(cmd for cmd in cmds if "--user" not in cmd)
+    assert set(cmd.split()[2:]) == {
+        "yapf", "pylint", "'dask[complete]'", "'mxnet-cu101<2.0.0'", "autogluon"
+    }
+
+
+def test_flush_delay(monkeypatch):
+    """Test that a request is flushed after FLUSH_DELAY while another worker is busy.
+    """
+    monkeypatch.setattr(coalesce, "FLUSH_DELAY", 0.1)
+    coalescer = coalesce.Coalescer()
+    coalescer.register(2)
+    flushed = []
+    busy = threading.Event()
+
+    def _busy():
+        with coalescer.worker():
+            busy.wait(5)
+
+    thread = threading.Thread(target=_busy)
+    thread.start()
+    start = time.perf_counter()
+    with coalescer.worker():
+        coalescer.request("apt", ["vim"], flushed.append)
+    elapsed = time.perf_counter() - start
+    busy.set()
+    thread.join()
+    assert flushed == [["vim"]]
+    assert elapsed < 2
+
+
+def test_errors(monkeypatch):
+    """Test that errors of flushing are raised to workers of the failed requests only.
+    """
+    monkeypatch.setattr(coalesce, "FLUSH_DELAY", 0.1)
+    coalescer = coalesce.Coalescer()
+    coalescer.register(2)
+    errors = []
+
+    def _fail(items):
+        raise RuntimeError(items)
+
+    def _request(items, flush):
+        with coalescer.worker():
+            try:
+                coalescer.request("apt", items, flush)
+            except RuntimeError as err:
+                errors.append(err.args[0])
+
+    thread = threading.Thread(target=_request, args=(["vim"], _fail))
+    thread.start()
+    thread.join()
+    _request(["git"], lambda items: None)
+    assert errors == [["vim"]]
+
+
+def test_flush_unlocked(monkeypatch):
+    """Test that other workers can request while requests are being flushed.
+    """
+    monkeypatch.setattr(coalesce, "FLUSH_DELAY", 0.1)
+    coalescer = coalesce.Coalescer()
+    coalescer.register(2)
+    flushed = threading.Event()
+    waited = []
+
+    def _slow(items):  # pylint: disable=W0613
+        # wait for the request of the other worker (blocked if flushed with the lock)
+        waited.append(flushed.wait(2))
+
+    def _request(key, flush):
+        with coalescer.worker():
+            coalescer.request(key, ["a"], flush)
+
+    thread = threading.Thread(target=_request, args=("apt", _slow))
+    thread.start()
+    time.sleep(0.3)
+    _request("pip", lambda items: flushed.set())
+    thread.join()
+    assert waited == [True]
@@ -0,0 +1,398 @@
+"""Test downloading files from (local) mirrors.
+"""
+import io
+import os
+import json
+import time
+import stat
+import hashlib
+import tarfile
+import tempfile
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from xinstall import extract, fetch, store, utils
+
+DATA = os.urandom(1024 * 1024)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serve DATA at any path (with support of ranges) after a delay.
+    Responses to GET requests are truncated to the lengths in truncate (in order).
+    """
+    delay = 0.0
+    data = DATA
+    ranges = True
+    etag = ""
+    truncate = ()
+    log = None
+    if_ranges = None
+    files = {}
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        pass
+
+    def _send(self, body: bool) -> None:
+        time.sleep(self.delay)
+        data = self.files.get(self.path, self.data)
+        rng = self.headers.get("Range")
+        if self.log is not None:
+            self.log.append((self.command, rng))
+        if_range = self.headers.get("If-Range")
+        if if_range and self.if_ranges is not None:
+            self.if_ranges.append(if_range)
+        if rng and self.ranges and if_range in (None, self.etag):
+            first, last = rng.split("=")[1].split("-")
+            first = int(first)
+            last = int(last) if last else len(data) - 1
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {first}-{last}/{len(data)}")
+            data = data[first:last + 1]
+        else:
+            self.send_response(200)
+        if self.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if body:
+            truncate = self.truncate.pop(0) if self.truncate else None
+            self.wfile.write(data[:truncate])
+
+    def do_HEAD(self):  # pylint: disable=C0103
+        self._send(body=False)
+
+    def do_GET(self):  # pylint: disable=C0103
+        self._send(body=True)
+
+
+@contextlib.contextmanager
+def _serve(**attrs):
+    """Run a local HTTP server (e.g., with injected latency).
+    """
+    handler = type("Handler", (_Handler, ), attrs)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _use_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(store, "STORE_FILE", tmp_path / "xinstall.db")
+    monkeypatch.setattr(store, "LEGACY_FILE", tmp_path / "xinstall.json")
+    monkeypatch.setattr(store, "_CONN", None)
+    monkeypatch.setattr(fetch, "CACHE_DIR", tmp_path / "cache")
+
+
+def test_rank_mirrors(monkeypatch, tmp_path):
+    """Test that mirrors are ranked by throughput and the ranking is cached.
+    """
+    _use_store(monkeypatch, tmp_path)
+    with _serve(delay=0.3) as slow, _serve(delay=0.0) as fast, _serve(delay=0.1) as mid:
+        down = "http://127.0.0.1:9"
+        urls = [f"{slow}/a.tgz", f"{down}/a.tgz", f"{fast}/a.tgz", f"{mid}/a.tgz"]
+        start = time.perf_counter()
+        assert fetch.rank_mirrors(urls) == [urls[2], urls[3], urls[0], urls[1]]
+        assert time.perf_counter() - start < 1.5
+    probes = []
+    monkeypatch.setattr(fetch, "probe", lambda url, timeout: probes.append(url))
+    assert fetch.rank_mirrors(urls) == [urls[2], urls[3], urls[0], urls[1]]
+    assert not probes
+
+
+def test_download_segments(monkeypatch, tmp_path):
+    """Test downloading a file in segments from multiple mirrors.
+    """
+    _use_store(monkeypatch, tmp_path)
+    log1, log2 = [], []
+    with _serve(log=log1) as url1, _serve(log=log2) as url2:
+        path = tmp_path / "a.tgz"
+        fetch.download(
+            [f"{url1}/a.tgz", f"{url2}/a.tgz"], path, segments=4, min_segment_size=1024
+        )
+        assert path.read_bytes() == DATA
+    ranges = [rng for method, rng in log1 + log2 if method == "GET" and rng]
+    # 2 probing requests and 4 segments
+    assert len(ranges) == 6
+    assert len([rng for _, rng in log1 if rng]) >= 2
+    assert len([rng for _, rng in log2 if rng]) >= 2
+
+
+def test_download_failover(monkeypatch, tmp_path):
+    """Test that segments failing on a mirror are continued on another one.
+    """
+    _use_store(monkeypatch, tmp_path)
+    with _serve(truncate=[1000] * 10) as url1, _serve() as url2:
+        path = tmp_path / "a.tgz"
+        fetch.download(
+            [f"{url1}/a.tgz", f"{url2}/a.tgz"], path, segments=4, min_segment_size=1024
+        )
+        assert path.read_bytes() == DATA
+
+
+def test_download_resume(monkeypatch, tmp_path):
+    """Test that a partial download is resumed if the file is unchanged.
+    """
+    _use_store(monkeypatch, tmp_path)
+    path = tmp_path / "a.tgz"
+    log, if_ranges = [], []
+    with _serve(etag='"v1"', truncate=[1000] * 8, log=log, if_ranges=if_ranges) as url:
+        with pytest.raises(OSError):
+            fetch.download(f"{url}/a.tgz", path, segments=4, min_segment_size=1024)
+        states = list((tmp_path / "cache" / "tmp").glob("*.json"))
+        assert len(states) == 1
+        state = json.loads(states[0].read_text())
+        assert [seg[2] - seg[0] for seg in state["segments"]] == [2000] * 4
+        del log[:], if_ranges[:]
+        fetch.download(f"{url}/a.tgz", path, segments=4, min_segment_size=1024)
+        assert path.read_bytes() == DATA
+    size = len(DATA) // 4
+    assert sorted(rng for method, rng in log if method == "GET") == [
+        f"bytes={idx * size + 2000}-{(idx + 1) * size - 1}" for idx in range(4)
+    ]
+    assert if_ranges == ['"v1"'] * 4
+    assert not list((tmp_path / "cache" / "tmp").iterdir())
+
+
+def test_download_concurrently(monkeypatch, tmp_path):
+    """Test that concurrent downloads of the same file (each holding its own flock
+    like separate processes) do not write the partial file at the same time.
+    """
+    _use_store(monkeypatch, tmp_path)
+    fetch_ = fetch._fetch
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def _fetch(*args):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        try:
+            time.sleep(0.1)
+            return fetch_(*args)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    monkeypatch.setattr(fetch, "_fetch", _fetch)
+    for idx in range(4):
+        (tmp_path / str(idx)).mkdir()
+    with _serve(etag='"v1"') as url:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(
+                executor.map(
+                    lambda idx: fetch.download(
+                        f"{url}/a.tgz",
+                        tmp_path / str(idx) / "a.tgz",
+                        min_segment_size=1024
+                    ), range(4)
+                )
+            )
+    assert peak[0] == 1
+    assert all((tmp_path / str(idx) / "a.tgz").read_bytes() == DATA for idx in range(4))
+    assert not list((tmp_path / "cache" / "tmp").iterdir())
+
+
+def test_download_changed(monkeypatch, tmp_path):
+    """Test that a partial download is restarted if the file has changed.
+    """
+    _use_store(monkeypatch, tmp_path)
+    path = tmp_path / "a.tgz"
+    data = os.urandom(len(DATA))
+    log = []
+    monkeypatch.setattr(_Handler, "etag", '"v1"')
+    with _serve(truncate=[1000] * 8, log=log) as url:
+        with pytest.raises(OSError):
+            fetch.download(f"{url}/a.tgz", path, segments=4, min_segment_size=1024)
+        monkeypatch.setattr(_Handler, "etag", '"v2"')
+        monkeypatch.setattr(_Handler, "data", data)
+        del log[:]
+        fetch.download(f"{url}/a.tgz", path, segments=4, min_segment_size=1024)
+        assert path.read_bytes() == data
+    size = len(DATA) // 4
+    assert sorted(rng for method, rng in log if method == "GET") == [
+        f"bytes={idx * size}-{(idx + 1) * size - 1}" for idx in range(4)
+    ]
+
+
+def test_download_stream(monkeypatch, tmp_path):
+    """Test downloading a file in a single stream if ranges are not supported.
+    """
+    _use_store(monkeypatch, tmp_path)
+    log = []
+    with _serve(ranges=False, log=log) as url:
+        path = tmp_path / "a.tgz"
+        fetch.download(f"{url}/a.tgz", path, min_segment_size=1024)
+        assert path.read_bytes() == DATA
+    assert log == [("HEAD", None), ("GET", None)]
+
+
+def test_cache(monkeypatch, tmp_path):
+    """Test that downloaded files are verified and cached
+    and that files cached by URLs are used (without checksums) only if revalidated.
+    """
+    _use_store(monkeypatch, tmp_path)
+    monkeypatch.setattr(_Handler, "etag", '"v1"')
+    sha512 = hashlib.sha512(DATA).hexdigest()
+    log = []
+    files = {"/a.tgz.sha512": f"a.tgz: {sha512.upper()}\n".encode()}
+    with _serve(log=log, files=files) as url:
+        path = tmp_path / "a.tgz"
+        fetch.download(f"{url}/a.tgz", path, checksum=f"{url}/a.tgz.sha512")
+        assert path.read_bytes() == DATA
+        path.unlink()
+        # hit by the checksum from another mirror
+        count = len(log)
+        fetch.download(f"{url}/b.tgz", path, checksum=f"sha512:{sha512}")
+        assert path.read_bytes() == DATA
+        assert len(log) == count
+        # hit by the URL (revalidated by a HEAD request)
+        fetch.download(f"{url}/a.tgz", path)
+        assert [cmd for cmd, _ in log[count:]] == ["HEAD"]
+        # the file has changed
+        count = len(log)
+        monkeypatch.setattr(_Handler, "etag", '"v2"')
+        fetch.download(f"{url}/a.tgz", path)
+        assert "GET" in [cmd for cmd, _ in log[count:]]
+        # no validator
+        count = len(log)
+        monkeypatch.setattr(_Handler, "etag", "")
+        fetch.download(f"{url}/a.tgz", path)
+        assert "GET" in [cmd for cmd, _ in log[count:]]
+        with pytest.raises(ValueError):
+            fetch.download(f"{url}/c.tgz", path, checksum="sha256:00")
+    cache = fetch.Cache()
+    assert cache.stats() == {"hits": 2, "misses": 4, "files": 1, "size": len(DATA)}
+    cache.close()
+
+
+def test_cache_evict(tmp_path):
+    """Test that the least recently used files are evicted.
+    """
+    cache = fetch.Cache(tmp_path, max_size=350)
+
+    def _add(idx):
+        file = tmp_path / "tmp" / str(idx)
+        file.write_bytes(bytes(100))
+        cache.add(file, f"{idx:064d}", [f"url:{idx}"])
+        time.sleep(0.01)
+
+    for idx in range(3):
+        _add(idx)
+    cache.lookup(["url:0"])
+    _add(3)
+    assert [cache.lookup([f"url:{idx}"]) is not None for idx in range(4)] == [
+        True, False, True, True
+    ]
+    cache.close()
+
+
+def _tarball(mode: str, *members) -> bytes:
+    """Create a tarball with members (name, data, mode) or (name, link target).
+    """
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as tar:
+        for name, *attrs in members:
+            info = tarfile.TarInfo(name)
+            if isinstance(attrs[0], bytes):
+                info.size, info.mode = len(attrs[0]), attrs[1]
+                tar.addfile(info, io.BytesIO(attrs[0]))
+            else:
+                info.type, info.linkname = tarfile.SYMTYPE, attrs[0]
+                tar.addfile(info)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("mode", ["w:gz", "w:xz"])
+def test_extract(monkeypatch, tmp_path, mode):
+    """Test extracting a tarball while downloading it.
+    """
+    _use_store(monkeypatch, tmp_path)
+    data = _tarball(
+        mode,
+        ("pkg/bin/run", b"#!/bin/sh\n", 0o755),
+        ("pkg/DATA", DATA, 0o644),
+        ("pkg/bin/data", "../DATA"),
+    )
+    sha512 = hashlib.sha512(data).hexdigest()
+    dest = tmp_path / "opt"
+    with _serve(files={"/pkg.tgz": data}) as url:
+        extract.extract(f"{url}/pkg.tgz", dest, checksum=f"sha512:{sha512}")
+    assert os.listdir(dest) == ["pkg"]
+    assert stat.S_IMODE((dest / "pkg/bin/run").stat().st_mode) == 0o755
+    assert (dest / "pkg/bin/data").read_bytes() == DATA
+    assert not list((tmp_path / "cache").glob("tmp/*"))
+
+
+def test_extract_cache(monkeypatch, tmp_path):
+    """Test that an extracted tarball is cached and extracted from the cache next time.
+    """
+    _use_store(monkeypatch, tmp_path)
+    data = _tarball("w:gz", ("pkg/a", b"a", 0o644))
+    sha256 = hashlib.sha256(data).hexdigest()
+    log = []
+    with _serve(log=log, files={"/pkg.tgz": data}) as url:
+        for idx in range(2):
+            dest = tmp_path / f"opt{idx}"
+            extract.extract(f"{url}/pkg.tgz", dest, checksum=f"sha256:{sha256}")
+            assert (dest / "pkg/a").read_bytes() == b"a"
+    assert [cmd for cmd, _ in log] == ["GET"]
+    cache = fetch.Cache()
+    assert cache.stats() == {"hits": 1, "misses": 1, "files": 1, "size": len(data)}
+    cache.close()
+    assert not list((tmp_path / "cache").glob("tmp/*"))
+
+
+def test_download_extract_prefix(monkeypatch, tmp_path):
+    """Test extracting a tarball into a private temporary directory
+    and copying it into the destination using a prefix command.
+    """
+    _use_store(monkeypatch, tmp_path)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "tmp"))
+    (tmp_path / "tmp").mkdir()
+    data = _tarball("w:gz", ("pkg/bin/run", b"#!/bin/sh\n", 0o755))
+    dest = tmp_path / "opt"
+    with _serve(files={"/pkg.tgz": data}) as url:
+        utils.download_extract(f"{url}/pkg.tgz", dest, prefix="env")
+    assert (dest / "pkg/bin/run").read_bytes() == b"#!/bin/sh\n"
+    assert os.access(dest / "pkg/bin/run", os.X_OK)
+    assert not os.listdir(tmp_path / "tmp")
+
+
+@pytest.mark.parametrize(
+    "members", [
+        [("pkg/../../evil", b"", 0o644)],
+        [("/tmp/evil", b"", 0o644)],
+        [("pkg/link", "../../evil")],
+    ]
+)
+def test_extract_traversal(monkeypatch, tmp_path, members):
+    """Test that members escaping the destination are rejected.
+    """
+    _use_store(monkeypatch, tmp_path)
+    data = _tarball("w:gz", ("pkg/a", b"a", 0o644), *members)
+    dest = tmp_path / "opt"
+    with _serve(files={"/pkg.tgz": data}) as url:
+        with pytest.raises(ValueError):
+            extract.extract(f"{url}/pkg.tgz", dest)
+    assert not os.listdir(dest)
+    assert not (tmp_path / "evil").exists()
+
+
+def test_extract_checksum(monkeypatch, tmp_path):
+    """Test that nothing is installed if the checksum does not match.
+    """
+    _use_store(monkeypatch, tmp_path)
+    data = _tarball("w:gz", ("pkg/a", b"a", 0o644))
+    dest = tmp_path / "opt"
+    with _serve(files={"/pkg.tgz": data}) as url:
+        with pytest.raises(ValueError):
+            extract.extract(f"{url}/pkg.tgz", dest, checksum="sha256:00")
+    assert not os.listdir(dest)
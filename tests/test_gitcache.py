@@ -0,0 +1,77 @@
+"""Test the cache of git mirrors.
+"""
+import shutil
+import subprocess as sp
+from xinstall import fetch, gitcache, ledger
+
+
+def _git(cmd: str, cwd) -> str:
+    return sp.run(
+        f"git {cmd}", shell=True, cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def _commit(repo, name: str) -> str:
+    (repo / name).write_text(name)
+    _git(f"add {name}", repo)
+    _git(f"-c user.name=x -c user.email=x@x commit -q -m {name}", repo)
+    return _git("rev-parse HEAD", repo)
+
+
+def test_clone(monkeypatch, tmp_path):
+    """Test that checkouts borrow objects of an incrementally fetched mirror.
+    """
+    monkeypatch.setattr(fetch, "CACHE_DIR", tmp_path / "cache")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git("init -q", repo)
+    _commit(repo, "a")
+    url = repo.as_uri()
+    gitcache.clone(url, tmp_path / "co1")
+    mirror = gitcache.mirror_path(url)
+    assert (mirror / "HEAD").is_file()
+    alternates = tmp_path / "co1/.git/objects/info/alternates"
+    assert alternates.read_text().strip() == str(mirror / "objects")
+    head = _commit(repo, "b")
+    gitcache.clone(url, tmp_path / "co2", depth=1, dissociate=True)
+    assert _git("rev-parse HEAD", tmp_path / "co2") == head
+    assert _git("rev-parse HEAD", mirror) == head
+    assert not (tmp_path / "co2/.git/objects/info/alternates").exists()
+    assert (tmp_path / "co2/.git/shallow").is_file()
+
+
+def test_partial(monkeypatch, tmp_path):
+    """Test partial mirrors and checkouts.
+    """
+    monkeypatch.setattr(fetch, "CACHE_DIR", tmp_path / "cache")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git("init -q", repo)
+    _git("config uploadpack.allowFilter true", repo)
+    _commit(repo, "a")
+    url = repo.as_uri()
+    gitcache.clone(url, tmp_path / "co", filter_="blob:none")
+    assert (tmp_path / "co/a").read_text() == "a"
+    mirror = gitcache.mirror_path(url, "blob:none")
+    assert mirror != gitcache.mirror_path(url)
+    assert _git("config remote.origin.partialclonefilter", mirror) == "blob:none"
+
+
+def test_ledger(monkeypatch, tmp_path):
+    """Test that removed checkouts are cloned again and mirrors are fetched again
+    when steps are recorded in the ledger.
+    """
+    monkeypatch.setattr(fetch, "CACHE_DIR", tmp_path / "cache")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git("init -q", repo)
+    _commit(repo, "a")
+    url = repo.as_uri()
+    dest = tmp_path / "co"
+    with ledger.recording(tmp_path / "ledger.db"):
+        gitcache.clone(url, dest, depth=1, dissociate=True)
+        shutil.rmtree(dest)
+        head = _commit(repo, "b")
+        gitcache.clone(url, dest, depth=1, dissociate=True)
+    assert _git("rev-parse HEAD", dest) == head
+    assert _git("rev-parse HEAD", gitcache.mirror_path(url)) == head
@@ -0,0 +1,85 @@
+"""Test the shared HTTP client.
+"""
+import threading
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xinstall import http_client, store
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Respond 503 to the first `failures` requests and then 200 (keeping alive).
+    """
+    protocol_version = "HTTP/1.1"
+    failures = 0
+    log = None
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        pass
+
+    def do_GET(self):  # pylint: disable=C0103
+        self.log.append(self.client_address[1])
+        failed = len(self.log) <= self.failures
+        body = b"" if failed else b"ok"
+        self.send_response(503 if failed else 200)
+        if failed:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@contextlib.contextmanager
+def _serve(**attrs):
+    handler = type("Handler", (_Handler, ), attrs)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _use_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(store, "STORE_FILE", tmp_path / "xinstall.db")
+    monkeypatch.setattr(store, "LEGACY_FILE", tmp_path / "xinstall.json")
+    monkeypatch.setattr(store, "_CONN", None)
+    monkeypatch.setattr(http_client, "_SESSION", None)
+
+
+def test_retry(monkeypatch, tmp_path):
+    """Test that requests failing with retryable statuses are retried.
+    """
+    _use_store(monkeypatch, tmp_path)
+    log = []
+    with _serve(failures=2, log=log) as url:
+        resp = http_client.get(f"{url}/a", backoff=0)
+        assert resp.status_code == 200 and resp.text == "ok"
+        assert http_client.timings()[-1].attempts == 3
+        resp = http_client.get(f"{url}/b", retries=0)
+        assert resp.status_code == 200
+    assert len(log) == 4
+
+
+def test_keep_alive(monkeypatch, tmp_path):
+    """Test that connections to a host are reused.
+    """
+    _use_store(monkeypatch, tmp_path)
+    log = []
+    with _serve(log=log) as url:
+        for idx in range(5):
+            assert http_client.get(f"{url}/{idx}").text == "ok"
+    assert len(log) == 5
+    assert len(set(log)) == 1
+
+
+def test_settings(monkeypatch, tmp_path):
+    """Test that retries are configured via settings.
+    """
+    _use_store(monkeypatch, tmp_path)
+    store.put("http_retries", 0)
+    log = []
+    with _serve(failures=1, log=log) as url:
+        assert http_client.get(f"{url}/a").status_code == 503
+    assert len(log) == 1
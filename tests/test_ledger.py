@@ -0,0 +1,141 @@
+"""Test skipping steps completed per the ledger.
+"""
+import os
+import sys
+import shutil
+import logging
+import subprocess as sp
+from argparse import Namespace
+from xinstall import ledger, scheduler, utils
+
+
+def _record(monkeypatch):
+    cmds = []
+
+    def run(cmd, **kwargs):  # pylint: disable=W0613
+        cmds.append(cmd)
+        return sp.CompletedProcess(cmd, 0)
+
+    monkeypatch.setattr(utils.sp, "run", run)
+    return cmds
+
+
+def _handler(args):
+    if args.install:
+        utils.copy_file(args.src, args.dst)
+    if args.uninstall:
+        utils.run_cmd("uninstall dummy")
+
+
+def _run(src, dst, **phases):
+    args = Namespace(
+        sub_cmd="dummy",
+        func=_handler,
+        install=False,
+        uninstall=False,
+        src=src,
+        dst=dst
+    )
+    for phase, val in phases.items():
+        setattr(args, phase, val)
+    scheduler.run_targets([args])
+
+
+def test_run_cmd(monkeypatch, tmp_path):
+    """Test that commands (whose effects cannot be checked) are never skipped.
+    """
+    cmds = _record(monkeypatch)
+    with ledger.recording(tmp_path / "ledger.db"):
+        utils.run_cmd("ls")
+        utils.run_cmd("ls")
+        utils.run_cmd("ls", capture_output=True)
+    assert cmds == ["ls", "ls", "ls"]
+
+
+def test_copy_file(tmp_path):
+    """Test that a copy is rerun if its source or target changes.
+    """
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.write_text("a")
+    with ledger.recording(tmp_path / "ledger.db") as ledger_:
+        utils.copy_file(src, dst)
+        fp = ledger.fingerprint("copy_file", {"srcfile": str(src), "dstfile": str(dst)})
+        assert ledger_.is_done("", fp, str(dst))
+        dst.write_text("changed")
+        assert not ledger_.is_done("", fp, str(dst))
+        utils.copy_file(src, dst)
+        assert dst.read_text() == "a"
+        src.write_text("b")
+        utils.copy_file(src, dst)
+        assert dst.read_text() == "b"
+
+
+def test_copy_file_removed(tmp_path):
+    """Test that a copy is rerun if its target is removed outside of xinstall.
+    """
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.write_text("a")
+    with ledger.recording(tmp_path / "ledger.db"):
+        utils.copy_file(src, dst)
+        dst.unlink()
+        utils.copy_file(src, dst)
+    assert dst.read_text() == "a"
+
+
+def test_phases(monkeypatch, tmp_path):
+    """Test that uninstalling a sub command forgets its installation steps.
+    """
+    cmds = _record(monkeypatch)
+    copies = []
+
+    def copy2(src, dst):
+        copies.append(dst)
+        shutil.copyfile(src, dst)
+
+    monkeypatch.setattr(utils.shutil, "copy2", copy2)
+    src = tmp_path / "src"
+    dst = tmp_path / "dst"
+    src.write_text("a")
+    with ledger.recording(tmp_path / "ledger.db"):
+        _run(src, dst, install=True)
+        _run(src, dst, install=True)
+        assert len(copies) == 1
+        _run(src, dst, uninstall=True)
+        _run(src, dst, install=True)
+    assert len(copies) == 2
+    assert cmds == ["uninstall dummy"]
+    with ledger.recording(tmp_path / "ledger.db", force=True):
+        _run(src, dst, install=True)
+    assert len(copies) == 3
+
+
+def test_lazy(tmp_path):
+    """Test that the database is created on the first recorded step only.
+    """
+    path = tmp_path / "ledger.db"
+    with ledger.recording(path):
+        utils.run_cmd("true")
+    assert not path.exists()
+    src = tmp_path / "src"
+    src.write_text("a")
+    with ledger.recording(path):
+        utils.copy_file(src, tmp_path / "dst")
+    assert path.is_file()
+
+
+def test_unwritable(tmp_path, caplog):
+    """Test that steps are run without being recorded if the database fails to open.
+    """
+    src = tmp_path / "src"
+    src.write_text("a")
+    with caplog.at_level(logging.WARNING):
+        with ledger.recording(tmp_path / "missing" / "ledger.db"):
+            utils.copy_file(src, tmp_path / "dst")
+            utils.copy_file(src, tmp_path / "dst")
+    assert (tmp_path / "dst").read_text() == "a"
+    assert "not recorded" in caplog.text
+    env = dict(os.environ, HOME=str(tmp_path / "missing"))
+    sp.run([sys.executable, "-m", "xinstall", "version"], env=env, check=True)
+    assert not (tmp_path / "missing").exists()
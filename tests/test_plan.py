@@ -0,0 +1,110 @@
+"""Test compiling sub commands into plans and replaying them.
+"""
+import subprocess as sp
+import tempfile
+from pathlib import Path
+from argparse import Namespace
+import pytest
+from xinstall import main, plan, registry, scheduler, utils
+
+# sub commands which do not install or configure anything
+_UNPLANNED = {"bench", "serve", "run", "replay", "cache"}
+
+
+def _handler(args):
+    if args.install:
+        utils.apt_install(["vim"], prefix="sudo")
+        utils.pip_install(["yapf"], "python3 -m pip install")
+    if args.config:
+        utils.run_cmd("echo configured")
+
+
+def _writer(args):
+    if args.install:
+        Path(args.path).write_text("")
+
+
+def _compile(func, **kwargs):
+    args = Namespace(sub_cmd="dummy", func=func, install=True, config=True, **kwargs)
+    with plan.planning() as steps:
+        scheduler.run_targets([args])
+    return steps
+
+
+def test_planning():
+    """Test that primitives emit steps tagged with sub commands and phases.
+    """
+    steps = _compile(_handler)
+    assert [(step.kind, step.func, step.sub_cmd, step.phase) for step in steps] == [
+        ("package", "apt_install", "dummy", "install"),
+        ("pip", "pip_install", "dummy", "install"),
+        ("shell", "run_cmd", "dummy", "config"),
+    ]
+    assert steps[0].params == {"pkgs": ["vim"], "prefix": "sudo", "yes": "--yes"}
+    assert str(steps[2]) == "[dummy:config] shell: echo configured"
+    assert not plan.is_planning()
+
+
+def test_side_effect(tmp_path):
+    """Test that side effects not expressed as steps abort planning.
+    """
+    path = tmp_path / "file"
+    with pytest.raises(plan.SideEffectError):
+        _compile(_writer, path=str(path))
+    assert not path.exists()
+
+
+def test_replay(monkeypatch, tmp_path):
+    """Test that a saved plan is replayed without evaluating handlers.
+    """
+    steps = _compile(_handler)
+    path = tmp_path / "plan.json"
+    plan.dump(steps, str(path))
+    loaded = plan.load(str(path))
+    assert loaded["steps"] == steps
+    cmds = []
+
+    def run(cmd, **kwargs):  # pylint: disable=W0613
+        cmds.append(" ".join(cmd.split()))
+        return sp.CompletedProcess(cmd, 0)
+
+    monkeypatch.setattr(utils.sp, "run", run)
+    monkeypatch.setattr(utils, "update_apt_source", lambda **kwargs: None)
+    monkeypatch.setattr(utils, "installed_packages", lambda manager: frozenset())
+    plan.replay(Namespace(plan=str(path), ignore_platform=False))
+    assert cmds == [
+        "sudo apt-get install --yes vim",
+        "python3 -m pip install yapf",
+        "echo configured",
+    ]
+
+
+@pytest.fixture(scope="module")
+def parser():
+    """A parser of all sub commands.
+    Modules are imported and the OS is detected beforehand (as in --dry-run).
+    """
+    parser_ = main.create_parser(None)
+    utils.distro_id()
+    tempfile.gettempdir()
+    return parser_
+
+
+@pytest.mark.parametrize("flags", ["-ic", "-u"])
+@pytest.mark.parametrize(
+    "name", [name for name, *_ in registry.MANIFEST if name not in _UNPLANNED]
+)
+def test_plan_manifest(parser, name, flags):  # pylint: disable=W0621
+    """Test that side effects of every sub command are expressed as steps.
+    Sub commands requiring extra options, network access
+    or a different platform are skipped.
+    """
+    try:
+        args = main.parse_args(["-y", name, flags], parser=parser)
+    except SystemExit:
+        pytest.skip(f"{name} requires extra options")
+    try:
+        with plan.planning():
+            scheduler.run_targets([args])
+    except (OSError, ValueError, SystemExit) as err:
+        pytest.skip(f"{name} {flags} cannot be planned on this host: {err}")
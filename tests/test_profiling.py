@@ -0,0 +1,37 @@
+"""Test the profiling module.
+"""
+import sys
+import json
+from argparse import Namespace
+from xinstall import profiling, scheduler
+from xinstall.utils import run_cmd
+
+
+def _handler(args):
+    if args.install:
+        run_cmd([sys.executable, "-c", "sum(range(10 ** 7))"])
+    if args.config:
+        proc = run_cmd("echo configured", capture_output=True)
+        assert proc.stdout == b"configured\n"
+
+
+def test_profile(monkeypatch, tmp_path):
+    """Test that commands are profiled and tagged with sub commands and phases.
+    """
+    monkeypatch.setattr(profiling, "_RECORDS", [])
+    monkeypatch.setattr(profiling, "_ENABLED", False)
+    profiling.enable()
+    args = Namespace(sub_cmd="dummy", func=_handler, install=True, config=True)
+    scheduler.run_targets([args])
+    records = profiling.records()
+    assert [(rec.sub_cmd, rec.phase) for rec in records] == [
+        ("dummy", "install"),
+        ("dummy", "config"),
+    ]
+    assert records[0].user_time > 0
+    assert records[0].maxrss > 0
+    assert records[0].wall >= records[1].wall
+    path = tmp_path / "trace.json"
+    profiling.write_trace(records, str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [event["cat"] for event in events] == ["dummy,install", "dummy,config"]
@@ -0,0 +1,42 @@
+"""Test the registry module.
+"""
+import sys
+import subprocess as sp
+from xinstall import registry
+
+
+def test_manifest():
+    """Test that the manifest is in sync with sub parsers of modules.
+    """
+    assert registry.build_manifest() == registry.MANIFEST
+    assert not [help_ for *_, help_ in registry.MANIFEST if ":param" in help_]
+
+
+def test_summarize():
+    """Test summarizing docstrings into help docs.
+    """
+    doc = """Install Spark.
+        Spark is downloaded from mirrors.
+
+        :param args: A Namespace object containing parsed command-line options.
+        """
+    assert registry.summarize(doc) == "Install Spark. Spark is downloaded from mirrors."
+    assert registry.summarize("Install Sphinx.\n    :param args:") == "Install Sphinx."
+    assert registry.summarize(None) == ""
+
+
+def test_lazy_import():
+    """Test that only the module owning the sub command is imported.
+    """
+    code = """if True:
+        import sys
+        from xinstall.main import parse_args
+        parse_args(["--sudo", "-y", "git", "-ic"])
+        modules = set(sys.modules)
+        assert "xinstall.dev" in modules
+        assert "xinstall.bigdata" not in modules
+        assert "xinstall.ai" not in modules
+        parse_args(["version"])
+        assert "xinstall.ide" not in sys.modules
+        """
+    sp.run([sys.executable, "-c", code], check=True)
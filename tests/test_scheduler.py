@@ -0,0 +1,76 @@
+"""Test the scheduler module.
+"""
+import time
+from argparse import Namespace
+import pytest
+from xinstall import scheduler
+from xinstall.main import parse_args
+
+
+def test_expand():
+    """Test expanding implicit dependencies of sub commands.
+    """
+    targets = [parse_args(["--sudo", "-y", "git", "-ic"]), parse_args(["rustpy", "-i"])]
+    nodes, edges = scheduler.expand(targets)
+    assert edges == {
+        "git": {"ssh_client"},
+        "rustpython": {"rustup"},
+        "ssh_client": set(),
+        "rustup": set(),
+    }
+    assert nodes["ssh_client"].config and not nodes["ssh_client"].install
+    assert nodes["rustup"].install and not nodes["rustup"].config
+    _, edges = scheduler.expand([parse_args(["git", "-u"])])
+    assert edges == {"git": set()}
+
+
+def test_batch_options(monkeypatch):
+    """Test passing options of sub commands through xinstall run.
+    """
+    calls = []
+    monkeypatch.setattr(
+        scheduler, "run_targets", lambda targets, jobs: calls.extend(targets)
+    )
+    args = parse_args(["-y", "run", "ipython --pip pip3", "git", "-i"])
+    args.func(args)
+    assert [target.sub_cmd for target in calls] == ["ipython", "git"]
+    assert calls[0].pip == "pip3" and calls[0].install and calls[0].yes
+    args = parse_args(["run", "git --no-such-option", "-i"])
+    with pytest.raises(SystemExit):
+        args.func(args)
+
+
+def _target(name, log, fail=False):
+    def func(args):  # pylint: disable=W0613
+        log.append(("start", name))
+        time.sleep(0.2)
+        if fail:
+            raise RuntimeError(name)
+        log.append(("end", name))
+
+    return Namespace(sub_cmd=name, func=func, install=True, config=False)
+
+
+def test_run_targets(monkeypatch):
+    """Test running independent sub commands concurrently and dependent ones in order.
+    """
+    monkeypatch.setattr(scheduler, "DEPENDENCIES", {"c": (("a", "b"), ("install", ))})
+    log = []
+    targets = [_target(name, log) for name in "cab"]
+    start = time.perf_counter()
+    scheduler.run_targets(targets, jobs=4)
+    assert time.perf_counter() - start < 0.6
+    assert log.index(("start", "c")) > log.index(("end", "a"))
+    assert log.index(("start", "c")) > log.index(("end", "b"))
+
+
+def test_run_targets_failure(monkeypatch):
+    """Test that dependents of a failed sub command are skipped.
+    """
+    monkeypatch.setattr(scheduler, "DEPENDENCIES", {"b": (("a", ), ("install", ))})
+    log = []
+    targets = [_target("a", log, fail=True), _target("b", log), _target("c", log)]
+    with pytest.raises(SystemExit):
+        scheduler.run_targets(targets, jobs=2)
+    assert ("start", "b") not in log
+    assert ("end", "c") in log
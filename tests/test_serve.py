@@ -0,0 +1,35 @@
+"""Test the serve module.
+"""
+import os
+import sys
+import time
+import subprocess as sp
+import pytest
+from xinstall.utils import is_win
+
+
+@pytest.mark.skipif(is_win(), reason="The daemon is not supported on Windows")
+def test_serve(tmp_path):
+    """Test forwarding commands to the xinstall daemon.
+    """
+    socket = tmp_path / "serve.sock"
+    env = dict(os.environ, XINSTALL_SOCKET=str(socket))
+    daemon = sp.Popen([sys.executable, "-m", "xinstall", "serve", "-t", "2"], env=env)
+    for _ in range(100):
+        if socket.exists():
+            break
+        time.sleep(0.1)
+    cmd = [sys.executable, "-m", "xinstall.client", "version"]
+    clients = [sp.Popen(cmd, env=env, stdout=sp.PIPE) for _ in range(4)]
+    for client in clients:
+        stdout, _ = client.communicate()
+        assert client.returncode == 0
+        assert stdout.strip()
+    proc = sp.run(
+        [sys.executable, "-m", "xinstall.client", "no_such_cmd"],
+        env=env,
+        capture_output=True
+    )
+    assert proc.returncode == 2
+    assert daemon.wait(timeout=10) == 0
+    assert not socket.exists()
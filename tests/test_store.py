@@ -0,0 +1,82 @@
+"""Test the key-value store of settings.
+"""
+import json
+import multiprocessing
+from xinstall import store, utils
+
+
+def _use_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(store, "STORE_FILE", tmp_path / "xinstall.db")
+    monkeypatch.setattr(store, "LEGACY_FILE", tmp_path / "xinstall.json")
+    monkeypatch.setattr(store, "_CONN", None)
+
+
+def test_get_put(monkeypatch, tmp_path):
+    """Test reading and writing individual keys.
+    """
+    _use_store(monkeypatch, tmp_path)
+    assert store.get("key") is None
+    assert store.get("key", 0) == 0
+    store.put("key", {"a": [1, 2]})
+    store.put("time", 1.5)
+    assert store.get("key") == {"a": [1, 2]}
+    assert store.items() == {"key": {"a": [1, 2]}, "time": 1.5}
+
+
+def test_legacy(monkeypatch, tmp_path):
+    """Test that settings in the legacy JSON file are imported once.
+    """
+    _use_store(monkeypatch, tmp_path)
+    (tmp_path / "xinstall.json").write_text(json.dumps({"key": "val"}))
+    assert store.get("key") == "val"
+    store.put("key", "new")
+    monkeypatch.setattr(store, "_CONN", None)
+    assert store.get("key") == "new"
+    assert store.items() == {"key": "new"}
+
+
+def test_states(monkeypatch, tmp_path):
+    """Test that internal states are kept apart from settings.
+    """
+    _use_store(monkeypatch, tmp_path)
+    assert store.get_state("brew_update_timestamp", 0) == 0
+    store.put_state("brew_update_timestamp", 1.5)
+    store.put("key", "val")
+    assert store.get_state("brew_update_timestamp") == 1.5
+    assert store.get("brew_update_timestamp") is None
+    assert store.items() == {"key": "val"}
+    assert utils.SETTINGS == {"key": "val"}
+
+
+def test_read_only(monkeypatch, tmp_path):
+    """Test that reading settings does not create the store.
+    """
+    _use_store(monkeypatch, tmp_path)
+    assert utils.SETTINGS == {}
+    (tmp_path / "xinstall.json").write_text(json.dumps({"key": "val"}))
+    assert utils.SETTINGS == {"key": "val"}
+    assert store.get("key") == "val"
+    assert not (tmp_path / "xinstall.db").exists()
+    store.put("time", 1.5)
+    assert store.get("key") == "val"
+    assert (tmp_path / "xinstall.db").exists()
+
+
+def _put(idx: int) -> None:
+    for _ in range(20):
+        store.put(f"key{idx}", idx)
+
+
+def test_processes(monkeypatch, tmp_path):
+    """Test that concurrent processes do not lose updates of each other.
+    """
+    _use_store(monkeypatch, tmp_path)
+    store.put("key", "val")
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_put, args=(idx, )) for idx in range(8)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    assert [proc.exitcode for proc in procs] == [0] * 8
+    assert store.items() == dict({f"key{idx}": idx for idx in range(8)}, key="val")
@@ -1,7 +1,11 @@
 """Test the utils module.
 """
+import sys
+import json
 import subprocess as sp
-from xinstall import utils
+from pathlib import Path
+import pytest
+from xinstall import plan, store, utils
 
 
 def test_install_py_github():
@@ -17,3 +21,239 @@ def test_install_py_github():
     )
     cmd = "python3 -c 'import dsutil.docker'"
     sp.run(cmd, shell=True, check=True)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="Audit hooks require Python 3.8+")
+def test_import_side_effects(tmp_path):
+    """Test that importing xinstall.utils (and parsing `xinstall version`)
+    does not touch the filesystem beyond loading Python modules.
+    """
+    code = """if True:
+        import sys
+        import json
+        EVENTS = ("open", "os.mkdir", "os.rename", "os.remove", "subprocess.Popen")
+        events = []
+        sys.addaudithook(
+            lambda event, args: events.append((event, str(args[0])))
+            if event in EVENTS else None
+        )
+        from xinstall import plan, store, utils
+        from xinstall.main import parse_args
+        parse_args(["version"])
+        print(json.dumps(events))
+        """
+    home = tmp_path / "home"
+    proc = sp.run(
+        [sys.executable, "-B", "-c", code],
+        env={"HOME": str(home), "PYTHONPATH": str(Path(utils.__file__).parent.parent)},
+        check=True,
+        capture_output=True,
+    )
+    events = json.loads(proc.stdout)
+    assert not [(event, arg) for event, arg in events if event != "open"]
+    assert all(Path(path).suffix in (".py", ".pyc", ".so") for _, path in events)
+    assert not home.exists()
+
+
+def test_merge_requirements():
+    """Test merging extras and version specifiers of Python requirements.
+    """
+    reqs = utils.merge_requirements([
+        "dask[complete]",
+        "Dask[dataframe]>=2",
+        "dask<3",
+        "x @ https://example.com/x-1.0-py3-none-any.whl",
+        "x>=1",
+        "./local",
+    ])
+    assert reqs == [
+        "dask[complete,dataframe]<3,>=2",
+        "x@ https://example.com/x-1.0-py3-none-any.whl",
+        "./local",
+    ]
+
+
+def test_file_steps(tmp_path):
+    """Test creating directories, writing files and removing them.
+    """
+    dir_ = tmp_path / "a/b"
+    utils.mkdir(dir_, mode=0o700)
+    assert dir_.is_dir()
+    path = dir_ / "file"
+    utils.write_file(path, "a")
+    utils.write_file(path, "b", append=True)
+    assert path.read_text() == "ab"
+    utils.write_file(path, "c")
+    assert path.read_text() == "c"
+    utils.remove_file(tmp_path / "a")
+    utils.remove_file(tmp_path / "a")
+    assert not (tmp_path / "a").exists()
+
+
+def _brew(monkeypatch, info):
+    """Record brew commands (failing brew install and linking formulae by brew link).
+    """
+    cmds = []
+
+    def run(cmd, **kwargs):  # pylint: disable=W0613
+        cmds.append(" ".join(cmd.split()))
+        if " install " in cmd:
+            raise sp.CalledProcessError(1, cmd)
+        if " link " in cmd:
+            for formula in info["formulae"]:
+                if formula["name"] in cmd.split():
+                    formula["linked_keg"] = "1.0"
+        stdout = json.dumps(info) if " info " in cmd else None
+        return sp.CompletedProcess(cmd, 0, stdout=stdout)
+
+    monkeypatch.setattr(utils.sp, "run", run)
+    monkeypatch.setattr(utils, "brew_update", lambda: None)
+    monkeypatch.setattr(utils, "installed_packages", lambda manager: frozenset())
+    return cmds
+
+
+def test_brew_install_safe(monkeypatch):
+    """Test installing formulae in one call and re-linking only unlinked ones.
+    """
+    info = {
+        "formulae": [
+            {"name": "vim", "installed": [{}], "linked_keg": "8.2", "keg_only": False},
+            {"name": "git", "installed": [{}], "linked_keg": None, "keg_only": False},
+            {"name": "icu4c", "installed": [{}], "linked_keg": None, "keg_only": True},
+        ]
+    }
+    cmds = _brew(monkeypatch, info)
+    utils.brew_install_safe(["vim", "git", "icu4c"])
+    assert cmds == [
+        "HOMEBREW_NO_AUTO_UPDATE=1 brew install --force vim git icu4c",
+        "HOMEBREW_NO_AUTO_UPDATE=1 brew info --json=v2 vim git icu4c",
+        "HOMEBREW_NO_AUTO_UPDATE=1 brew link --overwrite --force git",
+        "HOMEBREW_NO_AUTO_UPDATE=1 brew info --json=v2 vim git icu4c",
+    ]
+
+
+def test_brew_install_safe_failure(monkeypatch):
+    """Test that errors are raised if a formula fails to install
+    even if other formulae are unlinked.
+    """
+    info = {
+        "formulae": [
+            {"name": "vim", "installed": [], "linked_keg": None, "keg_only": False},
+            {"name": "git", "installed": [{}], "linked_keg": None, "keg_only": False},
+        ]
+    }
+    _brew(monkeypatch, info)
+    with pytest.raises(sp.CalledProcessError):
+        utils.brew_install_safe(["vim", "git"])
+
+
+def test_installed_packages(monkeypatch):
+    """Test that installed packages are probed once and skipped until invalidated.
+    """
+    cmds = []
+    status = "vim install ok installed\ngit deinstall ok config-files\n"
+
+    def run(cmd, **kwargs):  # pylint: disable=W0613
+        cmds.append(cmd.split()[0])
+        return sp.CompletedProcess(cmd, 0, stdout=status.encode())
+
+    monkeypatch.setattr(utils.sp, "run", run)
+    monkeypatch.setattr(utils, "update_apt_source", lambda **kwargs: None)
+    monkeypatch.setattr(utils, "_INSTALLED", {})
+    assert utils.installed_packages("dpkg") == {"vim"}
+    utils.apt_install(["vim"])
+    assert cmds == ["dpkg-query"]
+    utils.apt_install(["vim", "git"])
+    assert cmds == ["dpkg-query", "apt-get"]
+    utils.apt_install(["vim"])
+    assert cmds == ["dpkg-query", "apt-get", "dpkg-query"]
+
+
+def _use_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(store, "STORE_FILE", tmp_path / "xinstall.db")
+    monkeypatch.setattr(store, "LEGACY_FILE", tmp_path / "xinstall.json")
+    monkeypatch.setattr(store, "_CONN", None)
+
+
+def test_update_apt_source(monkeypatch, tmp_path):
+    """Test that apt-get update is run only if package lists are stale
+    or APT sources have changed.
+    """
+    cmds = []
+    (tmp_path / "sources.list.d").mkdir()
+    (tmp_path / "sources.list").write_text("deb http://archive.ubuntu.com/ubuntu main")
+    monkeypatch.setattr(utils, "APT_DIR", tmp_path)
+    monkeypatch.setattr(utils, "APT_LISTS_DIR", tmp_path / "lists")
+    monkeypatch.setattr(utils, "APT_LOCK_FILE", tmp_path / "apt.lock")
+    _use_store(monkeypatch, tmp_path)
+    monkeypatch.setattr(
+        utils.sp, "run",
+        lambda cmd, **kwargs: cmds.append(cmd.split()) or sp.CompletedProcess(cmd, 0)
+    )
+    utils.update_apt_source()
+    utils.update_apt_source()
+    assert cmds == [["apt-get", "update", "--yes"]]
+    (tmp_path / "sources.list.d" / "docker.list").write_text("deb https://docker.com")
+    utils.update_apt_source()
+    assert len(cmds) == 2
+    utils.update_apt_source(seconds=0)
+    assert len(cmds) == 3
+
+
+def test_brew_update(monkeypatch, tmp_path):
+    """Test that brew update is run at most once per TTL.
+    """
+    cmds = []
+    _use_store(monkeypatch, tmp_path)
+    monkeypatch.setattr(
+        utils.sp, "run",
+        lambda cmd, **kwargs: cmds.append(cmd) or sp.CompletedProcess(cmd, 0)
+    )
+    utils.brew_update()
+    utils.brew_update()
+    assert cmds == ["brew update"]
+    assert store.get_state("brew_update_timestamp") > 0
+
+
+def test_install_py_github_wheelhouse(monkeypatch, tmp_path):
+    """Test that latest tags are cached and wheels are installed from the wheelhouse.
+    """
+    _use_store(monkeypatch, tmp_path)
+    monkeypatch.setattr(utils, "_wheelhouse", lambda: tmp_path)
+    resolved, downloads, cmds = [], [], []
+
+    def _github_version(url):
+        resolved.append(url)
+        return "v1.0.0"
+
+    def download(url, path):
+        downloads.append(url)
+        Path(path).write_text("")
+
+    monkeypatch.setattr(utils, "_github_version", _github_version)
+    monkeypatch.setattr(utils, "download", download)
+    monkeypatch.setattr(utils, "run_cmd", lambda cmd: cmds.append(cmd.split()))
+    urls = ["https://github.com/dclong/dsutil", "https://github.com/dclong/xinstall"]
+    for _ in range(2):
+        utils.install_py_github(urls, pip="pip3")
+    assert sorted(resolved) == urls
+    assert downloads == [
+        f"{url}/releases/download/v1.0.0/{Path(url).name}-1.0.0-py3-none-any.whl"
+        for url in urls
+    ]
+    wheels = [
+        str(tmp_path / f"{Path(url).name}-1.0.0-py3-none-any.whl") for url in urls
+    ]
+    assert cmds == [["pip3", "install", "--upgrade"] + wheels] * 2
+
+
+def test_github_latest_tags_planning(monkeypatch, tmp_path):
+    """Test that resolved tags are not saved into the store when planning.
+    """
+    _use_store(monkeypatch, tmp_path)
+    monkeypatch.setattr(utils, "_github_version", lambda url: "v1.0.0")
+    url = "https://github.com/dclong/dsutil"
+    with plan.planning() as steps:
+        utils.install_py_github(url, pip="pip3")
+    assert [step.func for step in steps] == ["download", "run_cmd"]
+    assert not list(tmp_path.iterdir())
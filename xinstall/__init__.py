@@ -1,14 +1,43 @@
 """Easy Cross-platform Installation and Configuration of Apps.
 """
-from . import ai
-from . import virtualization
-from . import dev
-from . import github
-from . import ide
-from . import jupyter
-from . import main
-from . import desktop
-from . import shell
-from . import utils
-from . import network
-from .main import __version__
+import importlib
+
+_SUBMODULES = (
+    "ai",
+    "bench",
+    "bigdata",
+    "client",
+    "coalesce",
+    "desktop",
+    "dev",
+    "extract",
+    "fetch",
+    "gitcache",
+    "github",
+    "http_client",
+    "ide",
+    "jupyter",
+    "ledger",
+    "main",
+    "network",
+    "pdf",
+    "plan",
+    "profiling",
+    "registry",
+    "scheduler",
+    "serve",
+    "shell",
+    "store",
+    "utils",
+    "virtualization",
+)
+
+
+def __getattr__(name):
+    """Import submodules (and the version from the main module) lazily on attribute access.
+    """
+    if name == "__version__":
+        return importlib.import_module(f"{__name__}.main").__version__
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
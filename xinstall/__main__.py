@@ -0,0 +1,5 @@
+"""Run xinstall command-line interface using `python -m xinstall`.
+"""
+from .main import main
+
+main()
@@ -3,7 +3,8 @@
 from pathlib import Path
 import logging
 from .utils import (
-    HOME, USER, run_cmd, add_subparser, is_linux, is_macos, option_pip_bundle
+    HOME, USER, add_subparser, is_linux, is_macos, option_pip_bundle,
+    apt_install, pip_install, run_cmd, mkdir
 )
 
 
@@ -11,24 +12,21 @@ def kaggle(args):
     """Insert the Python package kaggle.
     """
     if args.install:
-        cmd = f"{args.pip} install {args.user_s} {args.pip_option} kaggle"
-        run_cmd(cmd)
+        pip_install(["kaggle"], args.pip_install)
     if args.config:
         home_host = Path(f"/home_host/{USER}/")
         kaggle_home_host = home_host / ".kaggele"
         kaggle_home = HOME / ".kaggele"
         if home_host.is_dir():
-            kaggle_home_host.mkdir(exist_ok=True)
-            try:
-                kaggle_home.symlink_to(kaggle_home_host)
+            mkdir(kaggle_home_host)
+            if not (kaggle_home.exists() or kaggle_home.is_symlink()):
+                run_cmd(f"ln -s {kaggle_home_host} {kaggle_home}")
                 logging.info(
                     "Symbolic link %s pointing to %s is created.", kaggle_home,
                     kaggle_home_host
                 )
-            except FileExistsError:
-                pass
         else:
-            kaggle_home.mkdir(exist_ok=True)
+            mkdir(kaggle_home)
             logging.info("The directory %s is created.", kaggle_home)
     if args.uninstall:
         pass
@@ -48,9 +46,10 @@ def lightgbm(args):
     """Insert the Python package kaggle.
     """
     if args.install:
-        cmd = f"""{args.pip} install {args.user_s} {args.pip_option} \
-            lightgbm scikit-learn pandas matplotlib scipy graphviz"""
-        run_cmd(cmd)
+        pip_install(
+            ["lightgbm", "scikit-learn", "pandas", "matplotlib", "scipy", "graphviz"],
+            args.pip_install,
+        )
 
 
 def _lightgbm_args(subparser):
@@ -69,20 +68,19 @@ def pytorch(args):
     if args.install:
         url = "https://download.pytorch.org/whl/torch_stable.html"
         if is_linux():
-            cmd = f"""{args.pip_install} -f {url} \
-                    torch==1.7.0+cpu torchvision==0.8.1+cpu torchaudio==0.7.0"""
+            reqs = ["torch==1.7.0+cpu", "torchvision==0.8.1+cpu", "torchaudio==0.7.0"]
             if args.cuda:
                 args.cuda = args.cuda.replace(".", "")
-                cmd = f"""{args.pip_install} -f {url} \
-                    torch==1.7.0+cu{args.cuda} torchvision==0.8.1+cu{args.cuda} \
-                    torchaudio==0.7.0
-                    """
+                reqs = [
+                    f"torch==1.7.0+cu{args.cuda}", f"torchvision==0.8.1+cu{args.cuda}",
+                    "torchaudio==0.7.0"
+                ]
                 if args.cuda == "102":
-                    cmd = f"{args.pip} install torch torchvision"
-            run_cmd(cmd)
+                    pip_install(["torch", "torchvision"], f"{args.pip} install")
+                    return
+            pip_install(reqs, f"{args.pip_install} -f {url}")
         elif is_macos():
-            cmd = f"{args.pip} install torch torchvision torchaudio"
-            run_cmd(cmd)
+            pip_install(["torch", "torchvision", "torchaudio"], f"{args.pip} install")
     if args.config:
         pass
     if args.uninstall:
@@ -109,11 +107,11 @@ def autogluon(args):
     """Insert the Python package AutoGluon.
     """
     if args.install:
-        cmd = f"{args.pip} install {args.user_s} {args.pip_option} 'mxnet<2.0.0' autogluon"
+        mxnet = "mxnet<2.0.0"
         if args.cuda_version:
             version = args.cuda_version.replace(".", "")
-            cmd = f"{args.pip} install {args.user_s} {args.pip_option} 'mxnet-cu{version}<2.0.0' autogluon"
-        run_cmd(cmd)
+            mxnet = f"mxnet-cu{version}<2.0.0"
+        pip_install([mxnet, "autogluon"], args.pip_install)
 
 
 def _autogluon_args(subparser):
@@ -142,10 +140,7 @@ def pytext(args):
     """Insert the Python package PyText.
     """
     if args.install:
-        cmd = f"{args.pip} install {args.user_s} {args.pip_option} pytext-nlp"
-        if args.cuda_version:
-            pass
-        run_cmd(cmd)
+        pip_install(["pytext-nlp"], args.pip_install)
 
 
 def _pytext_args(subparser):
@@ -161,18 +156,17 @@ def computer_vision(args):
     """
     if args.install:
         if is_linux():
-            cmd = f"""{args.prefix} apt-get install {args.yes_s} \
-                        libsm6 libxrender-dev libaec-dev \
-                        libblosc-dev libbrotli-dev libghc-bzlib-dev libgif-dev \
-                        libopenjp2-7-dev liblcms2-dev libjxr-dev liblz4-dev \
-                        liblzma-dev libpng-dev libsnappy-dev libtiff-dev \
-                        libwebp-dev libzopfli-dev libzstd-dev \
-                    && {args.pip} install {args.user_s} {args.pip_option} opencv-python scikit-image pillow"""
-            run_cmd(cmd)
-        elif is_macos():
-            cmd = f"""{args.pip} install {args.user_s} {args.pip_option} \
-                opencv-python scikit-image pillow"""
-            run_cmd(cmd)
+            apt_install(
+                """libsm6 libxrender-dev libaec-dev
+                libblosc-dev libbrotli-dev libghc-bzlib-dev libgif-dev
+                libopenjp2-7-dev liblcms2-dev libjxr-dev liblz4-dev
+                liblzma-dev libpng-dev libsnappy-dev libtiff-dev
+                libwebp-dev libzopfli-dev libzstd-dev""",
+                prefix=args.prefix,
+                yes=args.yes_s,
+            )
+        if is_linux() or is_macos():
+            pip_install(["opencv-python", "scikit-image", "pillow"], args.pip_install)
 
 
 def _computer_vision_args(subparser):
@@ -193,9 +187,10 @@ def nlp(args):
     """Install Python packages (PyTorch, transformers, pytext-nlp and fasttext) for NLP.
     """
     if args.install:
-        cmd = f"""{args.pip} install {args.user_s} {args.pip_option} \
-            torch torchvision transformers pytext-nlp fasttext"""
-        run_cmd(cmd)
+        pip_install(
+            ["torch", "torchvision", "transformers", "pytext-nlp", "fasttext"],
+            args.pip_install,
+        )
 
 
 def _nlp_args(subparser):
@@ -0,0 +1,192 @@
+"""Benchmark the startup time of xinstall sub commands.
+"""
+from typing import Dict, List, Sequence, Tuple
+import sys
+import json
+import time
+import logging
+import statistics
+from pathlib import Path
+import subprocess as sp
+from .registry import MANIFEST
+
+BASELINE = Path.home() / ".cache/xinstall/bench_startup.json"
+
+
+def _import_times(stderr: str) -> Dict[str, int]:
+    """Parse the output of `python -X importtime`.
+
+    :param stderr: The standard error output of `python -X importtime`.
+    :return: A dict mapping top-level imports to their cumulative time (in microseconds).
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[12:].split("|")
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue
+        name = name.strip()
+        times[name] = times.get(name, 0) + int(cumulative)
+    return times
+
+
+def measure(argv: Sequence[str], repeat: int = 5) -> dict:
+    """Measure the cold-start time of a xinstall command.
+    Wall times are measured on plain runs
+    and import times are collected by a separate run with `-X importtime`
+    (whose output to stderr would inflate wall times).
+
+    :param argv: Command-line arguments passed to xinstall.
+    :param repeat: The number of (timed) runs.
+    :return: A dict containing the median wall time (in seconds)
+        and the cumulative time (in microseconds) of top-level imports.
+    """
+    cmd = [sys.executable, "-m", "xinstall", *argv]
+    walls = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sp.run(cmd, check=True, stdout=sp.DEVNULL, stderr=sp.DEVNULL)
+        walls.append(time.perf_counter() - start)
+    proc = sp.run(
+        [sys.executable, "-X", "importtime", *cmd[1:]],
+        check=True,
+        stdout=sp.DEVNULL,
+        stderr=sp.PIPE,
+        text=True
+    )
+    return {"wall": statistics.median(walls), "imports": _import_times(proc.stderr)}
+
+
+def startup_commands(sub_cmds: Sequence[str] = ()) -> List[str]:
+    """Get commands whose cold-start time are to be measured.
+
+    :param sub_cmds: Sub commands to measure. If empty, all registered sub commands are used.
+    :return: A list of commands.
+    """
+    if not sub_cmds:
+        sub_cmds = [name for name, *_ in MANIFEST]
+    return ["version"] + [f"{sub_cmd} -h" for sub_cmd in sub_cmds]
+
+
+def bench_startup(sub_cmds: Sequence[str] = (), repeat: int = 5) -> dict:
+    """Measure the cold-start time of `xinstall version` and `xinstall <sub_cmd> -h`.
+
+    :param sub_cmds: Sub commands to measure. If empty, all registered sub commands are used.
+    :param repeat: The number of runs of each command.
+    :return: A dict mapping commands to their measurement.
+    """
+    results = {}
+    for cmd in startup_commands(sub_cmds):
+        logging.info("Measuring the startup time of `xinstall %s` ...", cmd)
+        results[cmd] = measure(cmd.split(), repeat=repeat)
+    return results
+
+
+def compare(
+    results: dict,
+    baseline: dict,
+    threshold: float = 0.3,
+    tolerance: float = 0.02
+) -> List[Tuple[str, float, float]]:
+    """Compare measurements with a baseline.
+
+    :param results: Measurements returned by bench_startup.
+    :param baseline: Measurements (returned by bench_startup) used as the baseline.
+    :param threshold: The maximum allowed relative increase of the wall time.
+    :param tolerance: The maximum allowed absolute increase (in seconds) of the wall time
+        which is used to absorb noise of fast commands.
+    :return: A list of (command, baseline wall time, wall time) of regressed commands.
+    """
+    regressions = []
+    for cmd, res in results.items():
+        if cmd not in baseline:
+            continue
+        old = baseline[cmd]["wall"]
+        if res["wall"] > max(old * (1 + threshold), old + tolerance):
+            regressions.append((cmd, old, res["wall"]))
+    return regressions
+
+
+def _print_results(results: dict, top: int = 3) -> None:
+    for cmd, res in sorted(results.items(), key=lambda item: -item[1]["wall"]):
+        imports = sorted(res["imports"].items(), key=lambda item: -item[1])[:top]
+        imports = ", ".join(f"{name}: {us / 1000:.1f}ms" for name, us in imports)
+        print(f"{res['wall'] * 1000:8.1f}ms  xinstall {cmd}  ({imports})")
+
+
+def bench(args) -> None:
+    """Benchmark the startup time of xinstall.
+    """
+    results = bench_startup(args.sub_cmds, repeat=args.repeat)
+    _print_results(results)
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=4))
+        logging.info("Results are saved into the baseline %s.", args.baseline)
+        return
+    if not args.baseline.is_file():
+        return
+    baseline = json.loads(args.baseline.read_text())
+    regressions = compare(
+        results, baseline, threshold=args.threshold, tolerance=args.tolerance
+    )
+    for cmd, old, new in regressions:
+        print(f"Regression: xinstall {cmd} takes {new * 1000:.1f}ms (was {old * 1000:.1f}ms)")
+    if regressions:
+        sys.exit(1)
+
+
+def _add_subparser_bench(subparsers) -> None:
+    subparser = subparsers.add_parser(
+        "bench", help="Benchmark the startup time of xinstall sub commands."
+    )
+    subparser.add_argument(
+        dest="suite", choices=("startup", ), help="The benchmark suite to run."
+    )
+    subparser.add_argument(
+        "-s",
+        "--sub-cmds",
+        dest="sub_cmds",
+        nargs="+",
+        default=(),
+        help="Sub commands to benchmark (all registered sub commands by default)."
+    )
+    subparser.add_argument(
+        "-r",
+        "--repeat",
+        dest="repeat",
+        type=int,
+        default=5,
+        help="The number of runs of each command."
+    )
+    subparser.add_argument(
+        "-b",
+        "--baseline",
+        dest="baseline",
+        type=Path,
+        default=BASELINE,
+        help="The JSON file of baseline results."
+    )
+    subparser.add_argument(
+        "--save",
+        dest="save",
+        action="store_true",
+        help="Save results as the baseline instead of comparing with it."
+    )
+    subparser.add_argument(
+        "-t",
+        "--threshold",
+        dest="threshold",
+        type=float,
+        default=0.3,
+        help="The maximum allowed relative increase of the startup time."
+    )
+    subparser.add_argument(
+        "--tolerance",
+        dest="tolerance",
+        type=float,
+        default=0.02,
+        help="The maximum allowed absolute increase (in seconds) of the startup time."
+    )
+    subparser.set_defaults(func=bench)
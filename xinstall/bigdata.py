@@ -1,50 +1,40 @@
 """Install big data related tools.
 """
 import importlib
-from typing import Union
+from typing import List, Union
 import logging
 from pathlib import Path
 import re
-from urllib.request import urlopen, urlretrieve
 from argparse import Namespace
-import tempfile
-from tqdm import tqdm
 import findspark
 from .utils import (
     BASE_DIR,
     run_cmd,
+    mkdir,
+    download_extract,
+    pip_install,
     add_subparser,
     option_pip_bundle,
     is_win,
 )
-
-
-class ProgressBar(tqdm):
-    """A class for reporting progress with urlretrieve.
-    """
-    def update_progress(self, block_num=1, block_size=1, total_size=None):
-        """Update progress.
-        """
-        if total_size is not None:
-            self.total = total_size
-        self.update(block_num * block_size - self.n)
+from . import http_client
 
 
 def get_spark_version() -> str:
     """Get the latest version of Spark.
     """
     logging.info("Parsing the latest version of Spark...")
-    pattern = br"Latest Release \(Spark (\d.\d.\d)\)"
-    with urlopen("https://spark.apache.org/downloads.html") as resp:
-        for line in resp:
-            match = re.search(pattern, line)
-            if match:
-                return match.group(1).decode()
+    pattern = r"Latest Release \(Spark (\d.\d.\d)\)"
+    resp = http_client.get("https://spark.apache.org/downloads.html")
+    resp.raise_for_status()
+    match = re.search(pattern, resp.text)
+    if match:
+        return match.group(1)
     return "3.0.1"
 
 
-def _download_spark(args: Namespace, spark_hdp: str, desfile: Path):
-    mirrors = args.mirrors + (
+def _spark_urls(args: Namespace, spark_hdp: str) -> List[str]:
+    mirrors = tuple(args.mirrors) + (
         "http://archive.apache.org/dist/spark",
         "http://apache.mirrors.hoobly.com/spark",
         "http://apache.spinellicreations.com/spark",
@@ -63,15 +53,9 @@ def _download_spark(args: Namespace, spark_hdp: str, desfile: Path):
         "http://mirrors.sonic.net/apache/spark",
         "http://us.mirrors.quenda.co/apache/spark",
     )
-    for mirror in mirrors:
-        url = f"{mirror}/spark-{args.spark_version}/{spark_hdp}.tgz"
-        try:
-            logging.info("Downloading Spark from: %s", url)
-            with ProgressBar(unit="B", unit_scale=True, miniters=1) as progress:
-                urlretrieve(url, desfile, progress.update_progress)
-            return
-        except Exception:
-            logging.info("Failed to download Spark from: %s", url)
+    return [
+        f"{mirror}/spark-{args.spark_version}/{spark_hdp}.tgz" for mirror in mirrors
+    ]
 
 
 def spark(args):
@@ -91,17 +75,24 @@ def spark(args):
     dir_ = args.location.resolve()
     spark_hdp = f"spark-{args.spark_version}-bin-hadoop{args.hadoop_version}"
     spark_home = dir_ / spark_hdp
-    desfile = Path(tempfile.mkdtemp()) / f"{spark_hdp}.tgz"
     if args.install:
-        dir_.mkdir(exist_ok=True)
-        _download_spark(args, spark_hdp, desfile)
-        cmd = f"{args.prefix} tar -zxf {desfile} -C {dir_} && rm {desfile}"
-        run_cmd(cmd)
+        if is_win():
+            mkdir(dir_)
+        else:
+            run_cmd(f"{args.prefix} mkdir -p {dir_}")
+        checksum = (
+            f"https://archive.apache.org/dist/spark/spark-{args.spark_version}/"
+            f"{spark_hdp}.tgz.sha512"
+        )
+        # the location might be writable only with the prefix (e.g., sudo)
+        download_extract(
+            _spark_urls(args, spark_hdp), dir_, checksum=checksum, prefix=args.prefix
+        )
     if args.config:
         # metastore db
         metastore_db = spark_home / "metastore_db"
         if is_win():
-            metastore_db.mkdir(parents=True, exist_ok=True)
+            mkdir(metastore_db)
         else:
             run_cmd(
                 f"{args.prefix} mkdir -p {metastore_db} && "
@@ -110,7 +101,7 @@ def spark(args):
         # warehouse
         warehouse = spark_home / "warehouse"
         if is_win():
-            warehouse.mkdir(parents=True, exist_ok=True)
+            mkdir(warehouse)
         else:
             run_cmd(
                 f"{args.prefix} mkdir -p {warehouse} && "
@@ -191,8 +182,7 @@ def pyspark(args):
     :param args: A Namespace object containing parsed command-line options.
     """
     if args.install:
-        cmd = f"{args.pip} install {args.user_s} {args.pip_option} pyspark findspark"
-        run_cmd(cmd)
+        pip_install(["pyspark", "findspark"], args.pip_install)
     if args.config:
         pass
     if args.uninstall:
@@ -214,8 +204,7 @@ def dask(args):
     :param args: A Namespace object containing parsed command-line options.
     """
     if args.install:
-        cmd = f"{args.pip} install {args.user_s} {args.pip_option} dask[complete]"
-        run_cmd(cmd)
+        pip_install(["dask[complete]"], args.pip_install)
     if args.config:
         pass
     if args.uninstall:
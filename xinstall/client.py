@@ -0,0 +1,103 @@
+"""A thin client forwarding xinstall commands to a running `xinstall serve` daemon.
+This module imports as little as possible so that the client starts fast.
+"""
+from typing import List, Tuple
+import os
+import sys
+import json
+import array
+import signal
+import socket
+
+SOCKET = os.environ.get(
+    "XINSTALL_SOCKET", os.path.expanduser("~/.cache/xinstall/serve.sock")
+)
+_FDS = (0, 1, 2)
+
+
+def send_request(sock: socket.socket, argv: List[str]) -> None:
+    """Send a request (argv, env, cwd and the stdin/stdout/stderr file descriptors)
+    to the daemon.
+
+    :param sock: A socket connected to the daemon.
+    :param argv: Command-line arguments to pass to xinstall.
+    """
+    payload = json.dumps({
+        "argv": argv,
+        "env": dict(os.environ),
+        "cwd": os.getcwd(),
+    }).encode() + b"\n"
+    fds = array.array("i", _FDS)
+    sent = sock.sendmsg([payload], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)])
+    sock.sendall(payload[sent:])
+
+
+def recv_request(sock: socket.socket) -> Tuple[dict, List[int]]:
+    """Receive a request sent by send_request.
+
+    :param sock: A socket connected to a client.
+    :return: The request and file descriptors of the client's stdin/stdout/stderr.
+    """
+    fds = array.array("i")
+    data, ancdata, _, _ = sock.recvmsg(65536, socket.CMSG_LEN(len(_FDS) * fds.itemsize))
+    for level, type_, cdata in ancdata:
+        if level == socket.SOL_SOCKET and type_ == socket.SCM_RIGHTS:
+            fds.frombytes(cdata[:len(cdata) - len(cdata) % fds.itemsize])
+    while not data.endswith(b"\n"):
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return json.loads(data), list(fds)
+
+
+def send_message(sock: socket.socket, **kwargs) -> None:
+    """Send a (JSON) message to the other side.
+
+    :param sock: A connected socket.
+    :param kwargs: Fields of the message.
+    """
+    sock.sendall(json.dumps(kwargs).encode() + b"\n")
+
+
+def forward(argv: List[str], path: str = SOCKET) -> int:
+    """Forward a xinstall command to the daemon.
+    Signals (SIGINT, SIGTERM and SIGHUP) received by the client
+    are forwarded to the process running the command.
+
+    :param argv: Command-line arguments to pass to xinstall.
+    :param path: The path of the Unix domain socket of the daemon.
+    :return: The exit code of the command.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        send_request(sock, argv)
+        with sock.makefile("r") as fin:
+            for line in fin:
+                msg = json.loads(line)
+                if "pid" in msg:
+                    for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+                        signal.signal(
+                            sig, lambda signum, _, pid=msg["pid"]: os.kill(pid, signum)
+                        )
+                if "exit" in msg:
+                    return msg["exit"]
+    return 1
+
+
+def main() -> None:
+    """Run a xinstall command via the daemon if it is running
+    and run it in the current process otherwise.
+    """
+    argv = sys.argv[1:]
+    try:
+        code = forward(argv)
+    except (FileNotFoundError, ConnectionRefusedError):
+        from .main import run  # pylint: disable=C0415
+        run(argv)
+        return
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Coalesce package-manager requests of sub commands run concurrently (xinstall run)
+into single transactions (collect-then-flush).
+
+Each thread running a sub command is a registered worker of the active Coalescer.
+A request (e.g., installing some packages using apt-get) blocks
+until every registered worker is either blocked on a request or finished,
+or until FLUSH_DELAY seconds have passed since the first pending request
+(so that a long-running worker, e.g., one building from source,
+does not hold back the others).
+Pending requests with the same key are then merged and flushed by one call
+(without holding the lock of the Coalescer so that other workers keep requesting),
+and the blocked workers resume with the result of their own requests.
+Requests made outside a Coalescer (e.g., running a single sub command)
+are flushed immediately.
+"""
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+import time
+import threading
+import contextlib
+
+# the maximum time (in seconds) a request waits for requests of other workers
+FLUSH_DELAY = 0.5
+Flush = Callable[[List[str]], None]
+_ACTIVE = None
+
+
+class _Request:
+    """Merged requests (with the same key) of workers and the result of flushing them.
+    """
+    def __init__(self, flush: Flush):
+        self.flush = flush
+        self.items: List[str] = []
+        self.done = False
+        self.error: Optional[Exception] = None
+
+
+_Batch = Tuple[Dict[Hashable, _Request], int]
+
+
+class Coalescer:
+    """Merge requests of concurrently running workers into single transactions.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._workers = 0
+        # workers blocked on pending requests and on requests being flushed
+        self._waiting = 0
+        self._flushing = 0
+        self._deadline = 0.0
+        self._pending: Dict[Hashable, _Request] = {}
+
+    def register(self, count: int = 1) -> None:
+        """Register workers before they start
+        so that no request is flushed before all of them join.
+
+        :param count: The number of workers to register.
+        """
+        with self._cond:
+            self._workers += count
+
+    @contextlib.contextmanager
+    def worker(self):
+        """Run the current thread as a (previously registered) worker
+        and unregister it on exit.
+        """
+        self._local.registered = True
+        try:
+            yield
+        finally:
+            self._local.registered = False
+            with self._cond:
+                self._workers -= 1
+                batch = self._take_if_quiescent()
+            self._run(batch)
+
+    def is_worker(self) -> bool:
+        """Check whether the current thread is a registered worker.
+        """
+        return getattr(self._local, "registered", False)
+
+    def request(self, key: Hashable, items: Iterable[str], flush: Flush) -> None:
+        """Request items (e.g., packages to install)
+        and block until the merged request is flushed.
+
+        :param key: Requests with the same key are merged.
+        :param items: Items to request.
+        :param flush: A function which takes merged items and flushes them.
+        It is called once per key with the flush function of the first request.
+        """
+        with self._cond:
+            if not self._pending:
+                self._deadline = time.monotonic() + FLUSH_DELAY
+            req = self._pending.setdefault(key, _Request(flush))
+            req.items.extend(item for item in items if item not in req.items)
+            self._waiting += 1
+            batch = self._take_if_quiescent()
+        self._run(batch)
+        while True:
+            with self._cond:
+                if req.done:
+                    break
+                if self._pending.get(key) is not req:
+                    # being flushed by another worker
+                    self._cond.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                batch = self._take()
+            self._run(batch)
+        if req.error is not None:
+            raise req.error
+
+    def _take_if_quiescent(self) -> Optional[_Batch]:
+        """Take pending requests (with the lock held)
+        if every worker is blocked on a request or finished.
+        """
+        if self._pending and self._waiting + self._flushing >= self._workers:
+            return self._take()
+        return None
+
+    def _take(self) -> _Batch:
+        """Take pending requests (with the lock held) to flush.
+        """
+        batch = (self._pending, self._waiting)
+        self._pending = {}
+        self._flushing += self._waiting
+        self._waiting = 0
+        return batch
+
+    def _run(self, batch: Optional[_Batch]) -> None:
+        """Flush requests (without holding the lock) and wake up their workers.
+        """
+        if not batch:
+            return
+        reqs, waiting = batch
+        try:
+            for req in reqs.values():
+                try:
+                    req.flush(req.items)
+                except Exception as err:  # pylint: disable=W0703
+                    req.error = err
+        finally:
+            with self._cond:
+                for req in reqs.values():
+                    req.done = True
+                self._flushing -= waiting
+                self._cond.notify_all()
+
+
+@contextlib.contextmanager
+def coalescing():
+    """Activate a Coalescer for the duration of the context.
+    """
+    global _ACTIVE  # pylint: disable=W0603
+    _ACTIVE = Coalescer()
+    try:
+        yield _ACTIVE
+    finally:
+        _ACTIVE = None
+
+
+def submit(key: Hashable, items: Iterable[str], flush: Flush) -> None:
+    """Submit a request to the active Coalescer
+    or flush it immediately if the current thread is not a registered worker.
+
+    :param key: Requests with the same key are merged.
+    :param items: Items to request.
+    :param flush: A function which takes merged items and flushes them.
+    """
+    coalescer = _ACTIVE
+    if coalescer is None or not coalescer.is_worker():
+        flush(list(items))
+        return
+    coalescer.request(key, items, flush)
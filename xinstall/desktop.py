@@ -1,13 +1,12 @@
 """Install and configure desktop applications.
 """
 import sys
-import tempfile
-from pathlib import Path
 #import logging
 from .utils import (
     is_ubuntu_debian,
     is_linux,
-    update_apt_source,
+    apt_install,
+    pip_install,
     run_cmd,
     add_subparser,
     option_pip_bundle,
@@ -21,10 +20,11 @@ def nomachine(args):
         ver = args.version[:args.version.rindex(".")]
         if is_ubuntu_debian():
             url = f"https://download.nomachine.com/download/{ver}/Linux/nomachine_{args.version}_amd64.deb"
-            with tempfile.TemporaryDirectory() as tempdir:
-                file = Path(tempdir) / "nomachine.deb"
-                cmd = f"curl -sSL {url} -o {file} && dpkg -i {file}"
-                run_cmd(cmd)
+            # the command creates (and removes) the temporary file itself
+            # so that it can be planned and replayed
+            cmd = f"""file=$(mktemp --suffix .deb) && trap 'rm -f $file' EXIT \
+                && curl -sSL {url} -o $file && dpkg -i $file"""
+            run_cmd(cmd)
 
 
 def _nomachine_args(subparser):
@@ -52,9 +52,7 @@ def lxqt(args):
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            cmd = f"{args.prefix} apt-get install lxqt"
-            run_cmd(cmd)
+            apt_install(["lxqt"], prefix=args.prefix, yes=args.yes_s)
 
 
 def _add_subparser_lxqt(subparsers):
@@ -71,9 +69,7 @@ def pygetwindow(args):
     if args.install:
         if is_linux():
             sys.exit("PyGetWindow is not supported on Linux currently!")
-        cmd = f"""{args.pip} install {args.user_s} {args.pip_option} \
-                pyobjc-framework-quartz pygetwindow"""
-        run_cmd(cmd)
+        pip_install(["pyobjc-framework-quartz", "pygetwindow"], args.pip_install)
     if args.config:
         pass
     if args.uninstall:
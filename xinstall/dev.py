@@ -4,30 +4,34 @@ import os
 import logging
 import shutil
 from pathlib import Path
-import tempfile
 from argparse import Namespace
 import tomlkit
-from git import Repo
 from .utils import (
     HOME,
     BASE_DIR,
     is_ubuntu_debian,
     is_centos_series,
     is_linux,
-    update_apt_source,
+    apt_install,
+    apt_purge,
     brew_install_safe,
     is_macos,
     is_win,
-    remove_file_safe,
+    copy_file,
+    remove_file,
+    write_file,
     run_cmd,
+    pip_install,
     add_subparser,
     option_version,
     option_pip_bundle,
     option_python,
     update_file,
     update_dict,
+    yum_install,
+    yum_remove,
 )
-from .network import ssh_client
+from . import gitcache
 
 
 def openjdk8(args):
@@ -35,19 +39,22 @@ def openjdk8(args):
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(
-                f"{args.prefix} apt-get install {args.yes_s} openjdk-jdk-8 maven gradle"
+            apt_install(
+                ["openjdk-jdk-8", "maven", "gradle"],
+                prefix=args.prefix,
+                yes=args.yes_s,
             )
         if is_macos():
-            cmd = "brew tap AdoptOpenJDK/openjdk && brew cask install adoptopenjdk8"
-            run_cmd(cmd)
+            run_cmd("brew tap AdoptOpenJDK/openjdk")
+            brew_install_safe(["adoptopenjdk8"], cask=True)
         if is_centos_series():
             pass
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(
-                f"{args.prefix} apt-get purge {args.yes_s} openjdk-jdk-8 maven gradle"
+            apt_purge(
+                ["openjdk-jdk-8", "maven", "gradle"],
+                prefix=args.prefix,
+                yes=args.yes_s,
             )
         if is_macos():
             run_cmd("brew cask uninstall adoptopenjdk8")
@@ -79,7 +86,7 @@ def yapf(args):
     """Install Google's yapf (for formatting Python scripts).
     """
     if args.install:
-        run_cmd(f"{args.pip} install {args.user_s} {args.pip_option} yapf")
+        pip_install(["yapf"], args.pip_install)
     if args.config:
         # configure yapf formatting via pyproject.toml
         src_file = BASE_DIR / "yapf/pyproject.toml"
@@ -90,7 +97,7 @@ def yapf(args):
         else:
             dic_des = {}
         update_dict(dic_des, dic_src, recursive=True)
-        des_file.write_text(tomlkit.dumps(dic_des))
+        write_file(des_file, tomlkit.dumps(dic_des))
         logging.info("yapf is configured via %s.", des_file)
     if args.uninstall:
         run_cmd(f"{args.pip} uninstall yapf")
@@ -116,7 +123,7 @@ def pylint(args):
     """Install and configure pylint.
     """
     if args.install:
-        run_cmd(f"{args.pip} install {args.user_s} {args.pip_option} pylint")
+        pip_install(["pylint"], args.pip_install)
     if args.config:
         src_file = BASE_DIR / "pylint/pyproject.toml"
         dic_src = tomlkit.loads(src_file.read_text())
@@ -126,7 +133,7 @@ def pylint(args):
         else:
             dic_des = {}
         update_dict(dic_des, dic_src, recursive=True)
-        des_file.write_text(tomlkit.dumps(dic_des))
+        write_file(des_file, tomlkit.dumps(dic_des))
         logging.info("pylint is configured via %s.", des_file)
     if args.uninstall:
         run_cmd(f"{args.pip} uninstall pylint")
@@ -154,11 +161,11 @@ def flake8(args):
     """Install and configure flake8.
     """
     if args.install:
-        run_cmd(f"{args.pip} install {args.user_s} {args.pip_option} flake8")
+        pip_install(["flake8"], args.pip_install)
     if args.config:
         src_file = BASE_DIR / "flake8/flake8"
         des_file = args.dst_dir / ".flake8"
-        shutil.copy2(src_file, des_file)
+        copy_file(src_file, des_file)
         logging.info("%s is copied to %s.", src_file, des_file)
     if args.uninstall:
         run_cmd(f"{args.pip} uninstall flake8")
@@ -186,11 +193,11 @@ def darglint(args):
     """Install and configure darglint.
     """
     if args.install:
-        run_cmd(f"{args.pip} install {args.user_s} {args.pip_option} darglint")
+        pip_install(["darglint"], args.pip_install)
     if args.config:
         src_file = BASE_DIR / "darglint/darglint"
         des_file = args.dst_dir / ".darglint"
-        shutil.copy2(src_file, des_file)
+        copy_file(src_file, des_file)
         logging.info("%s is copied to %s.", src_file, des_file)
     if args.uninstall:
         run_cmd(f"{args.pip} uninstall darglint")
@@ -218,11 +225,11 @@ def pytype(args):
     """Install and configure pytype.
     """
     if args.install:
-        run_cmd(f"{args.pip} install {args.user_s} {args.pip_option} pytype")
+        pip_install(["pytype"], args.pip_install)
     if args.config:
         src_file = BASE_DIR / "pytype/setup.cfg"
         des_file = args.dst_dir / "setup.cfg"
-        shutil.copy2(src_file, des_file)
+        copy_file(src_file, des_file)
         logging.info("%s is copied to %s.", src_file, des_file)
     if args.uninstall:
         run_cmd(f"{args.pip} uninstall pytype")
@@ -251,22 +258,20 @@ def nodejs(args):
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            cmd = f"{args.prefix} apt-get install {args.yes_s} nodejs npm"
-            run_cmd(cmd)
+            apt_install(["nodejs", "npm"], prefix=args.prefix, yes=args.yes_s)
         if is_macos():
             brew_install_safe(["node"])
         if is_centos_series():
-            run_cmd(f"{args.prefix} yum install {args.yes_s} nodejs")
+            yum_install(["nodejs"], prefix=args.prefix, yes=args.yes_s)
     if args.config:
         pass
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} nodejs")
+            apt_purge(["nodejs"], prefix=args.prefix, yes=args.yes_s)
         if is_macos():
             run_cmd("brew uninstall nodejs")
         if is_centos_series():
-            run_cmd(f"{args.prefix} yum remove nodejs")
+            yum_remove(["nodejs"], prefix=args.prefix, yes=args.yes_s)
 
 
 def _add_subparser_nodejs(subparsers):
@@ -278,32 +283,42 @@ def python(args):
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            cmd = f"""{args.prefix} apt-get install {args.yes_s} \
-                python3 python3-dev python3-pip python3-setuptools python3-venv"""
-            run_cmd(cmd)
+            apt_install(
+                [
+                    "python3", "python3-dev", "python3-pip", "python3-setuptools",
+                    "python3-venv"
+                ],
+                prefix=args.prefix,
+                yes=args.yes_s,
+            )
         if is_macos():
             brew_install_safe(["python3"])
         if is_centos_series():
-            run_cmd(
-                f"""{args.prefix} yum install {args.yes_s} \
-                python3 python3-devel python3-pip"""
+            yum_install(
+                ["python3", "python3-devel", "python3-pip"],
+                prefix=args.prefix,
+                yes=args.yes_s,
             )
-            run_cmd(f"{args.pip} install {args.user_s} {args.pip_option} setuptools")
+            pip_install(["setuptools"], args.pip_install)
     if args.config:
         if not shutil.which("python"):
             python3 = shutil.which("python3")
             if python3:
-                Path(python3[:-1]).symlink_to(python3)
+                run_cmd(f"ln -s {python3} {python3[:-1]}")
     if args.uninstall:
         if is_ubuntu_debian():
-            cmd = f"""{args.prefix} apt-get purge {args.yes_s} \
-                python3 python3-dev python3-setuptools python3-pip python3-venv"""
-            run_cmd(cmd)
+            apt_purge(
+                [
+                    "python3", "python3-dev", "python3-setuptools", "python3-pip",
+                    "python3-venv"
+                ],
+                prefix=args.prefix,
+                yes=args.yes_s,
+            )
         if is_macos():
             run_cmd("brew uninstall python3")
         if is_centos_series():
-            run_cmd(f"{args.prefix} yum remove python3")
+            yum_remove(["python3"], prefix=args.prefix, yes=args.yes_s)
 
 
 def _python_args(subparser):
@@ -374,8 +389,7 @@ def pyjnius(args):
     """Install pyjnius for calling Java from Python.
     """
     if args.install:
-        cmd = f"{args.pip} install {args.user_s} {args.pip_option} Cython pyjnius"
-        run_cmd(cmd)
+        pip_install(["Cython", "pyjnius"], args.pip_install)
     if args.config:
         pass
     if args.uninstall:
@@ -408,8 +422,7 @@ def rustup(args):
                 """
             run_cmd(cmd)
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(f"{args.prefix} apt-get install -y cmake libssl-dev pkg-config")
+            apt_install(["cmake", "libssl-dev", "pkg-config"], prefix=args.prefix)
         run_cmd("~/.cargo/bin/cargo install cargo-edit")
     if args.config:
         _link_rust(args)
@@ -450,7 +463,6 @@ def _add_subparser_rustup(subparsers):
 def rustpython(args):
     """Install and configure RustPython.
     """
-    rustup(args)
     if args.install:
         cmd = "/root/.cargo/bin/cargo install rustpython"
         run_cmd(cmd)
@@ -472,10 +484,8 @@ def _git_ignore(args: Namespace) -> None:
         return
     srcfile = BASE_DIR / f"git/gitignore_{args.language}"
     dstfile = args.dst_dir / ".gitignore"
-    mode = "a" if args.append else "w"
-    with dstfile.open(mode) as fout:
-        fout.write(srcfile.read_text())
-    msg = f"%s is {'appended into' if mode == 'a' else 'copied to'} %s."
+    write_file(dstfile, srcfile.read_text(), append=args.append)
+    msg = f"%s is {'appended into' if args.append else 'copied to'} %s."
     logging.info(msg, srcfile, dstfile)
 
 
@@ -484,33 +494,29 @@ def git_(args) -> None:
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(f"{args.prefix} apt-get install {args.yes_s} git git-lfs")
+            apt_install(["git", "git-lfs"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             brew_install_safe(["git", "git-lfs", "bash-completion@2"])
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum install git")
+            yum_install(["git"], prefix=args.prefix, yes=args.yes_s)
         run_cmd("git lfs install")
     if args.uninstall:
         run_cmd("git lfs uninstall")
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} git git-lfs")
+            apt_purge(["git", "git-lfs"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew uninstall git git-lfs")
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum remove git")
+            yum_remove(["git"], prefix=args.prefix, yes=args.yes_s)
     if args.config:
-        ssh_client(args)
         gitconfig = HOME / ".gitconfig"
-        # try to remove the file to avoid dead symbolic link problem
-        remove_file_safe(gitconfig)
-        shutil.copy2(BASE_DIR / "git/gitconfig", gitconfig)
+        # copy_file removes the file first to avoid dead symbolic link problem
+        copy_file(BASE_DIR / "git/gitconfig", gitconfig)
         logging.info("%s is copied to %s", BASE_DIR / "git/gitconfig", gitconfig)
         if is_macos():
             file = "/usr/local/etc/bash_completion.d/git-completion.bash"
             bashrc = f"\n# Git completion\n[ -f {file} ] &&  . {file}"
-            with (HOME / ".bash_profile").open("a") as fout:
-                fout.write(bashrc)
+            write_file(HOME / ".bash_profile", bashrc, append=True)
             logging.info("Bash completion is enabled for Git.")
     _git_ignore(args)
     if "proxy" in args and args.proxy:
@@ -576,21 +582,20 @@ def antlr(args):
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(f"{args.prefix} apt-get install {args.yes_s} antlr4")
+            apt_install(["antlr4"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             brew_install_safe(["antlr4"])
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum install antlr")
+            yum_install(["antlr"], prefix=args.prefix, yes=args.yes_s)
     if args.config:
         pass
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} antlr4")
+            apt_purge(["antlr4"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew uninstall antlr4")
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum remove antlr")
+            yum_remove(["antlr"], prefix=args.prefix, yes=args.yes_s)
 
 
 def _add_subparser_antlr(subparsers):
@@ -601,8 +606,7 @@ def jpype1(args):
     """Install the Python package JPype.
     """
     if args.install:
-        cmd = f"{args.pip} install {args.user_s} {args.pip_option} JPype1"
-        run_cmd(cmd)
+        pip_install(["JPype1"], args.pip_install)
     if args.config:
         pass
     if args.uninstall:
@@ -648,8 +652,7 @@ def sphinx(args):
     :param args:
     """
     if args.install:
-        cmd = f"{args.pip} install {args.user_s} {args.pip_option} sphinx sphinx-autodoc-typehints"
-        run_cmd(cmd)
+        pip_install(["sphinx", "sphinx-autodoc-typehints"], args.pip_install)
     if args.config:
         pass
     if args.uninstall:
@@ -681,11 +684,14 @@ def pyenv(args):
             logging.info(
                 "Installing header files (for building Python and Python packages) ..."
             )
-            update_apt_source(prefix=args.prefix, seconds=1E-10)
-            cmd = f"""{args.prefix} apt-get install {args.yes_s} \
-                libssl-dev libbz2-dev libreadline-dev libsqlite3-dev libffi-dev liblzma-dev
-                """
-            run_cmd(cmd)
+            apt_install(
+                [
+                    "libssl-dev", "libbz2-dev", "libreadline-dev", "libsqlite3-dev",
+                    "libffi-dev", "liblzma-dev"
+                ],
+                prefix=args.prefix,
+                yes=args.yes_s,
+            )
     if args.config:
         update_file(
             HOME / ".bashrc",
@@ -738,17 +744,14 @@ def cmake(args):
     if args.install:
         logging.info("Installing cmake ...")
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix, seconds=1E-10)
-            cmd = f"{args.prefix} apt-get install {args.yes_s} cmake"
-            run_cmd(cmd)
+            apt_install(["cmake"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             brew_install_safe("cmake")
         elif is_win():
             pass
     if args.uninstall:
         if is_ubuntu_debian():
-            cmd = f"{args.prefix} apt-get purge {args.yes_s} cmake"
-            run_cmd(cmd)
+            apt_purge(["cmake"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew uninstall cmake")
         elif is_win():
@@ -767,20 +770,25 @@ def pg_formatter(args):
     """Install and configure pgFormatter.
     """
     if args.install:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            Repo.clone_from("https://github.com/darold/pgFormatter.git", temp_dir)
-            if is_win():
-                run_cmd(
-                    f"""cd /d {temp_dir} \
-                        && perl Makefile.PL \
-                        && make && {args.prefix} make install"""
-                )
-            else:
-                run_cmd(
-                    f"""cd {temp_dir} \
-                        && perl Makefile.PL \
-                        && make && {args.prefix} make install"""
-                )
+        from . import fetch  # pylint: disable=C0415
+        # build in the cache instead of a temporary directory
+        # whose (random) name would not survive in a plan
+        build_dir = fetch.CACHE_DIR / "build" / "pgFormatter"
+        remove_file(build_dir)
+        gitcache.clone("https://github.com/darold/pgFormatter.git", build_dir)
+        if is_win():
+            run_cmd(
+                f"""cd /d {build_dir} \
+                    && perl Makefile.PL \
+                    && make && {args.prefix} make install"""
+            )
+        else:
+            run_cmd(
+                f"""cd {build_dir} \
+                    && perl Makefile.PL \
+                    && make && {args.prefix} make install"""
+            )
+        remove_file(build_dir)
     if args.config:
         pass
     if args.uninstall:
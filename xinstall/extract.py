@@ -0,0 +1,293 @@
+"""Download and extract tarballs in a streaming pipeline.
+
+Bytes are read from the network by a thread (into a bounded queue)
+while they are decompressed (gzip, bzip2, xz or zstd) and extracted,
+so that extraction overlaps the download.
+The checksum is computed incrementally as bytes arrive
+and the tarball is copied into a (per-process) temporary file
+which is added into the download cache once the checksum is verified.
+Members are extracted (with their permissions) into a staging directory
+in the destination which is moved into place only after the checksum is verified.
+Members with absolute paths, paths escaping the destination,
+links pointing outside of the destination or device files are rejected.
+"""
+from typing import BinaryIO, Callable, List, Sequence, Union
+import io
+import os
+import queue
+import shutil
+import hashlib
+import logging
+import tarfile
+import tempfile
+import threading
+from pathlib import Path
+from . import fetch, http_client
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+# the maximum number of chunks buffered between the download and the extraction
+QUEUE_SIZE = 64
+
+
+class _Pipe(io.RawIOBase):
+    """A readable file object fed (by a thread) with chunks read from a response.
+    """
+    def __init__(self, read: Callable[[int], bytes], callback: Callable[[bytes], None]):
+        super().__init__()
+        self._queue = queue.Queue(QUEUE_SIZE)
+        self._chunk = memoryview(b"")
+        self._eof = False
+        self._closing = False
+        self._thread = threading.Thread(
+            target=self._feed, args=(read, callback), daemon=True
+        )
+        self._thread.start()
+
+    def _feed(
+        self, read: Callable[[int], bytes], callback: Callable[[bytes], None]
+    ) -> None:
+        try:
+            while not self._closing:
+                chunk = read(fetch.CHUNK_SIZE)
+                if chunk:
+                    callback(chunk)
+                self._queue.put(chunk)
+                if not chunk:
+                    return
+        except Exception as err:
+            # errors are raised in the reading thread
+            self._queue.put(err)
+
+    def _next(self) -> None:
+        item = self._queue.get()
+        if isinstance(item, Exception):
+            raise item
+        self._eof = not item
+        self._chunk = memoryview(item)
+
+    def readable(self) -> bool:
+        return True
+
+    def peek(self, size: int) -> bytes:
+        """Get (at most) the first size bytes without consuming them.
+        """
+        if not self._chunk and not self._eof:
+            self._next()
+        return bytes(self._chunk[:size])
+
+    def readinto(self, buf) -> int:
+        while not self._chunk and not self._eof:
+            self._next()
+        size = min(len(buf), len(self._chunk))
+        buf[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+    def close(self) -> None:
+        # unblock and wait for the feeding thread
+        self._closing = True
+        while self._thread.is_alive():
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        super().close()
+
+
+def _zstd_reader(fileobj: BinaryIO) -> BinaryIO:
+    try:
+        from compression import zstd  # pylint: disable=C0415
+        return zstd.ZstdFile(fileobj)
+    except ImportError:
+        pass
+    try:
+        import zstandard  # pylint: disable=C0415
+    except ImportError as err:
+        raise ImportError(
+            "The Python package zstandard is required to extract zstd tarballs!"
+        ) from err
+    return zstandard.ZstdDecompressor().stream_reader(fileobj)
+
+
+def _check_member(member: tarfile.TarInfo, dest: str) -> None:
+    """Make sure that a member of a tarball is extracted inside the destination.
+
+    :param member: A member of a tarball.
+    :param dest: The (absolute) destination directory.
+    """
+    name = member.name
+    if os.path.isabs(name) or ".." in Path(name).parts:
+        raise ValueError(f"The member {name} escapes the destination!")
+    if member.isdev():
+        raise ValueError(f"The member {name} is a device file!")
+    if member.issym():
+        target = os.path.join(dest, os.path.dirname(name), member.linkname)
+    elif member.islnk():
+        target = os.path.join(dest, member.linkname)
+    else:
+        return
+    target = os.path.normpath(target)
+    if os.path.isabs(member.linkname) or not target.startswith(dest + os.sep):
+        raise ValueError(f"The link {name} points outside of the destination!")
+
+
+def _extract_tar(fileobj: BinaryIO, dest: Path) -> None:
+    """Extract a (compressed) tarball from a stream.
+
+    :param fileobj: A readable stream supporting peek.
+    :param dest: The (existing) directory to extract the tarball into.
+    """
+    if fileobj.peek(4)[:4] == ZSTD_MAGIC:
+        fileobj, mode = _zstd_reader(fileobj), "r|"
+    else:
+        fileobj, mode = fileobj, "r|*"
+    root = str(dest.resolve())
+    kwargs = {"filter": "fully_trusted"} if hasattr(tarfile, "data_filter") else {}
+    dirs: List[tarfile.TarInfo] = []
+    with tarfile.open(fileobj=fileobj, mode=mode) as tar:
+        for member in tar:
+            _check_member(member, root)
+            if member.isdir():
+                # attributes of directories are set last (e.g., read-only ones)
+                dirs.append(member)
+                tar.extract(member, root, set_attrs=False, **kwargs)
+            else:
+                tar.extract(member, root, **kwargs)
+        for member in reversed(dirs):
+            path = os.path.join(root, member.name)
+            tar.chown(member, path, False)
+            tar.utime(member, path)
+            tar.chmod(member, path)
+
+
+def _install(staging: Path, dest: Path) -> None:
+    """Move extracted top-level entries into the destination (replacing existing ones).
+    """
+    for entry in staging.iterdir():
+        target = dest / entry.name
+        if target.is_dir() and not target.is_symlink():
+            shutil.rmtree(target)
+        elif target.exists() or target.is_symlink():
+            target.unlink()
+        os.replace(entry, target)
+
+
+def _open(urls: Sequence[str], timeout: float):
+    """Open the first available one of the URLs.
+
+    :return: The URL and its response.
+    """
+    err = None
+    for url in urls:
+        try:
+            headers = {"Accept-Encoding": "identity"}
+            resp = http_client.get(url, headers=headers, stream=True, timeout=timeout)
+            resp.raise_for_status()
+            return url, resp
+        except (OSError, ValueError) as error:
+            logging.warning("Failed to download from %s: %s", url, error)
+            err = error
+    raise err
+
+
+def extract(
+    urls: Union[str, Sequence[str]],
+    dest: Union[str, Path],
+    checksum: str = "",
+    timeout: float = fetch.TIMEOUT,
+) -> None:
+    """Download a tarball (.tar.gz, .tgz, .tar.bz2, .tar.xz or .tar.zst)
+    from (the fastest of) the specified URLs and extract it while downloading.
+    A tarball in the download cache is extracted without being downloaded
+    (a tarball cached for a URL is used without a checksum only if it is revalidated,
+    see xinstall.fetch.url_keys).
+
+    :param urls: A (list of) URL(s) of the tarball.
+    :param dest: The directory to extract the tarball into.
+    :param checksum: A checksum (<algorithm>:<hex>)
+        or the URL of a published checksum file (see xinstall.fetch.resolve_checksum).
+    :param timeout: The timeout (in seconds) of connections.
+    """
+    if isinstance(urls, str):
+        urls = [urls]
+    urls = list(urls)
+    dest = Path(dest)
+    dest.mkdir(parents=True, exist_ok=True)
+    checksum = fetch.resolve_checksum(checksum, timeout)
+    cache_ = fetch.Cache()
+    try:
+        if checksum:
+            hit = cache_.lookup([checksum])
+        else:
+            # files cached by URLs are used without a checksum only if revalidated
+            keys = [f"url:{url}" for url in urls]
+            hit = cache_.lookup(keys) and cache_.lookup(fetch.url_keys(urls, timeout))
+        cache_.count("hits" if hit else "misses")
+        if hit:
+            logging.info("Extracting the cached file %s into %s.", hit, dest)
+            with io.BufferedReader(io.FileIO(hit)) as fin:
+                _extract(fin, dest)
+        else:
+            _download_extract(cache_, urls, dest, checksum, timeout)
+    finally:
+        cache_.close()
+
+
+def _extract(fileobj: BinaryIO, dest: Path) -> None:
+    """Extract a tarball into a staging directory and move it into the destination.
+    """
+    staging = Path(tempfile.mkdtemp(prefix=".xinstall-", dir=dest))
+    try:
+        _extract_tar(fileobj, staging)
+        _install(staging, dest)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _download_extract(
+    cache_: fetch.Cache, urls: List[str], dest: Path, checksum: str, timeout: float
+) -> None:
+    """Extract a tarball while downloading it
+    and add it into the download cache once the checksum is verified.
+    """
+    if len(urls) > 1:
+        urls = fetch.rank_mirrors(urls)
+    algos = ["sha256"] + ([checksum.split(":", 1)[0]] if checksum else [])
+    hashers = {algo: hashlib.new(algo) for algo in algos}
+    fd, tmp = tempfile.mkstemp(prefix=".extract-", dir=cache_.dir / "tmp")
+    tmp = Path(tmp)
+    staging = Path(tempfile.mkdtemp(prefix=".xinstall-", dir=dest))
+    try:
+        with os.fdopen(fd, "wb") as fout:
+            url, resp = _open(urls, timeout)
+            with resp:
+                size = int(resp.headers.get("Content-Length", -1))
+                with fetch.progress_bar(size if size >= 0 else None) as bar:
+
+                    def _callback(chunk: bytes) -> None:
+                        for hasher in hashers.values():
+                            hasher.update(chunk)
+                        fout.write(chunk)
+                        bar.update(len(chunk))
+
+                    def _read(num: int) -> bytes:
+                        return http_client.read(resp, num)
+
+                    with _Pipe(_read, _callback) as pipe:
+                        _extract_tar(pipe, staging)
+                        # drain trailing bytes (e.g., padding) for the checksum
+                        while pipe.read(fetch.CHUNK_SIZE):
+                            pass
+        digests = {algo: hasher.hexdigest() for algo, hasher in hashers.items()}
+        if checksum:
+            fetch.check_digests(digests, checksum, resp.url)
+        _install(staging, dest)
+        validator = resp.headers.get("ETag") or resp.headers.get("Last-Modified")
+        keys = ([checksum] if checksum else []) + [f"url:{url}"]
+        if validator:
+            keys.append(fetch._url_key(url, validator))  # pylint: disable=W0212
+        cache_.add(tmp, digests["sha256"], keys)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+        if tmp.exists():
+            tmp.unlink()
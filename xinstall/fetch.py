@@ -0,0 +1,787 @@
+"""Download files (e.g., large artifacts from mirrors) efficiently.
+
+Mirrors are probed concurrently (a HEAD request and a small ranged GET)
+and ranked by the measured throughput (which accounts for latency).
+Throughputs of mirrors (hosts) are cached in xinstall.store with a TTL
+so that repeated installations go straight to the fastest mirror.
+
+A large file is split into byte ranges (segments) which are fetched in parallel
+from one or several mirrors (serving the same file) and written with pwrite
+into a preallocated file.
+A segment failing on a mirror is continued (from where it stopped) on the next mirror.
+The state of a partial download (validators of the file, its size
+and fetched bytes of segments) is saved in a sidecar JSON file
+so that the download is resumed (Range plus If-Range) next time.
+A partial download is locked (flock) so that xinstall processes
+downloading the same file do not write it concurrently.
+Files are downloaded in a single stream if servers do not support ranges.
+
+Downloaded files are verified against (published) checksums
+and kept in a content-addressed cache (CACHE_DIR) with an LRU size cap,
+so that reinstallations do not download them again.
+A file cached for a URL is used without a checksum only if it is revalidated,
+i.e., the validator (ETag or Last-Modified) of the URL is unchanged,
+so that files at "latest" URLs are downloaded again when they change.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+import os
+import re
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+import contextlib
+from pathlib import Path
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from . import http_client, store
+
+PROBE_BYTES = 64 * 1024
+PROBE_TIMEOUT = 5.0
+MIRROR_TTL = 3600 * 24
+TIMEOUT = 30.0
+CHUNK_SIZE = 256 * 1024
+SEGMENTS = 8
+MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "xinstall"
+CACHE_SIZE = 5 * 1024**3
+# the interval (in seconds) of saving states of partial downloads
+STATE_INTERVAL = 1.0
+# bytes of files are requested as is (without content encoding)
+_IDENTITY = {"Accept-Encoding": "identity"}
+
+
+def probe(url: str, timeout: float = PROBE_TIMEOUT) -> float:
+    """Measure the throughput of downloading a URL.
+
+    :param url: The URL to probe.
+    :param timeout: The timeout (in seconds) of each request.
+    :return: The throughput (bytes per second) of a HEAD request
+        followed by a ranged GET request of the first PROBE_BYTES bytes,
+        or 0 if the URL is not available.
+    """
+    start = time.perf_counter()
+    try:
+        http_client.head(url, retries=0, timeout=timeout).raise_for_status()
+        headers = dict(_IDENTITY, Range=f"bytes=0-{PROBE_BYTES - 1}")
+        with http_client.get(
+            url, headers=headers, stream=True, retries=0, timeout=timeout
+        ) as resp:
+            resp.raise_for_status()
+            size = len(http_client.read(resp, PROBE_BYTES))
+    except (OSError, ValueError):
+        logging.debug("The mirror %s is not available.", url)
+        return 0.0
+    return size / (time.perf_counter() - start)
+
+
+def _store_key(url: str) -> str:
+    return "mirror_throughput:" + urlsplit(url).netloc
+
+
+def rank_mirrors(
+    urls: Sequence[str], timeout: float = PROBE_TIMEOUT, ttl: float = MIRROR_TTL
+) -> List[str]:
+    """Rank URLs of a file on different mirrors by throughput (descending).
+    Mirrors whose throughput was measured in the last `ttl` seconds are not probed again
+    and the others are probed concurrently.
+
+    :param urls: URLs of a file on different mirrors.
+    :param timeout: The timeout (in seconds) of each probing request.
+    :param ttl: The time-to-live (in seconds) of measured throughputs.
+    :return: The URLs sorted by throughput (unavailable ones are placed last).
+    """
+    now = time.time()
+    throughputs = {}
+    stale = []
+    for url in urls:
+        cached = store.get_state(_store_key(url))
+        if cached and now - cached["time"] <= ttl:
+            throughputs[url] = cached["throughput"]
+        else:
+            stale.append(url)
+    if stale:
+        with ThreadPoolExecutor(max_workers=min(16, len(stale))) as executor:
+            for url, throughput in zip(
+                stale, executor.map(lambda url: probe(url, timeout), stale)
+            ):
+                throughputs[url] = throughput
+                store.put_state(_store_key(url), {"throughput": throughput, "time": now})
+    ranked = sorted(urls, key=lambda url: throughputs[url], reverse=True)
+    logging.info(
+        "Mirrors ranked by throughput: %s",
+        ", ".join(f"{url} ({throughputs[url] / 1024:.0f} KB/s)" for url in ranked)
+    )
+    return ranked
+
+
+def _url_key(url: str, validator: str = "") -> str:
+    """Get the cache key of a URL (and the validator of the file it serves).
+    """
+    return f"url:{url}#{validator}" if validator else f"url:{url}"
+
+
+def url_keys(urls: Sequence[str], timeout: float = TIMEOUT) -> List[str]:
+    """Get cache keys of URLs revalidated by HEAD requests, i.e.,
+    keys of URLs with the current validators (ETag or Last-Modified) of their files.
+    A URL is skipped if its file has no validator.
+
+    :param urls: URLs of a file.
+    :param timeout: The timeout (in seconds) of connections.
+    :return: Keys (url:<URL>#<validator>) to look up the file in the cache.
+    """
+    candidates = list(urls)[:4]
+    with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        heads = list(executor.map(lambda url: _head(url, timeout), candidates))
+    return [
+        _url_key(url, head[2])
+        for url, head in zip(candidates, heads) if head and head[2]
+    ]
+
+
+class ContentChanged(Exception):
+    """A file has changed (per its validator) since its partial download started.
+    """
+
+
+def _head(url: str, timeout: float) -> Optional[Tuple[int, bool, str]]:
+    """Get the size of a file, whether the server supports ranges
+    and the validator (ETag or Last-Modified) of the file.
+
+    :return: A tuple (size, supports ranges, validator)
+        or None if the URL is not available.
+    """
+    try:
+        resp = http_client.head(url, headers=_IDENTITY, retries=0, timeout=timeout)
+        resp.raise_for_status()
+    except (OSError, ValueError):
+        return None
+    headers = resp.headers
+    return (
+        int(headers.get("Content-Length", -1)),
+        headers.get("Accept-Ranges", "") == "bytes",
+        headers.get("ETag") or headers.get("Last-Modified") or "",
+    )
+
+
+class Segment:
+    """A byte range [first, last] of a file with the offset of the next byte to fetch.
+    """
+    def __init__(self, first: int, last: int, offset: int = None):
+        self.first = first
+        self.last = last
+        self.offset = first if offset is None else offset
+
+    def is_done(self) -> bool:
+        """Check whether all bytes of the segment have been fetched.
+        """
+        return self.offset > self.last
+
+
+def split(
+    size: int, segments: int = SEGMENTS, min_segment_size: int = MIN_SEGMENT_SIZE
+) -> List[Segment]:
+    """Split a file into segments.
+
+    :param size: The size of the file.
+    :param segments: The maximum number of segments.
+    :param min_segment_size: The minimum size of a segment.
+    :return: A list of segments covering the file.
+    """
+    count = max(1, min(segments, size // max(min_segment_size, 1)))
+    bounds = [size * idx // count for idx in range(count + 1)]
+    return [Segment(bounds[idx], bounds[idx + 1] - 1) for idx in range(count)]
+
+
+def _fetch_segment(
+    url: str,
+    fd: int,
+    seg: Segment,
+    progress: Callable[[int], None],
+    timeout: float,
+    validator: str = "",
+) -> None:
+    """Fetch the remaining bytes of a segment from a URL and write them into a file.
+    If a (strong) validator is specified,
+    the bytes are fetched only if the file is unchanged (If-Range).
+    """
+    headers = dict(_IDENTITY, Range=f"bytes={seg.offset}-{seg.last}")
+    if validator and not validator.startswith("W/"):
+        headers["If-Range"] = validator
+    with http_client.get(url, headers=headers, stream=True, timeout=timeout) as resp:
+        resp.raise_for_status()
+        if resp.status_code != 206:
+            if "If-Range" in headers:
+                raise ContentChanged(f"{url} has changed!")
+            raise ValueError(f"{url} does not support ranges!")
+        while not seg.is_done():
+            chunk = http_client.read(resp, min(CHUNK_SIZE, seg.last + 1 - seg.offset))
+            if not chunk:
+                raise ConnectionError(f"The connection to {url} is closed early!")
+            os.pwrite(fd, chunk, seg.offset)
+            seg.offset += len(chunk)
+            progress(len(chunk))
+
+
+def _fetch_segments(
+    mirrors: Dict[str, str], fd: int, segments: Sequence[Segment],
+    progress: Callable[[int], None], timeout: float
+) -> None:
+    """Fetch segments in parallel (the i-th segment starts on the i-th mirror).
+    A segment failing on a mirror is continued on the next one.
+
+    :param mirrors: A dict mapping URLs of mirrors to validators of the file.
+    """
+    urls = list(mirrors)
+
+    def _fetch(idx: int) -> None:
+        seg = segments[idx]
+        err = None
+        for attempt in range(2 * len(urls)):
+            if seg.is_done():
+                return
+            url = urls[(idx + attempt) % len(urls)]
+            try:
+                _fetch_segment(url, fd, seg, progress, timeout, mirrors[url])
+            except (OSError, ValueError) as error:
+                logging.debug(
+                    "Failed to fetch bytes %s-%s from %s.", seg.offset, seg.last, url
+                )
+                err = error
+        if not seg.is_done():
+            raise err
+
+    with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+        for _ in executor.map(_fetch, range(len(segments))):
+            pass
+
+
+def _preallocate(fd: int, size: int) -> None:
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        os.ftruncate(fd, size)
+
+
+def progress_bar(total: Optional[int], initial: int = 0):
+    """Create a progress bar (in bytes).
+
+    :param total: The total number of bytes (None if unknown).
+    :param initial: The number of bytes already downloaded.
+    """
+    from tqdm import tqdm  # pylint: disable=C0415
+    return tqdm(total=total, initial=initial, unit="B", unit_scale=True, miniters=1)
+
+
+def _state_path(path: Path) -> Path:
+    """Get the path of the sidecar file of the state of a partial download.
+    """
+    return path.with_name(path.name + ".json")
+
+
+def _save_state(
+    path: Path, size: int, mirrors: Dict[str, str], segments: Sequence[Segment]
+) -> None:
+    """Save the state (validators of URLs, size and fetched bytes of segments)
+    of a partial download (atomically).
+    """
+    state = {
+        "size": size,
+        "validators": mirrors,
+        "segments": [[seg.first, seg.last, seg.offset] for seg in segments],
+    }
+    tmp = path.with_name(path.name + ".json.tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, _state_path(path))
+
+
+def _load_state(path: Path, size: int,
+                mirrors: Dict[str, str]) -> Optional[List[Segment]]:
+    """Load segments of a partial download
+    if the file is unchanged (per its size and validators).
+    """
+    try:
+        state = json.loads(_state_path(path).read_text())
+    except (OSError, ValueError):
+        return None
+    if state.get("size") != size or not path.is_file():
+        return None
+    validators = state.get("validators", {})
+    common = [url for url in mirrors if validators.get(url)]
+    if not common or any(validators[url] != mirrors[url] for url in common):
+        return None
+    return [Segment(*seg) for seg in state["segments"]]
+
+
+def _download_segmented(
+    mirrors: Dict[str, str], path: Path, size: int, segments: int,
+    min_segment_size: int, timeout: float
+) -> None:
+    """Download a file in segments (resuming a partial download if any).
+
+    :param mirrors: A dict mapping URLs of mirrors to validators of the file.
+    """
+    segs = _load_state(path, size, mirrors)
+    if segs:
+        done = sum(seg.offset - seg.first for seg in segs)
+        logging.info("Resuming the download of %s from %s bytes.", path.name, done)
+        fd = os.open(path, os.O_WRONLY)
+    else:
+        done = 0
+        segs = split(size, segments, min_segment_size)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    lock = threading.Lock()
+    saved = [time.monotonic()]
+    try:
+        with progress_bar(size, done) as bar:
+
+            def _progress(num: int) -> None:
+                with lock:
+                    bar.update(num)
+                    if time.monotonic() - saved[0] > STATE_INTERVAL:
+                        _save_state(path, size, mirrors, segs)
+                        saved[0] = time.monotonic()
+
+            if not done:
+                _preallocate(fd, size)
+                _save_state(path, size, mirrors, segs)
+            _fetch_segments(mirrors, fd, segs, _progress, timeout)
+    finally:
+        os.close(fd)
+        with lock:
+            if all(seg.is_done() for seg in segs):
+                _unlink(_state_path(path))
+            else:
+                _save_state(path, size, mirrors, segs)
+
+
+def _download_stream(urls: Sequence[str], path: Path, timeout: float) -> None:
+    for url in urls:
+        logging.info("Downloading %s ...", url)
+        try:
+            with http_client.get(
+                url, headers=_IDENTITY, stream=True, timeout=timeout
+            ) as resp, path.open("wb") as fout:
+                resp.raise_for_status()
+                size = int(resp.headers.get("Content-Length", -1))
+                with progress_bar(size if size >= 0 else None) as bar:
+                    for chunk in iter(lambda: http_client.read(resp, CHUNK_SIZE), b""):
+                        fout.write(chunk)
+                        bar.update(len(chunk))
+            return
+        except (OSError, ValueError):
+            logging.info("Failed to download %s.", url)
+    raise RuntimeError(f"Failed to download {path.name} from: {', '.join(urls)}")
+
+
+def _fetch(
+    urls: List[str], path: Path, segments: int, min_segment_size: int, timeout: float
+) -> Dict[str, str]:
+    """Download a file from (the fastest of) the specified URLs (without caching).
+    A partial download (in segments) is resumed if the file is unchanged.
+
+    :return: A dict mapping URLs to validators (ETag or Last-Modified) of the file.
+    """
+    if len(urls) > 1:
+        urls = rank_mirrors(urls)
+    # mirrors serving the same file (size) with support of ranges
+    candidates = urls[:4]
+    with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        heads = list(executor.map(lambda url: _head(url, timeout), candidates))
+    size = next((head[0] for head in heads if head), -1)
+    mirrors = {
+        url: head[2]
+        for url, head in zip(candidates, heads) if head and head[1] and head[0] == size
+    }
+    validators = {
+        url: head[2]
+        for url, head in zip(candidates, heads) if head and head[2] and head[0] == size
+    }
+    if mirrors and size > 0 and hasattr(os, "pwrite"):
+        logging.info(
+            "Downloading %s in segments from: %s", path.name, ", ".join(mirrors)
+        )
+        try:
+            try:
+                _download_segmented(
+                    mirrors, path, size, segments, min_segment_size, timeout
+                )
+            except ContentChanged as err:
+                logging.warning("Restarting the download of %s: %s", path.name, err)
+                _unlink(_state_path(path))
+                _download_segmented(
+                    mirrors, path, size, segments, min_segment_size, timeout
+                )
+            return validators
+        except ValueError as err:
+            logging.warning("Failed to download %s in segments: %s", path.name, err)
+            _unlink(_state_path(path))
+    _download_stream(urls, path, timeout)
+    return validators
+
+
+def _parse_checksum(text: str) -> str:
+    """Parse a published checksum file, e.g., "<hex>  <file>"
+    or "<file>: <HEX HEX ...>" (possibly spanning multiple lines).
+    """
+    text = text.strip()
+    head = text.split()[0] if text else ""
+    if head.endswith(":"):
+        text = text[len(head):]
+    elif not re.fullmatch(r"[0-9a-fA-F]+", head):
+        text = text.split(":", 1)[-1]
+    else:
+        text = head
+    hexdigest = "".join(text.split()).lower()
+    if not re.fullmatch(r"[0-9a-f]{32,128}", hexdigest):
+        raise ValueError(f"Invalid checksum: {text}")
+    return hexdigest
+
+
+def resolve_checksum(checksum: str, timeout: float = TIMEOUT) -> Optional[str]:
+    """Resolve a checksum.
+
+    :param checksum: A checksum in the format <algorithm>:<hex> (e.g., sha256:ab12...)
+        or the URL of a published checksum file (e.g., https://.../spark.tgz.sha512)
+        whose extension is the algorithm.
+    :param timeout: The timeout (in seconds) of fetching a published checksum file.
+    :return: The checksum in the format <algorithm>:<hex>
+        or None if no checksum is specified or the published checksum is not available.
+    """
+    if not checksum:
+        return None
+    if not re.match(r"https?://", checksum):
+        algo, hexdigest = checksum.split(":", 1)
+        return f"{algo.lower()}:{hexdigest.lower()}"
+    algo = checksum.rsplit(".", 1)[-1].lower()
+    try:
+        resp = http_client.get(checksum, timeout=timeout)
+        resp.raise_for_status()
+        return f"{algo}:{_parse_checksum(resp.text)}"
+    except (OSError, ValueError) as err:
+        logging.warning("Failed to fetch the checksum %s: %s", checksum, err)
+        return None
+
+
+def _digests(path: Path, algos: Sequence[str]) -> Dict[str, str]:
+    """Compute digests of a file using the specified algorithms in one pass.
+    """
+    hashes = {algo: hashlib.new(algo) for algo in algos}
+    with path.open("rb") as fin:
+        for chunk in iter(lambda: fin.read(1 << 20), b""):
+            for hash_ in hashes.values():
+                hash_.update(chunk)
+    return {algo: hash_.hexdigest() for algo, hash_ in hashes.items()}
+
+
+class Cache:
+    """A content-addressed cache of downloaded files (~/.cache/xinstall).
+    Files are stored by their SHA-256 digests and looked up by (published) checksums
+    or URLs. The least recently used files are evicted when the cache exceeds its size.
+    """
+    def __init__(self, dir_: Path = None, max_size: int = None):
+        """Initialize a Cache.
+
+        :param dir_: The directory of the cache (CACHE_DIR by default).
+        :param max_size: The maximum size (in bytes) of the cache
+            (the setting cache_size or CACHE_SIZE by default).
+        """
+        self.dir = Path(dir_ or CACHE_DIR)
+        self.max_size = max_size or store.get("cache_size", CACHE_SIZE)
+        (self.dir / "objects").mkdir(parents=True, exist_ok=True)
+        (self.dir / "tmp").mkdir(exist_ok=True)
+        (self.dir / "locks").mkdir(exist_ok=True)
+        self._conn = sqlite3.connect(str(self.dir / "index.db"), timeout=30)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS keys (key TEXT PRIMARY KEY, digest TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS objects "
+                "(digest TEXT PRIMARY KEY, size INTEGER, atime REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS stats "
+                "(name TEXT PRIMARY KEY, count INTEGER)"
+            )
+
+    def close(self) -> None:
+        """Close the index of the cache.
+        """
+        self._conn.close()
+
+    def path(self, digest: str) -> Path:
+        """Get the path of a cached file.
+
+        :param digest: The SHA-256 digest of the file.
+        """
+        return self.dir / "objects" / digest[:2] / digest
+
+    def count(self, name: str) -> None:
+        """Increase a counter (e.g., hits or misses) of the cache by 1.
+
+        :param name: The name of the counter.
+        """
+        with self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO stats VALUES (?, 0)", (name, ))
+            self._conn.execute(
+                "UPDATE stats SET count = count + 1 WHERE name = ?", (name, )
+            )
+
+    def lookup(self, keys: Sequence[str]) -> Optional[Path]:
+        """Look up a cached file.
+
+        :param keys: Keys (checksums in the format <algorithm>:<hex> or url:<URL>)
+            of the file.
+        :return: The path of the cached file or None if it is not cached.
+        """
+        for key in keys:
+            row = self._conn.execute(
+                "SELECT digest FROM keys WHERE key = ?", (key, )
+            ).fetchone()
+            if row and self.path(row[0]).is_file():
+                with self._conn:
+                    self._conn.execute(
+                        "UPDATE objects SET atime = ? WHERE digest = ?",
+                        (time.time(), row[0]),
+                    )
+                return self.path(row[0])
+        return None
+
+    def add(self, file: Path, digest: str, keys: Sequence[str]) -> Path:
+        """Add a file (moved) into the cache.
+
+        :param file: The file to add (in the temporary directory of the cache).
+        :param digest: The SHA-256 digest of the file.
+        :param keys: Keys (checksums or url:<URL>) of the file.
+        :return: The path of the cached file.
+        """
+        path = self.path(digest)
+        path.parent.mkdir(exist_ok=True)
+        file.chmod(0o444)
+        os.replace(file, path)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO objects VALUES (?, ?, ?)",
+                (digest, path.stat().st_size, time.time()),
+            )
+        self.alias(digest, keys)
+        self.evict()
+        return path
+
+    def alias(self, digest: str, keys: Sequence[str]) -> None:
+        """Add keys of a cached file.
+
+        :param digest: The SHA-256 digest of the file.
+        :param keys: Keys (checksums or url:<URL>) of the file.
+        """
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO keys VALUES (?, ?)",
+                [(key, digest) for key in keys],
+            )
+
+    def evict(self) -> None:
+        """Evict the least recently used files until the cache fits its size.
+        """
+        rows = self._conn.execute(
+            "SELECT digest, size FROM objects ORDER BY atime DESC"
+        ).fetchall()
+        total = 0
+        for digest, size in rows:
+            total += size
+            if total <= self.max_size:
+                continue
+            logging.info("Evicting %s from the download cache.", digest)
+            _unlink(self.path(digest))
+            with self._conn:
+                self._conn.execute("DELETE FROM keys WHERE digest = ?", (digest, ))
+                self._conn.execute("DELETE FROM objects WHERE digest = ?", (digest, ))
+
+    def stats(self) -> Dict[str, int]:
+        """Get statistics (hits, misses, number of files and size) of the cache.
+        """
+        stats = dict(self._conn.execute("SELECT name, count FROM stats").fetchall())
+        files, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects"
+        ).fetchone()
+        return {
+            "hits": stats.get("hits", 0),
+            "misses": stats.get("misses", 0),
+            "files": files,
+            "size": size,
+        }
+
+    def clear(self) -> None:
+        """Remove all cached files.
+        """
+        shutil.rmtree(self.dir / "objects", ignore_errors=True)
+        (self.dir / "objects").mkdir()
+        with self._conn:
+            self._conn.execute("DELETE FROM keys")
+            self._conn.execute("DELETE FROM objects")
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _lock(path: Path):
+    """Hold an exclusive lock of a file across processes (not on Windows).
+    """
+    if os.name == "nt":
+        return contextlib.nullcontext()
+    from .utils import _file_lock  # pylint: disable=C0415
+    return _file_lock(path)
+
+
+def _copy(src: Path, dst: Path) -> None:
+    _unlink(dst)
+    shutil.copyfile(src, dst)
+
+
+def download(
+    urls: Union[str, Sequence[str]],
+    path: Union[str, Path],
+    checksum: str = "",
+    cache: bool = True,
+    segments: int = SEGMENTS,
+    min_segment_size: int = MIN_SEGMENT_SIZE,
+    timeout: float = TIMEOUT,
+) -> None:
+    """Download a file from (the fastest of) the specified URLs (e.g., mirrors).
+    A large file is fetched in segments in parallel from mirrors supporting ranges
+    and otherwise in a single stream (trying the URLs in order).
+    Downloaded files are verified against the checksum (if any)
+    and cached (keyed by the checksum and the URLs)
+    so that they are not downloaded again.
+    Without a checksum, a cached file is used only if the validator
+    (ETag or Last-Modified) of a URL is unchanged (see url_keys).
+
+    :param urls: A (list of) URL(s) of the file to download.
+    :param path: The path to save the downloaded file.
+    :param checksum: A checksum (<algorithm>:<hex>)
+        or the URL of a published checksum file (see resolve_checksum).
+    :param cache: Whether to use the download cache.
+    :param segments: The maximum number of segments to fetch in parallel.
+    :param min_segment_size: The minimum size (in bytes) of a segment.
+    :param timeout: The timeout (in seconds) of connections.
+    """
+    if isinstance(urls, str):
+        urls = [urls]
+    urls = list(urls)
+    path = Path(path)
+    checksum = resolve_checksum(checksum, timeout)
+    if not cache:
+        _fetch(urls, path, segments, min_segment_size, timeout)
+        if checksum:
+            _verify(path, checksum)
+        return
+    cache_ = Cache()
+    try:
+        keys = ([checksum] if checksum else []) + [_url_key(url) for url in urls]
+        if checksum:
+            hit = cache_.lookup(keys[:1])
+        else:
+            # files cached by URLs are used without a checksum only if revalidated
+            hit = cache_.lookup(keys) and cache_.lookup(url_keys(urls, timeout))
+        if hit is None and checksum:
+            # files cached without the checksum are verified before being used
+            hit = cache_.lookup(keys[1:])
+            if hit:
+                try:
+                    _verify(hit, checksum)
+                    cache_.alias(hit.name, keys[:1])
+                except ValueError:
+                    hit = None
+        if hit:
+            logging.info("Using the cached file %s for %s.", hit, path.name)
+            cache_.count("hits")
+            _copy(hit, path)
+            return
+        cache_.count("misses")
+        # partial downloads are kept (in the same path) to be resumed
+        key = hashlib.sha256("\n".join(sorted(urls)).encode()).hexdigest()[:16]
+        tmp = cache_.dir / "tmp" / f"{key}-{path.name}"
+        with _lock(cache_.dir / "locks" / f"{tmp.name}.lock"):
+            # the file might have been downloaded by another process meanwhile
+            hit = cache_.lookup(keys[:1]) if checksum else None
+            if hit:
+                _copy(hit, path)
+                return
+            validators = _fetch(urls, tmp, segments, min_segment_size, timeout)
+            keys += [_url_key(url, val) for url, val in validators.items()]
+            algos = ["sha256"] + ([checksum.split(":")[0]] if checksum else [])
+            digests = _digests(tmp, algos)
+            if checksum:
+                try:
+                    check_digests(digests, checksum, urls[0])
+                except ValueError:
+                    _unlink(tmp)
+                    raise
+            _copy(cache_.add(tmp, digests["sha256"], keys), path)
+    finally:
+        cache_.close()
+
+
+def check_digests(digests: Dict[str, str], checksum: str, name: str) -> None:
+    """Check digests of a file against a checksum.
+
+    :param digests: A dict mapping algorithms to hex digests.
+    :param checksum: A checksum (<algorithm>:<hex>).
+    :param name: The name of the file (used in the error message).
+    :raises ValueError: If the digest does not match the checksum.
+    """
+    algo, expected = checksum.split(":", 1)
+    if digests[algo] != expected:
+        raise ValueError(
+            f"The {algo} checksum of {name} ({digests[algo]}) "
+            f"does not match the expected one ({expected})!"
+        )
+
+
+def _verify(path: Path, checksum: str) -> None:
+    algo = checksum.split(":", 1)[0]
+    check_digests(_digests(path, [algo]), checksum, str(path))
+
+
+def cache(args) -> None:
+    """Show statistics of (or clear) the download cache.
+    """
+    cache_ = Cache()
+    try:
+        if args.clear:
+            cache_.clear()
+        stats = cache_.stats()
+    finally:
+        cache_.close()
+    total = stats["hits"] + stats["misses"]
+    print(f"Directory: {cache_.dir}")
+    print(f"Files: {stats['files']} ({stats['size'] / 1024**2:.1f} MB)")
+    print(
+        f"Hits: {stats['hits']}, misses: {stats['misses']}"
+        f" (hit rate: {stats['hits'] / total if total else 0:.0%})"
+    )
+
+
+def _add_subparser_cache(subparsers) -> None:
+    subparser = subparsers.add_parser(
+        "cache", help="Show statistics of (or clear) the download cache."
+    )
+    subparser.add_argument(
+        "--clear",
+        dest="clear",
+        action="store_true",
+        help="Remove all cached files."
+    )
+    subparser.set_defaults(func=cache)
+
+
+def _add_subparser_fetch(subparsers) -> None:
+    _add_subparser_cache(subparsers)
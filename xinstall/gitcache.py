@@ -0,0 +1,98 @@
+"""A local cache of bare mirrors of git repositories (CACHE_DIR/git).
+
+A repository is mirrored once (git clone --mirror) and fetched incrementally afterwards.
+Checkouts are cloned with --reference to the mirror,
+so that they take little time and only objects missing in the mirror
+are transferred over the network.
+Checkouts which outlive the cache (e.g., ~/.bash_it) are dissociated from the mirror
+(i.e., objects are copied instead of being borrowed via alternates).
+Large repositories can be mirrored and checked out as partial clones
+(e.g., --filter=blob:none) and checkouts can be shallow (--depth).
+Git commands are never recorded in (or skipped per) the ledger
+since mirrors need fetching and checkouts might have been removed.
+"""
+from typing import Union
+import re
+import hashlib
+import contextlib
+from pathlib import Path
+from urllib.parse import urlsplit
+from . import ledger, plan
+from .utils import run_cmd, is_win, _file_lock
+
+
+def mirror_path(url: str, filter_: str = "") -> Path:
+    """Get the path of the bare mirror of a git repository.
+
+    :param url: The URL of the git repository.
+    :param filter_: The object filter (e.g., blob:none) of a partial mirror.
+    :return: The path CACHE_DIR/git/<host>/<path>[.<filter digest>].git.
+    """
+    from . import fetch  # pylint: disable=C0415
+    parts = urlsplit(url)
+    name = re.sub(r"[^\w.-]+", "_", parts.path.strip("/"))
+    if name.endswith(".git"):
+        name = name[:-4]
+    if filter_:
+        name += "." + hashlib.sha256(filter_.encode()).hexdigest()[:8]
+    return fetch.CACHE_DIR / "git" / (parts.netloc or "local") / f"{name}.git"
+
+
+def _lock(path: Path):
+    """Lock a mirror across processes (not when planning or on Windows).
+    """
+    if plan.is_planning() or is_win():
+        return contextlib.nullcontext()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return _file_lock(path.with_name(path.name + ".lock"))
+
+
+def mirror(url: str, filter_: str = "") -> Path:
+    """Mirror a git repository into the cache or fetch it incrementally if mirrored.
+
+    :param url: The URL of the git repository.
+    :param filter_: The object filter (e.g., blob:none) of a partial mirror.
+    :return: The path of the bare mirror.
+    """
+    path = mirror_path(url, filter_)
+    with _lock(path), ledger.unrecorded():
+        if (path / "HEAD").is_file():
+            run_cmd(f"git -C {path} fetch --quiet --prune origin")
+        else:
+            filter_s = f"--filter={filter_}" if filter_ else ""
+            run_cmd(f"git clone --quiet --mirror {filter_s} {url} {path}")
+    return path
+
+
+def clone(
+    url: str,
+    dest: Union[str, Path],
+    branch: str = "",
+    depth: int = 0,
+    filter_: str = "",
+    dissociate: bool = False,
+    prefix: str = "",
+) -> None:
+    """Clone a git repository using its mirror in the cache as a reference.
+
+    :param url: The URL of the git repository.
+    :param dest: The directory to clone the repository into.
+    :param branch: The branch (or tag) to check out (the default branch if empty).
+    :param depth: Create a shallow clone with the specified depth (full if 0).
+    :param filter_: The object filter (e.g., blob:none) for a partial clone.
+    :param dissociate: Copy objects from the mirror instead of borrowing them
+        (for checkouts outliving the cache).
+    :param prefix: The prefix command (e.g., sudo) to clone with.
+    """
+    path = mirror(url, filter_)
+    options = [f"--reference {path}"]
+    if dissociate:
+        options.append("--dissociate")
+    if branch:
+        options.append(f"--branch {branch}")
+    if depth:
+        options.append(f"--depth {depth}")
+    if filter_:
+        options.append(f"--filter={filter_}")
+    with ledger.unrecorded():
+        run_cmd(f"{prefix} git clone --quiet {' '.join(options)} {url} {dest}")
@@ -1,14 +1,30 @@
 """GitHub related utils.
 """
+from typing import (
+    Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+)
+import os
+import sys
+import json
+import time
+import hashlib
 import logging
-import shutil
-import requests
-from packaging.version import parse
+import threading
+from pathlib import Path
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+import tomlkit
+from packaging.version import InvalidVersion, Version
 from packaging.specifiers import SpecifierSet
 from .utils import (
-    option_version, option_python, option_pip_bundle, add_subparser, run_cmd
+    option_version, option_python, option_pip_bundle, add_subparser, run_cmd, download
 )
-from . import utils
+from . import fetch, http_client, plan, utils
+
+# the number of releases per page (the maximum allowed by the GitHub API)
+PER_PAGE = 100
+# fields of assets kept in the cache of releases
+_ASSET_KEYS = ("name", "browser_download_url", "digest")
 
 
 def _github_release_url(repo: str) -> str:
@@ -26,37 +42,274 @@ def _github_release_url(repo: str) -> str:
     return f"https://api.github.com/repos/{repo}/releases"
 
 
-def _github_download(args):
-    if args.version:
-        v0 = args.version[0]
-        if v0.isdigit():
-            args.version = "==" + args.version
-        elif v0 == "v":
-            args.version = "==" + args.version[1:]
-    spec = SpecifierSet(args.version)
-    # get asserts of the first release in the specifier
-    resp = requests.get(_github_release_url(args.repo))
-    if not resp.ok:
+def _cache_file(url: str) -> Path:
+    name = hashlib.sha256(url.encode()).hexdigest()[:16]
+    return fetch.CACHE_DIR / "github" / f"{name}.json"
+
+
+def _version(tag: str) -> Optional[str]:
+    """Parse the tag of a release into a (normalized) version.
+
+    :return: The normalized version or None if the tag is not a valid version.
+    """
+    try:
+        return str(Version(tag))
+    except InvalidVersion:
+        return None
+
+
+def _release(release: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep fields of a release (and its assets) used by xinstall
+    and parse the tag of the release into a version.
+    """
+    return {
+        "tag_name": release["tag_name"],
+        "version": _version(release["tag_name"]),
+        "assets": [
+            {key: asset.get(key) for key in _ASSET_KEYS} for asset in release["assets"]
+        ],
+    }
+
+
+def _get(url: str, parse: Callable[[Any], Any]) -> Tuple[Any, str]:
+    """Get (parsed) JSON data from the GitHub API.
+    Responses are cached on disk and revalidated with If-None-Match/If-Modified-Since
+    so that an unchanged one (304) costs no API quota.
+    The cached response is used if GitHub is not available (e.g., rate limited).
+
+    :param url: A URL of the GitHub API.
+    :param parse: A function parsing the JSON data (before it is cached).
+    :return: A tuple (parsed data or None if not found, URL of the next page or "").
+    """
+    path = _cache_file(url)
+    try:
+        cached = json.loads(path.read_text())
+    except (OSError, ValueError):
+        cached = {}
+    headers = {}
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        resp = http_client.get(url, headers=headers)
+        if resp.status_code == 304 and cached:
+            logging.debug("The cached response of %s is up to date.", url)
+            return cached["data"], cached["next"]
+        if resp.status_code == 404:
+            return None, ""
         resp.raise_for_status()
-    releases = resp.json()
-    assets = next(
-        release["assets"] for release in releases if parse(release["tag_name"]) in spec
+    except OSError as err:
+        if not cached:
+            raise
+        logging.warning("Using the cached response of %s: %s", url, err)
+        return cached["data"], cached["next"]
+    cached = {
+        "etag": resp.headers.get("ETag", ""),
+        "last_modified": resp.headers.get("Last-Modified", ""),
+        "data": parse(resp.json()),
+        "next": resp.links.get("next", {}).get("url", ""),
+    }
+    if plan.is_planning():
+        return cached["data"], cached["next"]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(cached))
+    os.replace(tmp, path)
+    return cached["data"], cached["next"]
+
+
+def iter_releases(repo: str) -> Iterator[Dict[str, Any]]:
+    """Iterate releases (newest first) of a GitHub repository.
+    Pages of releases are requested (following the Link header) only when needed
+    and their metadata is cached on disk with parsed versions of tags (see _get).
+
+    :param repo: A GitHub repository (e.g., dclong/xinstall or its URL).
+    :return: An iterator of releases, each of which is a dict
+        with the keys tag_name, version (None if not a valid version) and assets.
+    """
+    url = f"{_github_release_url(repo)}?per_page={PER_PAGE}"
+    while url:
+        page, url = _get(url, lambda releases: [_release(rel) for rel in releases])
+        yield from page or ()
+
+
+def _pinned_tags(version: str) -> List[str]:
+    """Get possible tags of a pinned version (e.g., 1.2.3, v1.2.3 or ==1.2.3).
+
+    :return: Possible tags or an empty list if the version is not pinned exactly.
+    """
+    version = version.strip()
+    if version.startswith("=="):
+        version = version[2:].strip()
+    elif not version[:1].isdigit() and not version.startswith("v"):
+        return []
+    if not version or "*" in version or _version(version) is None:
+        return []
+    if version.startswith("v"):
+        return [version, version[1:]]
+    return [version, "v" + version]
+
+
+def find_release(repo: str, version: str = "") -> Dict[str, Any]:
+    """Find the newest release of a GitHub repository matching a version.
+    A pinned version is looked up by tag (one request if the tag exists)
+    and otherwise releases are iterated (page by page) until the first match.
+
+    :param repo: A GitHub repository (e.g., dclong/xinstall or its URL).
+    :param version: A version (e.g., 1.2.3 or v1.2.3) or a version specifier
+        (e.g., >=1.2,<2). The latest (non-prerelease) version is used if empty.
+    :return: The release (see iter_releases).
+    :raises LookupError: If no release matches the version.
+    """
+    url = _github_release_url(repo)
+    for tag in _pinned_tags(version):
+        release, _ = _get(f"{url}/tags/{tag}", _release)
+        if release:
+            return release
+    if version[:1].isdigit():
+        version = "==" + version
+    elif version.startswith("v"):
+        version = "==" + version[1:]
+    spec = SpecifierSet(version)
+    release = next(
+        (
+            rel for rel in iter_releases(repo)
+            if rel["version"] and spec.contains(rel["version"])
+        ),
+        None,
     )
+    if release is None:
+        raise LookupError(f"No release of {repo} matches the version {version}!")
+    return release
+
+
+def _find_asset(args) -> Dict[str, Any]:
+    # get asserts of the first release in the specifier
+    assets = find_release(args.repo, args.version)["assets"]
     # get download URL
     if args.keyword:
         filter_ = lambda name: all(kwd in name for kwd in args.keyword)
     else:
         filter_ = lambda name: True
-    url = next(
-        asset["browser_download_url"] for asset in assets if filter_(asset["name"])
-    )
+    return next(asset for asset in assets if filter_(asset["name"]))
+
+
+def _github_download(args):
+    asset = _find_asset(args)
+    url = asset["browser_download_url"]
     # download the assert
     logging.info("Downloading assert from the URL: %s", url)
-    resp = requests.get(url, stream=True)
-    if not resp.ok:
-        resp.raise_for_status()
-    with open(args.output, "wb") as fout:
-        shutil.copyfileobj(resp.raw, fout)
+    download(url, args.output, checksum=asset.get("digest") or "")
+
+
+def load_manifest(path: Union[str, Path]) -> List[Namespace]:
+    """Load entries of GitHub assets from a TOML or JSON manifest file.
+    A TOML manifest contains an array of tables named assets
+    and a JSON manifest is a list of objects (or an object with the key assets).
+    Each entry has the keys repo and output (required),
+    version, keyword (a list of keywords) and install_cmd (optional).
+
+    :param path: The path to the manifest file.
+    :return: A list of entries (with attributes named as options of `xinstall github`).
+    """
+    path = Path(path)
+    text = path.read_text()
+    if path.suffix == ".toml":
+        entries = tomlkit.loads(text).get("assets", [])
+    else:
+        entries = json.loads(text)
+        if isinstance(entries, dict):
+            entries = entries.get("assets", [])
+    manifest = []
+    for idx, entry in enumerate(entries):
+        if not entry.get("repo") or not entry.get("output"):
+            raise ValueError(f"The entry {idx} of {path} must have repo and output!")
+        keyword = entry.get("keyword", ())
+        manifest.append(
+            Namespace(
+                repo=str(entry["repo"]),
+                version=str(entry.get("version", "")),
+                keyword=[keyword] if isinstance(keyword, str) else list(keyword),
+                output=str(entry["output"]),
+                install_cmd=str(entry.get("install_cmd", "")),
+            )
+        )
+    return manifest
+
+
+class Result(NamedTuple):
+    """The status and timing of an entry of a manifest.
+    """
+    repo: str
+    status: str
+    resolve: float
+    download: float
+    install: float
+
+
+def _github_entry(entry: Namespace, lock: threading.Lock) -> Result:
+    """Resolve, download and install (serialized by lock) an entry of a manifest.
+    """
+    times = []
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        asset = _find_asset(entry)
+        times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        download(
+            asset["browser_download_url"],
+            entry.output,
+            checksum=asset.get("digest") or ""
+        )
+        times.append(time.perf_counter() - start)
+        if entry.install_cmd:
+            with lock:
+                start = time.perf_counter()
+                run_cmd(f"{entry.install_cmd} {entry.output}")
+                times.append(time.perf_counter() - start)
+    except Exception as err:
+        logging.error("Failed to fetch the asset of %s: %s", entry.repo, err)
+        status = f"failed ({type(err).__name__}: {err})"
+    times += [float("nan")] * (3 - len(times))
+    return Result(entry.repo, status, *times)
+
+
+def github_manifest(manifest: Sequence[Namespace], jobs: int = 4) -> List[Result]:
+    """Fetch GitHub assets of entries of a manifest concurrently.
+    Releases are resolved and assets are downloaded in parallel (at most jobs entries
+    at a time) and the install command of an entry runs once its download finishes
+    (install commands run one at a time).
+
+    :param manifest: Entries of GitHub assets (see load_manifest).
+    :param jobs: The number of entries to fetch concurrently.
+    :return: Results of entries (in the order of the manifest).
+    """
+    lock = threading.Lock()
+    if jobs <= 1 or plan.is_planning():
+        return [_github_entry(entry, lock) for entry in manifest]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(lambda entry: _github_entry(entry, lock), manifest))
+
+
+def report(results: Sequence[Result], file=sys.stdout) -> None:
+    """Print a table of statuses and timings of entries of a manifest.
+
+    :param results: Results of entries of a manifest.
+    :param file: The file to print to.
+    """
+    print(
+        f"{'resolve(s)':>10} {'download(s)':>11} {'install(s)':>10}  "
+        f"{'repo':<24} status",
+        file=file
+    )
+    for res in results:
+        print(
+            f"{res.resolve:10.2f} {res.download:11.2f} {res.install:10.2f}  "
+            f"{res.repo:<24} {res.status}",
+            file=file
+        )
 
 
 def github(args) -> None:
@@ -65,6 +318,15 @@ def github(args) -> None:
     :param args: The arguments to parse. 
         If None, the arguments from command-line are parsed.
     """
+    if args.manifest:
+        results = github_manifest(load_manifest(args.manifest), jobs=args.jobs)
+        report(results)
+        failed = sum(res.status != "ok" for res in results)
+        if failed:
+            raise RuntimeError(f"Failed to fetch {failed} of {len(results)} assets!")
+        return
+    if not (args.repo and args.output):
+        raise ValueError("The options --repo and --output are required!")
     _github_download(args)
     if args.install_cmd:
         run_cmd(f"{args.install_cmd} {args.output}")
@@ -76,7 +338,7 @@ def _github_args(subparser):
         "--repo",
         "--repository",
         dest="repo",
-        required=True,
+        default="",
         help="The GitHub repository from which to download the package.",
     )
     option_version(
@@ -96,7 +358,7 @@ def _github_args(subparser):
         "-o",
         "--output",
         dest="output",
-        required=True,
+        default="",
         help="The output path for the downloaded assert.",
     )
     subparser.add_argument(
@@ -106,6 +368,22 @@ def _github_args(subparser):
         default="",
         help="The output path for the downloaded assert.",
     )
+    subparser.add_argument(
+        "-m",
+        "--manifest",
+        dest="manifest",
+        default="",
+        help="A TOML/JSON manifest of assets (repo, version, keyword, output "
+        "and install_cmd) to fetch concurrently (instead of --repo and --output).",
+    )
+    subparser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=4,
+        help="The number of assets (in the manifest) to fetch concurrently.",
+    )
 
 
 def _add_subparser_github_(subparsers) -> None:
@@ -122,7 +400,7 @@ def install_py_github(args) -> None:
     """Install a Python package from GitHub.
     """
     utils.install_py_github(
-        url=args.url, user=args.user, pip=args.pip, pip_option=args.pip_option
+        url=args.urls, user=args.user, pip=args.pip, pip_option=args.pip_option
     )
 
 
@@ -130,10 +408,12 @@ def _add_subparser_install_py_github(subparsers) -> None:
     subparser = subparsers.add_parser(
         "install_py_github",
         aliases=["inpygit", "pygit", "ipg"],
-        help="Install the latest version of a Python package from GitHub."
+        help="Install the latest versions of Python packages from GitHub."
     )
     subparser.add_argument(
-        dest="url", help="The URL of the Python package's GitHub repository."
+        dest="urls",
+        nargs="+",
+        help="URLs of GitHub repositories of the Python packages."
     )
     option_pip_bundle(subparser)
     option_python(subparser)
@@ -0,0 +1,184 @@
+"""A shared HTTP client (one requests session per process) used by all network access.
+
+Connections are pooled and kept alive per host (e.g., github.com and mirrors)
+so that sub commands run in a batch (xinstall run) reuse TLS connections.
+Requests failing with connection errors or retryable statuses (429 and 5xx)
+are retried with exponential backoff and full jitter (honoring Retry-After).
+The number of retries and the backoff can be configured
+via the settings http_retries and http_backoff.
+Proxies are taken from the environment (HTTP_PROXY, HTTPS_PROXY and NO_PROXY)
+and can be overridden by the setting proxies (e.g., {"https": "http://proxy:3128"}).
+Each request is timed (see timings), logged at the debug level
+and reported by host with `xinstall --profile`.
+"""
+from typing import List, NamedTuple, Optional, Sequence
+import os
+import sys
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError
+from . import store
+
+TIMEOUT = 30.0
+RETRIES = 3
+BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+POOL_SIZE = 16
+_LOCK = threading.Lock()
+_SESSION = None
+_PID = 0
+_CONFIG = {}
+_TIMINGS = []
+
+
+class Timing(NamedTuple):
+    """Timing of a request.
+    """
+    method: str
+    url: str
+    status: int
+    start: float
+    elapsed: float
+    attempts: int
+
+
+def session() -> requests.Session:
+    """Get the shared session (created once per process).
+    """
+    global _SESSION, _PID  # pylint: disable=W0603
+    with _LOCK:
+        if _SESSION is not None and _PID == os.getpid():
+            return _SESSION
+        sess = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        sess.mount("https://", adapter)
+        sess.mount("http://", adapter)
+        _CONFIG.update(
+            retries=store.get("http_retries", RETRIES),
+            backoff=store.get("http_backoff", BACKOFF),
+            proxies=store.get("proxies", {}),
+        )
+        _SESSION, _PID = sess, os.getpid()
+        return sess
+
+
+def _delay(resp: Optional[requests.Response], backoff: float, attempt: int) -> float:
+    """Get the delay before retrying a request
+    (Retry-After if specified otherwise exponential backoff with full jitter).
+    """
+    retry_after = resp.headers.get("Retry-After", "") if resp is not None else ""
+    if retry_after.isdigit():
+        return min(float(retry_after), MAX_BACKOFF)
+    return random.uniform(0, min(backoff * 2**attempt, MAX_BACKOFF))
+
+
+def request(
+    method: str,
+    url: str,
+    retries: int = None,
+    backoff: float = None,
+    timeout: float = TIMEOUT,
+    **kwargs
+) -> requests.Response:
+    """Send a request (retrying on failures) using the shared session.
+
+    :param method: The HTTP method (e.g., GET).
+    :param url: The URL to request.
+    :param retries: The maximum number of retries
+        (the setting http_retries or RETRIES by default).
+    :param backoff: The base (in seconds) of the exponential backoff
+        (the setting http_backoff or BACKOFF by default).
+    :param timeout: The timeout (in seconds) of connecting and reading.
+    :param kwargs: Other keyword arguments (e.g., headers and stream) of requests.
+    :return: The response (of the last attempt).
+    :raises requests.RequestException: If the request fails on all attempts.
+    """
+    sess = session()
+    retries = _CONFIG["retries"] if retries is None else retries
+    backoff = _CONFIG["backoff"] if backoff is None else backoff
+    if _CONFIG["proxies"]:
+        kwargs.setdefault("proxies", _CONFIG["proxies"])
+    start = time.perf_counter()
+    for attempt in range(retries + 1):
+        resp = None
+        try:
+            resp = sess.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+        else:
+            if resp.status_code not in RETRY_STATUSES or attempt == retries:
+                break
+            resp.close()
+        delay = _delay(resp, backoff, attempt)
+        logging.debug("Retrying %s %s in %.1f seconds ...", method, url, delay)
+        time.sleep(delay)
+    elapsed = time.perf_counter() - start
+    logging.debug(
+        "%s %s: %s in %.3f seconds (%s attempts)", method, url, resp.status_code,
+        elapsed, attempt + 1
+    )
+    with _LOCK:
+        _TIMINGS.append(
+            Timing(method, url, resp.status_code, start, elapsed, attempt + 1)
+        )
+    return resp
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """Send a GET request (see request).
+    """
+    return request("GET", url, **kwargs)
+
+
+def head(url: str, **kwargs) -> requests.Response:
+    """Send a HEAD request (see request).
+    """
+    return request("HEAD", url, **kwargs)
+
+
+def read(resp: requests.Response, size: int) -> bytes:
+    """Read (at most) size raw bytes of a streamed response.
+
+    :param resp: A response of a request with stream=True.
+    :param size: The maximum number of bytes to read.
+    :return: The bytes read (empty at the end of the response).
+    :raises ConnectionError: If the connection is broken (e.g., closed early).
+    """
+    try:
+        return resp.raw.read(size)
+    except HTTPError as err:
+        raise ConnectionError(f"Failed to read the response of {resp.url}: {err}"
+                             ) from err
+
+
+def timings() -> List[Timing]:
+    """Get timings of requests.
+    """
+    with _LOCK:
+        return list(_TIMINGS)
+
+
+def report(timings_: Sequence[Timing], file=sys.stderr) -> None:
+    """Print a table of requests (and their total time) by host.
+
+    :param timings_: Timings of requests.
+    :param file: The file to print to.
+    """
+    hosts = {}
+    for timing in timings_:
+        stat = hosts.setdefault(urlsplit(timing.url).netloc, [0, 0, 0.0])
+        stat[0] += 1
+        stat[1] += timing.attempts
+        stat[2] += timing.elapsed
+    print(f"{'time(s)':>8} {'requests':>8} {'attempts':>8}  host", file=file)
+    for host, (count, attempts, elapsed) in sorted(
+        hosts.items(), key=lambda item: item[1][2], reverse=True
+    ):
+        print(f"{elapsed:8.2f} {count:8} {attempts:8}  {host}", file=file)
@@ -2,13 +2,13 @@
 """
 from typing import Union
 #import logging
-import os
+from pathlib import Path
 import shutil
-import re
 from .utils import (
-    USER, HOME, BASE_DIR, BIN_DIR, LOCAL_DIR, is_ubuntu_debian, is_centos_series,
-    update_apt_source, brew_install_safe, is_macos, run_cmd, add_subparser,
-    intellij_idea_plugin, option_pip_bundle
+    USER, HOME, BASE_DIR, LOCAL_DIR, is_ubuntu_debian, is_centos_series,
+    apt_install, apt_purge, pip_install, brew_install_safe, is_macos, run_cmd,
+    add_subparser, intellij_idea_plugin, option_pip_bundle, bin_dir,
+    yum_install, yum_remove, copy_file, mkdir, update_file, write_file
 )
 
 
@@ -17,19 +17,18 @@ def vim(args) -> None:
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(f"{args.prefix} apt-get install {args.yes_s} vim vim-nox")
+            apt_install(["vim", "vim-nox"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             brew_install_safe(["vim"])
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum install {args.yes_s} vim-enhanced")
+            yum_install(["vim-enhanced"], prefix=args.prefix, yes=args.yes_s)
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} vim vim-nox")
+            apt_purge(["vim", "vim-nox"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew uninstall vim")
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum remove vim")
+            yum_remove(["vim"], prefix=args.prefix, yes=args.yes_s)
     if args.config:
         pass
 
@@ -46,19 +45,18 @@ def neovim(args) -> None:
         run_cmd(f"{args.prefix} add-apt-repository -y ppa:neovim-ppa/unstable")
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(f"{args.prefix} apt-get install {args.yes_s} neovim")
+            apt_install(["neovim"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             brew_install_safe(["neovim"])
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum install neovim")
+            yum_install(["neovim"], prefix=args.prefix, yes=args.yes_s)
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} neovim")
+            apt_purge(["neovim"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew uninstall neovim")
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum remove neovim")
+            yum_remove(["neovim"], prefix=args.prefix, yes=args.yes_s)
     if args.config:
         pass
 
@@ -83,28 +81,20 @@ def _svim_true_color(true_color: Union[bool, None]) -> None:
     """
     if true_color is None:
         return
-    file = HOME / ".SpaceVim.d/init.toml"
-    if not file.is_file():
-        _svim_gen_config()
-    with file.open() as fin:
-        lines = fin.readlines()
-    for idx, line in enumerate(lines):
-        if line.strip().startswith("enable_guicolors"):
-            if true_color:
-                lines[idx] = line.replace("false", "true")
-            else:
-                lines[idx] = line.replace("true", "false")
-    with file.open("w") as fout:
-        fout.writelines(lines)
+    old, new = ("false", "true") if true_color else ("true", "false")
+    update_file(
+        HOME / ".SpaceVim.d/init.toml",
+        regex=[(rf"(?m)^([ \t]*enable_guicolors.*){old}", rf"\g<1>{new}")],
+    )
 
 
 def _svim_gen_config() -> None:
     """Generate init.toml for SpaceVim if it does not exist.
     """
     des_dir = HOME / ".SpaceVim.d"
-    os.makedirs(des_dir, exist_ok=True)
+    mkdir(des_dir)
     if not (des_dir / "init.toml").is_file():
-        shutil.copy2(BASE_DIR / "SpaceVim/init.toml", des_dir)
+        copy_file(BASE_DIR / "SpaceVim/init.toml", des_dir / "init.toml")
 
 
 def spacevim(args) -> None:
@@ -115,9 +105,8 @@ def spacevim(args) -> None:
         if shutil.which("nvim"):
             run_cmd('nvim --headless +"call dein#install()" +qall')
         if not args.no_lsp:
-            cmd = f"{args.pip} install {args.user_s} {args.pip_option} python-language-server[all] pyls-mypy"
+            pip_install(["python-language-server[all]", "pyls-mypy"], args.pip_install)
             # npm install -g bash-language-server javascript-typescript-langserver
-            run_cmd(cmd)
     if args.uninstall:
         run_cmd("curl -sLf https://spacevim.org/install.sh | bash -s -- --uninstall")
     if args.config:
@@ -128,8 +117,7 @@ def spacevim(args) -> None:
 
 def _svim_filetype_shiftwidth():
     vimrc = HOME / ".SpaceVim.d/vimrc"
-    with vimrc.open("a") as fout:
-        fout.write("autocmd FileType yaml set shiftwidth=2")
+    write_file(vimrc, "autocmd FileType yaml set shiftwidth=2", append=True)
 
 
 def _spacevim_args(subparser) -> None:
@@ -173,14 +161,10 @@ def bash_lsp(args) -> None:
         run_cmd(cmd)
     if args.config:
         _svim_gen_config()
-        toml = HOME / ".SpaceVim.d/init.toml"
-        with toml.open("r") as fin:
-            lines = [
-                '  "sh",' if re.search(r"^\s*#\s*(\"|')sh(\"|'),\s*$", line) else line
-                for line in fin
-            ]
-        with toml.open("w") as fout:
-            fout.writelines(lines)
+        update_file(
+            HOME / ".SpaceVim.d/init.toml",
+            regex=[(r"(?m)^[ \t]*#[ \t]*(\"|')sh(\"|'),[ \t]*$", '  "sh",')],
+        )
     if args.uninstall:
         cmd = f"{args.prefix} npm uninstall bash-language-server"
         run_cmd(cmd)
@@ -194,7 +178,7 @@ def ideavim(args) -> None:
     """Install IdeaVim for IntelliJ.
     """
     if args.config:
-        shutil.copy2(BASE_DIR / "ideavim/ideavimrc", HOME / ".ideavimrc")
+        copy_file(BASE_DIR / "ideavim/ideavimrc", HOME / ".ideavimrc")
 
 
 def _add_subparser_ideavim(subparsers) -> None:
@@ -206,23 +190,22 @@ def intellij_idea(args) -> None:
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
+            apt_install(["ubuntu-make"], prefix=args.prefix)
             des_dir = f"{LOCAL_DIR}/share/ide/idea"
-            executable = f"{BIN_DIR}/idea"
+            executable = f"{bin_dir()}/idea"
             if USER == "root":
                 des_dir = "/opt/idea"
                 executable = "/opt/idea/bin/idea.sh"
-            cmd = f"""{args.prefix} apt-get install -y ubuntu-make \
-                && umake ide idea {des_dir} \
+            cmd = f"""umake ide idea {des_dir} \
                 && ln -s {des_dir}/bin/idea.sh {executable}"""
             run_cmd(cmd)
         elif is_macos():
-            run_cmd("brew cask install intellij-idea-ce")
+            brew_install_safe(["intellij-idea-ce"], cask=True)
         elif is_centos_series():
             pass
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} intellij-idea-ce")
+            apt_purge(["intellij-idea-ce"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew cask uninstall intellij-idea-ce")
         elif is_centos_series():
@@ -236,27 +219,26 @@ def visual_studio_code(args) -> None:
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(f"{args.prefix} apt-get install {args.yes_s} vscode")
+            apt_install(["vscode"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
-            run_cmd("brew cask install visual-studio-code")
+            brew_install_safe(["visual-studio-code"], cask=True)
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum install vscode")
+            yum_install(["vscode"], prefix=args.prefix, yes=args.yes_s)
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} vscode")
+            apt_purge(["vscode"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew cask uninstall visual-studio-code")
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum remove vscode")
+            yum_remove(["vscode"], prefix=args.prefix, yes=args.yes_s)
     if args.config:
         src_file = f"{BASE_DIR}/vscode/settings.json"
         if not args.user_dir:
             args.user_dir = f"{HOME}/.config/Code/User/"
             if is_macos():
                 args.user_dir = f"{HOME}/Library/Application Support/Code/User/"
-        os.makedirs(args.user_dir, exist_ok=True)
-        shutil.copy2(src_file, args.user_dir)
+        mkdir(args.user_dir)
+        copy_file(src_file, Path(args.user_dir) / "settings.json")
 
 
 def _visual_studio_code_args(subparser) -> None:
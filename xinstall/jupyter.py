@@ -2,18 +2,19 @@
 """
 from pathlib import Path
 import logging
-import shutil
 from .utils import (
     USER,
     HOME,
-    BIN_DIR,
     BASE_DIR,
+    bin_dir,
     run_cmd,
+    copy_file,
+    mkdir,
+    pip_install,
     add_subparser,
     option_pip_bundle,
     option_jupyter,
 )
-from .dev import rustup, cmake
 
 
 def _add_subparser_jupyter(subparsers):
@@ -32,7 +33,7 @@ def nbdime(args) -> None:
     """Install and configure nbdime for comparing difference of notebooks.
     """
     if args.install:
-        run_cmd(f"{args.pip} install {args.user_s} {args.pip_option} nbdime")
+        pip_install(["nbdime"], args.pip_install)
     if args.uninstall:
         run_cmd(f"{args.pip} uninstall nbdime")
     if args.config:
@@ -70,13 +71,13 @@ def jupyterlab_lsp(args) -> None:
     """Install jupyterlab-lsp.
     """
     if args.install:
-        cmd = f"""{args.pip} install {args.user_s} {args.pip_option} \
-                    jupyter-lsp \
-                    python-language-server[all] \
-                    pyls-mypy \
-                && {args.prefix} {args.jupyter} labextension install @krassowski/jupyterlab-lsp
-                """
-        run_cmd(cmd)
+        pip_install(
+            ["jupyter-lsp", "python-language-server[all]", "pyls-mypy"],
+            args.pip_install,
+        )
+        run_cmd(
+            f"{args.prefix} {args.jupyter} labextension install @krassowski/jupyterlab-lsp"
+        )
     if args.config:
         pass
     if args.uninstall:
@@ -102,7 +103,7 @@ def beakerx(args) -> None:
     """Install/uninstall/configure the BeakerX kernels.
     """
     if args.install:
-        run_cmd(f"{args.pip} install {args.user_s} {args.pip_option} beakerx")
+        pip_install(["beakerx"], args.pip_install)
         run_cmd(f"{args.prefix} beakerx install")
         run_cmd(
             f"{args.prefix} jupyter labextension install @jupyter-widgets/jupyterlab-manager",
@@ -124,7 +125,13 @@ def _beakerx_args(subparser) -> None:
 
 
 def _add_subparser_beakerx(subparsers) -> None:
-    add_subparser(subparsers, "BeakerX", func=beakerx, aliases=["bkx", "bk"])
+    add_subparser(
+        subparsers,
+        "BeakerX",
+        func=beakerx,
+        aliases=["bkx", "bk"],
+        add_argument=_beakerx_args
+    )
 
 
 def almond(args) -> None:
@@ -138,7 +145,7 @@ def almond(args) -> None:
         args.install = True
         args.scala_version = f"--scala {args.scala_version}"
     if args.install:
-        coursier = BIN_DIR / "coursier"
+        coursier = bin_dir() / "coursier"
         run_cmd(
             f"curl -L -o {coursier} https://git.io/coursier-cli && chmod +x {coursier}"
         )
@@ -184,8 +191,6 @@ def evcxr_jupyter(args) -> None:
     cargo = HOME / ".cargo/bin/cargo"
     evcxr_jupyter = HOME / ".cargo/bin/evcxr_jupyter"
     if args.install:
-        rustup(args)
-        cmake(args)
         cmd = f"""{cargo} install --force evcxr_jupyter \
             && {evcxr_jupyter} --install"""
         run_cmd(cmd)
@@ -222,11 +227,10 @@ def jupyter_book(args):
     """Install jupyter-book.
     """
     if args.install:
-        cmd = f"{args.pip} install {args.user_s} {args.pip_option} jupyter-book"
-        run_cmd(cmd)
+        pip_install(["jupyter-book"], args.pip_install)
     if args.config:
         src_file = BASE_DIR / "jupyter-book/_config.yml"
-        shutil.copy2(src_file, ".")
+        copy_file(src_file, src_file.name)
         logging.info("%s is copied to the current directory.", src_file)
     if args.uninstall:
         pass
@@ -250,14 +254,13 @@ def ipython(args):
     """Install IPython for Python 3.
     """
     if args.install:
-        cmd = f"{args.prefix} {args.pip} install {args.user_s} {args.pip_option} ipython"
-        run_cmd(cmd)
+        pip_install(["ipython"], f"{args.prefix} {args.pip_install}")
     if args.config:
         src_dir = BASE_DIR / "ipython"
         dst_dir = args.profile_dir / "profile_default"
-        (dst_dir / "startup").mkdir(mode=0o755, parents=True, exist_ok=True)
-        shutil.copy2(src_dir / "ipython_config.py", dst_dir)
-        shutil.copy2(src_dir / "startup.ipy", dst_dir / "startup")
+        mkdir(dst_dir / "startup", mode=0o755)
+        copy_file(src_dir / "ipython_config.py", dst_dir / "ipython_config.py")
+        copy_file(src_dir / "startup.ipy", dst_dir / "startup/startup.ipy")
         logging.info(
             "%s is copied to the directory %s.", src_dir / "ipython_config.py", dst_dir
         )
@@ -296,8 +299,7 @@ def jupyterlab_vim(args):
     if args.enable or args.disable:
         args.config = True
     if args.install:
-        cmd = f"{args.prefix} {args.pip} install {args.user_s} {args.pip_option} jupyterlab_vim"
-        run_cmd(cmd)
+        pip_install(["jupyterlab_vim"], f"{args.prefix} {args.pip_install}")
     if args.config:
         if args.enable:
             cmd = f"{args.prefix} jupyter labextension enable @axlair/jupyterlab_vim"
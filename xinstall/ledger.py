@@ -0,0 +1,286 @@
+"""A ledger (SQLite) of completed steps so that re-running sub commands
+skips steps already satisfied on this host.
+
+A step (a call of a primitive in xinstall.utils, see xinstall.plan)
+with a target file (copying, editing, downloading or extracting a file)
+is recorded with a fingerprint of its inputs
+(the primitive, its arguments and the content of its source file)
+and a stamp (size and modification time) of its target.
+A later call with the same fingerprint is skipped (a primary-key lookup)
+if its target still exists and is unchanged.
+Steps without a target (e.g., shell commands, packages and pip requirements)
+are always run since whether their effects were undone
+(e.g., a cloned repository was removed) cannot be checked.
+Running a phase (e.g., uninstall) of a sub command forgets steps
+of the opposite phases (install and config) of the sub command.
+Nested steps (e.g., a shell command run by apt_install)
+and commands whose output is captured are not recorded.
+The database is opened on the first recorded step
+(so that commands without steps, e.g., `xinstall version`, do not create it)
+and steps are run without being recorded if it fails to open.
+"""
+from typing import Callable, Dict, Optional
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import contextlib
+from pathlib import Path
+
+LEDGER_FILE = Path.home() / ".xinstall.ledger.db"
+# arguments of primitives that are the source and target files of steps
+_SOURCES = {"copy_file": "srcfile"}
+_TARGETS = {
+    "copy_file": "dstfile",
+    "update_file": "path",
+    "write_file": "path",
+    "download": "path",
+    "download_extract": "dest",
+}
+_OPPOSITES = {
+    "install": ("uninstall", ),
+    "config": ("uninstall", ),
+    "uninstall": ("install", "config"),
+}
+_ACTIVE: Optional["Ledger"] = None
+_LOCAL = threading.local()
+
+
+def _digest(path: str) -> str:
+    """Get the SHA-256 digest of a (source) file or a stamp if it is not a file.
+    """
+    if not os.path.isfile(path):
+        return _stamp(path)
+    sha = hashlib.sha256()
+    with open(path, "rb") as fin:
+        for chunk in iter(lambda: fin.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _stamp(path: str) -> str:
+    """Get a stamp (size and modification time) of a (target) path.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return ""
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def fingerprint(func: str, params: Dict) -> str:
+    """Get the fingerprint of a step.
+
+    :param func: The name of the primitive of the step.
+    :param params: Arguments (JSON serializable) of the primitive.
+    :return: The SHA-256 digest of the primitive, its arguments and its source file.
+    """
+    inputs = {"func": func, "params": params}
+    src = _SOURCES.get(func)
+    if src:
+        inputs["source"] = _digest(str(params[src]))
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True,
+                                     default=str).encode()).hexdigest()
+
+
+class Ledger:
+    """A ledger of completed steps backed by a SQLite database.
+    """
+    def __init__(self, path: Path = LEDGER_FILE, force: bool = False):
+        """Initialize a Ledger.
+
+        :param path: The path of the SQLite database.
+        :param force: If true, steps are always run (and recorded).
+        """
+        self.force = force
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._failed = False
+
+    def _connect(self, create: bool) -> Optional[sqlite3.Connection]:
+        """Connect to the database lazily (with the lock held).
+
+        :param create: Whether to create the database if it does not exist.
+        :return: The connection or None if the database does not exist (and is not
+            to be created) or fails to open (in which case steps are not recorded).
+        """
+        if self._conn is not None or self._failed:
+            return self._conn
+        if not create and not self.path.exists():
+            return None
+        try:
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            with conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS steps (
+                        sub_cmd TEXT NOT NULL,
+                        fingerprint TEXT NOT NULL,
+                        phase TEXT NOT NULL,
+                        kind TEXT NOT NULL,
+                        func TEXT NOT NULL,
+                        target TEXT NOT NULL,
+                        stamp TEXT NOT NULL,
+                        time REAL NOT NULL,
+                        PRIMARY KEY (sub_cmd, fingerprint)
+                    )
+                    """
+                )
+        except sqlite3.Error as err:
+            logging.warning(
+                "Steps are not recorded since the ledger %s fails to open: %s",
+                self.path, err
+            )
+            self._failed = True
+            return None
+        self._conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Close the database.
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def is_done(self, sub_cmd: str, fp: str, target: str) -> bool:
+        """Check whether a step has been completed and its target is unchanged.
+
+        :param sub_cmd: The sub command running the step.
+        :param fp: The fingerprint of the step.
+        :param target: The target path of the step (empty if none).
+        """
+        if self.force:
+            return False
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is None:
+                return False
+            row = conn.execute(
+                "SELECT stamp FROM steps WHERE sub_cmd = ? AND fingerprint = ?",
+                (sub_cmd, fp),
+            ).fetchone()
+        if row is None or not row[0]:
+            return False
+        return row[0] == _stamp(target)
+
+    def record(
+        self, sub_cmd: str, fp: str, phase: str, kind: str, func: str, target: str
+    ) -> None:
+        """Record a completed step.
+
+        :param sub_cmd: The sub command running the step.
+        :param fp: The fingerprint of the step.
+        :param phase: The phase (install, config or uninstall) running the step.
+        :param kind: The kind of the step.
+        :param func: The name of the primitive of the step.
+        :param target: The target path of the step (empty if none).
+        """
+        with self._lock:
+            conn = self._connect(create=True)
+            if conn is None:
+                return
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        sub_cmd, fp, phase, kind, func, target,
+                        _stamp(target) if target else "", time.time()
+                    ),
+                )
+
+    def forget(self, sub_cmd: str, phase: str) -> None:
+        """Forget steps of the opposite phases of a sub command running a phase,
+        e.g., installation steps are forgotten when uninstalling.
+
+        :param sub_cmd: The sub command.
+        :param phase: The phase (install, config or uninstall) being run.
+        """
+        opposites = _OPPOSITES.get(phase, ())
+        if not opposites:
+            return
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is None:
+                return
+            with conn:
+                conn.execute(
+                    f"DELETE FROM steps WHERE sub_cmd = ? AND phase IN "
+                    f"({', '.join('?' * len(opposites))})",
+                    (sub_cmd, ) + opposites,
+                )
+
+
+def is_active() -> bool:
+    """Check whether completed steps are being recorded (and skipped).
+    """
+    return _ACTIVE is not None
+
+
+@contextlib.contextmanager
+def recording(path: Path = LEDGER_FILE, force: bool = False):
+    """Record completed steps run in the context and skip those already completed.
+
+    :param path: The path of the SQLite database.
+    :param force: If true, steps are always run (and recorded).
+    """
+    global _ACTIVE  # pylint: disable=W0603
+    _ACTIVE = Ledger(path, force=force)
+    try:
+        yield _ACTIVE
+    finally:
+        _ACTIVE.close()
+        _ACTIVE = None
+
+
+@contextlib.contextmanager
+def unrecorded():
+    """Run steps in the context without recording (or skipping) them,
+    e.g., commands which must be rerun every time (fetching a git mirror).
+    """
+    nested = getattr(_LOCAL, "nested", False)
+    _LOCAL.nested = True
+    try:
+        yield
+    finally:
+        _LOCAL.nested = nested
+
+
+def run(
+    kind: str, func: str, params: Dict, sub_cmd: str, phase: str, call: Callable
+):
+    """Run a step unless it has been completed and record it on success.
+    Steps without a target (see _TARGETS) are always run and never recorded.
+
+    :param kind: The kind of the step.
+    :param func: The name of the primitive of the step.
+    :param params: Arguments (JSON serializable) of the primitive.
+    :param sub_cmd: The sub command running the step.
+    :param phase: The phase (install, config or uninstall) running the step.
+    :param call: A function (without arguments) running the step.
+    :return: The return value of call or None if the step is skipped.
+    """
+    ledger = _ACTIVE
+    if ledger is None or getattr(_LOCAL, "nested", False) or params.get(
+        "capture_output"
+    ):
+        return call()
+    target = str(params.get(_TARGETS.get(func, ""), "") or "")
+    fp = fingerprint(func, params) if target else ""
+    if target and ledger.is_done(sub_cmd, fp, target):
+        logging.info("Skipping the completed step %s%s.", func, params)
+        return None
+    ledger.forget(sub_cmd, phase)
+    _LOCAL.nested = True
+    try:
+        result = call()
+    finally:
+        _LOCAL.nested = False
+    if target and _stamp(target):
+        ledger.record(sub_cmd, fp, phase, kind, func, target)
+    return result
@@ -1,21 +1,15 @@
 """The command-line interface for xinstall.
 """
+from typing import Union
+import sys
 import logging
 from argparse import ArgumentParser, Namespace
 from .utils import USER, is_win
-from .ai import _add_subparser_ai
-from .shell import _add_subparser_shell
-from .ide import _add_subparser_ide
-from .github import _add_subparser_github
-from .dev import _add_subparser_dev
-from .bigdata import _add_subparser_bigdata
-from .jupyter import _add_subparser_jupyter
-from .virtualization import _add_subparser_virtualization
-from .network import _add_subparser_network
-from .desktop import _add_subparser_desktop
-from .pdf import _add_subparser_pdf
+from . import registry
 
 __version__ = "0.39.3"
+# options of the main parser which take a value
+_OPTIONS_WITH_VALUE = ("-l", "--level", "--prefix", "--trace", "--save-plan")
 
 
 def version(args):  # pylint: disable=W0613
@@ -32,15 +26,39 @@ def _add_subparser_version(subparsers):
     return subparser
 
 
-def parse_args(args=None, namespace=None) -> Namespace:
-    """Parse command-line arguments.
-    
-    :param args: The arguments to parse. 
-        If None, the arguments from command-line are parsed.
-    :param namespace: An inital Namespace object.
-    :return: A namespace object containing parsed options.
+def _sub_cmd(args=None) -> str:
+    """Get the sub command (without parsing) from command-line arguments.
+
+    :param args: The arguments to parse.
+        If None, the arguments from command-line are used.
+    :return: The sub command or an empty string if no sub command is specified.
+    """
+    args = iter(sys.argv[1:] if args is None else args)
+    for arg in args:
+        if arg.startswith("--") and "=" not in arg and any(
+            opt.startswith(arg) for opt in _OPTIONS_WITH_VALUE if opt.startswith("--")
+        ):
+            next(args, None)
+            continue
+        if arg in _OPTIONS_WITH_VALUE:
+            next(args, None)
+            continue
+        if arg.startswith("-"):
+            continue
+        return arg
+    return ""
+
+
+def create_parser(sub_cmd: Union[str, None] = "") -> ArgumentParser:
+    """Create the parser of command-line arguments.
+
+    :param sub_cmd: The sub command to be run.
+        Only the module owning the sub command is imported.
+        If None, all modules are imported.
+    :return: The parser of command-line arguments.
     """
     parser = ArgumentParser(
+        prog="xinstall",
         description="Easy installation and configuration for Unix/Linux"
     )
     parser.add_argument(
@@ -66,20 +84,56 @@ def parse_args(args=None, namespace=None) -> Namespace:
         const="sudo",
         help="The prefix command (e.g., sudo) to use."
     )
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store_true",
+        help="Print timing and resource usage of shell commands at the end."
+    )
+    parser.add_argument(
+        "--trace",
+        dest="trace",
+        default="",
+        help="Write timing of shell commands into a Chrome trace-event JSON file."
+    )
+    parser.add_argument(
+        "--dry-run",
+        dest="dry_run",
+        action="store_true",
+        help="Print the plan (steps to run) without running it."
+    )
+    parser.add_argument(
+        "--save-plan",
+        dest="save_plan",
+        default="",
+        help="Save the plan (steps to run) into a JSON file (which can be replayed"
+        " using `xinstall replay`) without running it."
+    )
+    parser.add_argument(
+        "--force",
+        dest="force",
+        action="store_true",
+        help="Run steps even if they have been completed"
+        " (per the ledger ~/.xinstall.ledger.db)."
+    )
     subparsers = parser.add_subparsers(dest="sub_cmd", help="Sub commands.")
     _add_subparser_version(subparsers)
-    _add_subparser_ide(subparsers)
-    _add_subparser_dev(subparsers)
-    _add_subparser_bigdata(subparsers)
-    _add_subparser_github(subparsers)
-    _add_subparser_ai(subparsers)
-    _add_subparser_network(subparsers)
-    _add_subparser_pdf(subparsers)
-    _add_subparser_jupyter(subparsers)
-    _add_subparser_desktop(subparsers)
-    _add_subparser_shell(subparsers)
-    _add_subparser_virtualization(subparsers)
-    # --------------------------------------------------------
+    registry.add_subparsers(subparsers, sub_cmd)
+    return parser
+
+
+def parse_args(args=None, namespace=None, parser=None) -> Namespace:
+    """Parse command-line arguments.
+    
+    :param args: The arguments to parse. 
+        If None, the arguments from command-line are parsed.
+    :param namespace: An inital Namespace object.
+    :param parser: A parser (created by create_parser) to use.
+        If None, a parser is created for the sub command in args.
+    :return: A namespace object containing parsed options.
+    """
+    if parser is None:
+        parser = create_parser(_sub_cmd(args))
     args = parser.parse_args(args=args, namespace=namespace)
     args.yes_s = "--yes" if args.yes else ""
     if "user" in args:
@@ -88,23 +142,81 @@ def parse_args(args=None, namespace=None) -> Namespace:
         args.prefix = ""
     if "pip_option" in args:
         args.pip_option = " ".join(
-            f"--{option}" for option in args.pip_option.split(",")
+            f"--{option}" for option in args.pip_option.split(",") if option
         )
         args.pip_install = f"{args.pip} install {args.user_s} {args.pip_option}"
     return args
 
 
-def main():
-    """Run xinstall command-line interface.
+def _dry_run(args: Namespace) -> None:
+    """Compile the sub command into a plan and print and/or save it.
+    """
+    # pylint: disable=C0415
+    import tempfile
+    from . import plan
+    from .utils import distro_id
+    from .scheduler import run_targets
+    # import all modules, detect the OS and find the temporary directory beforehand
+    # as they might run commands or write files (e.g., GitPython runs `git --version`)
+    create_parser(None)
+    distro_id()
+    tempfile.gettempdir()
+    try:
+        with plan.planning() as steps:
+            run_targets([args])
+    except plan.SideEffectError as err:
+        sys.exit(str(err))
+    if args.dry_run:
+        for step in steps:
+            print(step)
+    if args.save_plan:
+        plan.dump(steps, args.save_plan)
+
+
+def run(args=None, parser=None) -> None:
+    """Parse command-line arguments and run the corresponding sub command.
+
+    :param args: The arguments to parse.
+        If None, the arguments from command-line are parsed.
+    :param parser: A parser (created by create_parser) to use.
+        If None, a parser is created for the sub command in args.
     """
-    args = parse_args()
+    args = parse_args(args, parser=parser)
     logging.basicConfig(
         format=
         "%(asctime)s | %(module)s.%(funcName)s: %(lineno)s | %(levelname)s: %(message)s",
         level=getattr(logging, args.level.upper())
     )
     logging.debug("Command-line options:\n%s", args)
-    args.func(args)
+    from .scheduler import run_targets  # pylint: disable=C0415
+    if args.dry_run or args.save_plan:
+        _dry_run(args)
+        return
+    from . import ledger  # pylint: disable=C0415
+    if not (args.profile or args.trace):
+        with ledger.recording(force=args.force):
+            run_targets([args])
+        return
+    from . import profiling  # pylint: disable=C0415
+    profiling.enable()
+    try:
+        with ledger.recording(force=args.force):
+            run_targets([args])
+    finally:
+        if args.profile:
+            profiling.report(profiling.records())
+            # requests are reported only if any network access happened
+            http_client = sys.modules.get(f"{__package__}.http_client")
+            if http_client:
+                http_client.report(http_client.timings())
+        if args.trace:
+            profiling.write_trace(profiling.records(), args.trace)
+
+
+def main():
+    """Run xinstall command-line interface.
+    """
+    run()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,7 @@
 #!/usr/bin/env python3
 """Easy installation and configuration of Linux/Mac/Windows apps.
 """
-import os
 import logging
-import shutil
 from pathlib import Path
 from argparse import Namespace
 from .utils import (
@@ -11,14 +9,20 @@ from .utils import (
     USER,
     BASE_DIR,
     run_cmd,
+    copy_file,
+    mkdir,
+    pip_install,
     add_subparser,
-    update_apt_source,
+    apt_install,
+    apt_purge,
     brew_install_safe,
     is_ubuntu_debian,
     is_linux,
     is_macos,
     is_centos_series,
     option_pip_bundle,
+    yum_install,
+    yum_remove,
 )
 
 
@@ -27,13 +31,14 @@ def ssh_server(args) -> None:
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(
-                f"{args.prefix} apt-get install {args.yes_s} openssh-server fail2ban"
+            apt_install(
+                ["openssh-server", "fail2ban"], prefix=args.prefix, yes=args.yes_s
             )
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} openssh-server fail2ban")
+            apt_purge(
+                ["openssh-server", "fail2ban"], prefix=args.prefix, yes=args.yes_s
+            )
         elif is_macos():
             pass
         elif is_centos_series():
@@ -44,11 +49,6 @@ def _add_subparser_ssh_server(subparsers):
     add_subparser(subparsers, "SSH server", func=ssh_server, aliases=["sshs"])
 
 
-def _ignore_socket(dir_, files):
-    dir_ = Path(dir_)
-    return [file for file in files if (dir_ / file).is_socket()]
-
-
 def _sshc_copy_from_host(ssh_home: Path):
     """Copy configuration files from /home_host/USER/.ssh if it exists.
 
@@ -56,19 +56,18 @@ def _sshc_copy_from_host(ssh_home: Path):
     """
     ssh_src = Path(f"/home_host/{USER}/.ssh")
     if ssh_src.is_dir():
-        # inside a Docker container, use .ssh from host
-        try:
-            shutil.rmtree(ssh_home)
-        except FileNotFoundError:
-            pass
-        shutil.copytree(ssh_src, ssh_home, ignore=_ignore_socket)
+        # inside a Docker container, use .ssh from host (without sockets)
+        run_cmd(
+            f"rm -rf {ssh_home} && cp -R {ssh_src} {ssh_home} "
+            f"&& find {ssh_home} -type s -delete"
+        )
         logging.info("%s is copied to %s.", ssh_src, ssh_home)
 
 
 def _sshc_copy_config(ssh_home: Path):
     src = BASE_DIR / "ssh/client/config"
     des = ssh_home / "config"
-    shutil.copy2(src, des)
+    copy_file(src, des)
     logging.info("%s is copied to %s.", src, ssh_home)
 
 
@@ -80,20 +79,19 @@ def ssh_client(args) -> None:
     if args.config:
         ssh_home = HOME / ".ssh"
         _sshc_copy_from_host(ssh_home)
-        ssh_home.mkdir(exist_ok=True)
+        mkdir(ssh_home)
         _sshc_copy_config(ssh_home)
-        control = ssh_home / "control"
-        control.mkdir(exist_ok=True)
-        control.chmod(0o700)
+        mkdir(ssh_home / "control", mode=0o700)
         if is_linux() or is_macos():
             cmd = f"{args.prefix} chown -R {USER}:`id -g {USER}` {HOME}/.ssh"
             run_cmd(cmd)
-        for path in ssh_home.glob("**/*"):
-            if path.is_file():
-                path.chmod(0o600)
-            else:
-                path.chmod(0o700)
-        logging.info("The permissions of ~/.ssh and its contents are corrected set.")
+            run_cmd(
+                f"find {ssh_home} -mindepth 1 -type f -exec chmod 600 {{}} + "
+                f"&& find {ssh_home} -mindepth 1 -type d -exec chmod 700 {{}} +"
+            )
+            logging.info(
+                "The permissions of ~/.ssh and its contents are corrected set."
+            )
 
 
 def _add_subparser_ssh_client(subparsers):
@@ -107,28 +105,26 @@ def proxychains(args) -> None:
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            cmd = f"""{args.prefix} apt-get install {args.yes_s} proxychains4 \
-                    && {args.prefix} ln -svf /usr/bin/proxychains4 /usr/bin/proxychains"""
-            run_cmd(cmd)
+            apt_install(["proxychains4"], prefix=args.prefix, yes=args.yes_s)
+            run_cmd(f"{args.prefix} ln -svf /usr/bin/proxychains4 /usr/bin/proxychains")
         elif is_macos():
             brew_install_safe(["proxychains-ng"])
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum install proxychains")
+            yum_install(["proxychains"], prefix=args.prefix, yes=args.yes_s)
     if args.config:
         print("Configuring proxychains ...")
         src_file = BASE_DIR / "proxychains/proxychains.conf"
-        des_dir = os.path.join(HOME, ".proxychains")
-        os.makedirs(des_dir, exist_ok=True)
-        shutil.copy2(src_file, des_dir)
+        des_dir = HOME / ".proxychains"
+        mkdir(des_dir)
+        copy_file(src_file, des_dir / src_file.name)
         logging.info("%s is copied to the directory %s", src_file, des_dir)
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} proxychains4")
+            apt_purge(["proxychains4"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew uninstall proxychains-ng")
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum remove proxychains")
+            yum_remove(["proxychains"], prefix=args.prefix, yes=args.yes_s)
 
 
 def _add_subparser_proxychains(subparsers):
@@ -142,11 +138,12 @@ def dryscrape(args):
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            cmd = f"""{args.prefix} apt-get install {args.yes_s} qt5-default libqt5webkit5-dev build-essential xvfb \
-                && {args.pip} install {args.user_s} {args.pip_option} dryscrape
-                """
-            run_cmd(cmd)
+            apt_install(
+                ["qt5-default", "libqt5webkit5-dev", "build-essential", "xvfb"],
+                prefix=args.prefix,
+                yes=args.yes_s,
+            )
+            pip_install(["dryscrape"], args.pip_install)
         elif is_macos():
             pass
         elif is_centos_series():
@@ -183,15 +180,14 @@ def download_tools(args: Namespace):
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(f"{args.prefix} apt-get install {args.yes_s} wget curl aria2", )
+            apt_install(["wget", "curl", "aria2"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             brew_install_safe(["wget", "curl", "aria2"])
         elif is_centos_series():
             pass
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} wget curl aria2")
+            apt_purge(["wget", "curl", "aria2"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew uninstall wget curl aria2")
         elif is_centos_series():
@@ -211,12 +207,12 @@ def iptables(args: Namespace):
     """
     if args.install:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get install {args.yes_s} iptables")
+            apt_install(["iptables"], prefix=args.prefix, yes=args.yes_s)
     if args.config:
         pass
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} iptables")
+            apt_purge(["iptables"], prefix=args.prefix, yes=args.yes_s)
 
 
 def _add_subparser_iptables(subparsers):
@@ -230,7 +226,7 @@ def sshuttle(args: Namespace):
     """
     if args.install:
         iptables(args)
-        run_cmd(f"{args.pip} install {args.user_s} {args.pip_option} sshuttle")
+        pip_install(["sshuttle"], args.pip_install)
     if args.config:
         pass
     if args.uninstall:
@@ -3,12 +3,14 @@
 from .utils import (
     is_ubuntu_debian,
     is_centos_series,
-    update_apt_source,
+    apt_install,
     brew_install_safe,
     is_macos,
     run_cmd,
+    pip_install,
     add_subparser,
     option_pip_bundle,
+    yum_install,
 )
 
 
@@ -17,21 +19,22 @@ def pdftotext(args):
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(
-                f"""{args.prefix} apt-get {args.yes_s} install build-essential libpoppler-cpp-dev pkg-config \
-                    && {args.pip} install {args.user_s} {args.pip_option} pdftotext
-                """
+            apt_install(
+                ["build-essential", "libpoppler-cpp-dev", "pkg-config"],
+                prefix=args.prefix,
+                yes=args.yes_s,
             )
+            pip_install(["pdftotext"], args.pip_install)
         if is_macos():
             brew_install_safe(["pkg-config", "poppler"])
-            run_cmd("{args.pip} install {args.user_s} {args.pip_option} pdftotext")
+            pip_install(["pdftotext"], args.pip_install)
         if is_centos_series():
-            run_cmd(
-                f"""{args.prefix} yum install {args.yes_s} gcc-c++ pkgconfig poppler-cpp-devel \
-                    && {args.pip} install {args.user_s} {args.pip_option} pdftotext
-                    """
+            yum_install(
+                ["gcc-c++", "pkgconfig", "poppler-cpp-devel"],
+                prefix=args.prefix,
+                yes=args.yes_s,
             )
+            pip_install(["pdftotext"], args.pip_install)
     if args.uninstall:
         run_cmd(f"{args.pip} uninstall pdftotext")
 
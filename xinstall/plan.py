@@ -0,0 +1,237 @@
+"""Compile sub commands into plans of steps (xinstall --dry-run)
+and replay saved plans (xinstall replay).
+
+Primitives in xinstall.utils (run_cmd, apt_install, pip_install, download, update_file, etc.)
+are decorated with `step`.
+When planning, calling a primitive appends a step (the primitive and its arguments)
+to the plan instead of running it,
+so that a handler compiles into the steps it would run on the current host.
+A plan is serializable (JSON) and can be replayed on identical hosts
+without evaluating the handlers again.
+Side effects not expressed as steps (e.g., writing files directly)
+abort planning with SideEffectError.
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+import os
+import sys
+import json
+import logging
+import functools
+import contextlib
+from pathlib import Path
+from . import ledger, profiling
+
+KINDS = ("package", "pip", "download", "copy", "edit", "shell")
+_STEPS: Optional[List["Step"]] = None
+_GUARDED_EVENTS = {
+    "os.chmod",
+    "os.chown",
+    "os.link",
+    "os.mkdir",
+    "os.remove",
+    "os.rename",
+    "os.rmdir",
+    "os.symlink",
+    "os.system",
+    "os.truncate",
+    "os.posix_spawn",
+    "os.spawn",
+    "os.exec",
+    "shutil.copyfile",
+    "shutil.copytree",
+    "shutil.move",
+    "shutil.rmtree",
+    "subprocess.Popen",
+}
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_TRUNC
+_HOOKED = False
+
+
+class SideEffectError(RuntimeError):
+    """A side effect which is not expressed as a step happens when planning.
+    """
+
+
+class Step(NamedTuple):
+    """A step of a plan, i.e., a call of a primitive in xinstall.utils.
+    """
+    kind: str
+    func: str
+    params: Dict[str, Any]
+    sub_cmd: str = ""
+    phase: str = ""
+
+    def __str__(self) -> str:
+        if self.kind == "shell":
+            cmd = self.params["cmd"]
+            desc = " ".join(cmd.split() if isinstance(cmd, str) else cmd)
+        else:
+            desc = ", ".join(
+                f"{key}={val!r}" for key, val in self.params.items() if val
+            )
+            desc = f"{self.func}({desc})"
+        tag = ":".join(filter(None, (self.sub_cmd, self.phase)))
+        return f"[{tag}] {self.kind}: {desc}"
+
+
+def is_planning() -> bool:
+    """Check whether sub commands are being compiled into a plan.
+    """
+    return _STEPS is not None
+
+
+def _jsonable(val):
+    if isinstance(val, Path):
+        return str(val)
+    if isinstance(val, (list, tuple)):
+        return [_jsonable(v) for v in val]
+    if isinstance(val, dict):
+        return {key: _jsonable(v) for key, v in val.items()}
+    return val
+
+
+def step(kind: str, record: bool = True) -> Callable:
+    """A decorator making a primitive emit a step of the specified kind when planning.
+    When not planning, the step is recorded in (and skipped if completed per)
+    the active ledger (see xinstall.ledger).
+
+    :param kind: The kind (package, pip, download, copy, edit or shell) of the step.
+    :param record: Whether to record the step in the active ledger.
+        Steps which need to be rerun (e.g., updating apt sources) are not recorded.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            steps = _STEPS
+            if steps is None and not (record and ledger.is_active()):
+                return func(*args, **kwargs)
+            import inspect  # pylint: disable=C0415
+            bound = inspect.signature(func).bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = _jsonable(bound.arguments)
+            sub_cmd, phase = profiling.tag()
+            if steps is None:
+                return ledger.run(
+                    kind, func.__name__, params, sub_cmd, phase,
+                    lambda: func(*args, **kwargs)
+                )
+            steps.append(Step(kind, func.__name__, params, sub_cmd, phase))
+            return None
+
+        return wrapper
+
+    return decorator
+
+
+def _is_write(mode: Optional[str], flags: int) -> bool:
+    if mode is not None:
+        return any(char in mode for char in "wax+")
+    return bool(flags & _WRITE_FLAGS)
+
+
+def _guard(event: str, args) -> None:
+    if _STEPS is None:
+        return
+    if event == "open":
+        path, mode, flags = args
+        if not _is_write(mode, flags):
+            return
+    elif event not in _GUARDED_EVENTS:
+        return
+    if any("__pycache__" in str(arg) for arg in args):
+        return
+    raise SideEffectError(
+        f"The side effect {event}{tuple(args)} is not expressed as a step "
+        "and cannot be planned."
+    )
+
+
+@contextlib.contextmanager
+def planning():
+    """Compile sub commands run in the context into a plan (a list of steps).
+    Sub commands are run sequentially when planning.
+    """
+    global _STEPS, _HOOKED  # pylint: disable=W0603
+    if not hasattr(sys, "addaudithook"):
+        sys.exit("Planning (--dry-run) requires Python 3.8+.")
+    if not _HOOKED:
+        sys.addaudithook(_guard)
+        _HOOKED = True
+    _STEPS = []
+    try:
+        yield _STEPS
+    finally:
+        _STEPS = None
+
+
+def dump(steps: List[Step], path: str) -> None:
+    """Save a plan into a JSON file.
+
+    :param steps: Steps of the plan.
+    :param path: The path of the JSON file.
+    """
+    from . import utils  # pylint: disable=C0415
+    from .main import __version__  # pylint: disable=C0415
+    plan = {
+        "xinstall": __version__,
+        "platform": sys.platform,
+        "distro": utils.distro_id(),
+        "steps": [step_._asdict() for step_ in steps],
+    }
+    with open(path, "w") as fout:
+        json.dump(plan, fout, indent=2)
+
+
+def load(path: str) -> dict:
+    """Load a plan from a JSON file.
+
+    :param path: The path of the JSON file.
+    :return: The plan with steps as Step objects.
+    """
+    with open(path) as fin:
+        plan = json.load(fin)
+    plan["steps"] = [Step(**step_) for step_ in plan["steps"]]
+    return plan
+
+
+def execute(step_: Step) -> None:
+    """Run a step.
+
+    :param step_: The step to run.
+    """
+    from . import utils  # pylint: disable=C0415
+    logging.info("%s", step_)
+    getattr(utils, step_.func)(**step_.params)
+
+
+def replay(args) -> None:
+    """Replay a plan saved by xinstall --dry-run --save-plan.
+    """
+    from . import utils  # pylint: disable=C0415
+    plan = load(args.plan)
+    host = (sys.platform, utils.distro_id())
+    if (plan["platform"], plan["distro"]) != host and not args.ignore_platform:
+        sys.exit(
+            f"The plan was compiled on {plan['platform']}/{plan['distro']} "
+            f"which differs from the current host {host[0]}/{host[1]}!"
+        )
+    for step_ in plan["steps"]:
+        execute(step_)
+
+
+def _add_subparser_replay(subparsers) -> None:
+    subparser = subparsers.add_parser(
+        "replay", help="Replay a plan saved by xinstall --dry-run --save-plan."
+    )
+    subparser.add_argument(dest="plan", help="The path of the plan (JSON) to replay.")
+    subparser.add_argument(
+        "--ignore-platform",
+        dest="ignore_platform",
+        action="store_true",
+        help="Replay the plan even if it was compiled on a different platform."
+    )
+    subparser.set_defaults(func=replay)
+
+
+def _add_subparser_plan(subparsers) -> None:
+    _add_subparser_replay(subparsers)
@@ -0,0 +1,248 @@
+"""Profile shell commands run by sub commands (xinstall --profile).
+
+Each command run by utils.run_cmd is timed and its resource usage
+(user/sys CPU time, max RSS and I/O bytes) is collected via os.wait4.
+Commands are tagged with the sub command running them
+and the phase (install, config or uninstall) inferred from the handler's source code,
+i.e., the `if args.<phase>:` block containing the (innermost) call in the handler.
+Commands of coalesced transactions are attributed to the sub command flushing them.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+import os
+import sys
+import json
+import logging
+import time
+import threading
+import functools
+import contextlib
+import subprocess as sp
+
+PHASES = ("install", "config", "uninstall")
+_ENABLED = False
+_RECORDS = []
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+_EPOCH = time.perf_counter()
+
+
+class Record(NamedTuple):
+    """Timing and resource usage of a command.
+    """
+    cmd: str
+    sub_cmd: str
+    phase: str
+    start: float
+    wall: float
+    user_time: float
+    sys_time: float
+    maxrss: int
+    read_bytes: int
+    write_bytes: int
+    thread: int
+
+
+def enable() -> None:
+    """Enable profiling of commands (not supported on platforms without os.wait4).
+    """
+    global _ENABLED  # pylint: disable=W0603
+    if not hasattr(os, "wait4"):
+        logging.warning("Profiling is not supported on this platform!")
+        return
+    _ENABLED = True
+
+
+def is_enabled() -> bool:
+    """Check whether profiling is enabled.
+    """
+    return _ENABLED
+
+
+def records() -> List[Record]:
+    """Get records of profiled commands.
+    """
+    with _LOCK:
+        return list(_RECORDS)
+
+
+@contextlib.contextmanager
+def tagged(args):
+    """Tag commands run in the current thread with the sub command of args.
+
+    :param args: Parsed arguments of a sub command.
+    """
+    prev = getattr(_LOCAL, "args", None)
+    _LOCAL.args = args
+    try:
+        yield
+    finally:
+        _LOCAL.args = prev
+
+
+@functools.lru_cache()
+def _phase_ranges(code) -> Tuple[Tuple[int, int, str], ...]:
+    """Get line ranges of `if args.<phase>:` blocks in the source code of a handler.
+    """
+    import ast  # pylint: disable=C0415
+    import inspect  # pylint: disable=C0415
+    import textwrap  # pylint: disable=C0415
+    try:
+        src = textwrap.dedent(inspect.getsource(code))
+    except (OSError, TypeError):
+        return ()
+    offset = code.co_firstlineno - 1
+    ranges = []
+    for node in ast.walk(ast.parse(src)):
+        if not (
+            isinstance(node, ast.If) and isinstance(node.test, ast.Attribute) and
+            isinstance(node.test.value, ast.Name) and node.test.value.id == "args" and
+            node.test.attr in PHASES
+        ):
+            continue
+        last = max(
+            getattr(child, "lineno", 0)
+            for stmt in node.body for child in ast.walk(stmt)
+        )
+        ranges.append((node.lineno + offset, last + offset, node.test.attr))
+    return tuple(ranges)
+
+
+def tag() -> Tuple[str, str]:
+    """Get the sub command and phase of the handler calling this function (indirectly)
+    in the current thread.
+    """
+    args = getattr(_LOCAL, "args", None)
+    if args is None:
+        return "", ""
+    code = getattr(args.func, "__code__", None)
+    frame = sys._getframe(1)  # pylint: disable=W0212
+    while frame is not None and frame.f_code is not code:
+        frame = frame.f_back
+    if frame is None:
+        return args.sub_cmd, ""
+    for first, last, phase in _phase_ranges(code):
+        if first <= frame.f_lineno <= last:
+            return args.sub_cmd, phase
+    return args.sub_cmd, ""
+
+
+def _exit_code(status: int) -> int:
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run(
+    cmd: Union[Sequence[str], str], shell: bool, capture_output: bool
+) -> sp.CompletedProcess:
+    """Run a command (without checking its exit code) and record its resource usage.
+
+    :param cmd: The command to run.
+    :param shell: Whether to run the command in a shell.
+    :param capture_output: Whether to capture stdout and stderr of the command.
+    :return: The completed process.
+    """
+    sub_cmd, phase = tag()
+    pipe = sp.PIPE if capture_output else None
+    start = time.perf_counter()
+    proc = sp.Popen(cmd, shell=shell, stdout=pipe, stderr=pipe)
+    outputs: Dict[str, Optional[bytes]] = {"stdout": None, "stderr": None}
+
+    def _read(name: str) -> None:
+        outputs[name] = getattr(proc, name).read()
+
+    readers = [
+        threading.Thread(target=_read, args=(name, ))
+        for name in outputs if capture_output
+    ]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    proc.returncode = _exit_code(status)
+    for stream in (proc.stdout, proc.stderr):
+        if stream:
+            stream.close()
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    maxrss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    record = Record(
+        cmd=cmd if isinstance(cmd, str) else " ".join(cmd),
+        sub_cmd=sub_cmd,
+        phase=phase,
+        start=start - _EPOCH,
+        wall=wall,
+        user_time=usage.ru_utime,
+        sys_time=usage.ru_stime,
+        maxrss=maxrss,
+        read_bytes=usage.ru_inblock * 512,
+        write_bytes=usage.ru_oublock * 512,
+        thread=threading.get_ident(),
+    )
+    with _LOCK:
+        _RECORDS.append(record)
+    return sp.CompletedProcess(
+        proc.args, proc.returncode, outputs["stdout"], outputs["stderr"]
+    )
+
+
+def _shorten(cmd: str, width: int) -> str:
+    cmd = " ".join(cmd.split())
+    return cmd if len(cmd) <= width else cmd[:width - 3] + "..."
+
+
+def report(records_: Sequence[Record], file=sys.stderr) -> None:
+    """Print a table of profiled commands sorted by wall time (descending).
+
+    :param records_: Records of profiled commands.
+    :param file: The file to print to.
+    """
+    mib = 1024 * 1024
+    print(
+        f"{'wall(s)':>8} {'user(s)':>8} {'sys(s)':>8} {'rss(MB)':>8} {'read(MB)':>8} "
+        f"{'write(MB)':>9}  {'sub command':<16} {'phase':<9} command",
+        file=file
+    )
+    for rec in sorted(records_, key=lambda rec: rec.wall, reverse=True):
+        print(
+            f"{rec.wall:8.2f} {rec.user_time:8.2f} {rec.sys_time:8.2f} "
+            f"{rec.maxrss / mib:8.1f} {rec.read_bytes / mib:8.1f} "
+            f"{rec.write_bytes / mib:9.1f}  "
+            f"{rec.sub_cmd:<16} {rec.phase:<9} {_shorten(rec.cmd, 60)}",
+            file=file
+        )
+    print(f"{sum(rec.wall for rec in records_):8.2f} in total", file=file)
+
+
+def write_trace(records_: Sequence[Record], path: str) -> None:
+    """Write profiled commands into a Chrome trace-event JSON file
+    (which can be viewed in chrome://tracing or Perfetto).
+
+    :param records_: Records of profiled commands.
+    :param path: The path of the JSON file.
+    """
+    pid = os.getpid()
+    events = [
+        {
+            "name": _shorten(rec.cmd, 80),
+            "cat": ",".join(filter(None, (rec.sub_cmd, rec.phase))),
+            "ph": "X",
+            "ts": rec.start * 1E6,
+            "dur": rec.wall * 1E6,
+            "pid": pid,
+            "tid": rec.thread,
+            "args": {
+                "cmd": rec.cmd,
+                "sub_cmd": rec.sub_cmd,
+                "phase": rec.phase,
+                "user_time": rec.user_time,
+                "sys_time": rec.sys_time,
+                "maxrss": rec.maxrss,
+                "read_bytes": rec.read_bytes,
+                "write_bytes": rec.write_bytes,
+            },
+        } for rec in records_
+    ]
+    with open(path, "w") as fout:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fout)
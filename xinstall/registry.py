@@ -0,0 +1,278 @@
+"""A lazy registry of xinstall sub commands.
+
+The manifest below records the name, aliases, owning module and help doc
+of every sub command so that the command-line interface can be built
+without importing the (heavy) modules implementing the sub commands.
+Only the module owning the chosen sub command is imported.
+Run `python -m xinstall.registry` to regenerate the manifest
+after adding/changing sub commands.
+"""
+from typing import Sequence, Tuple, Union
+from argparse import ArgumentParser
+
+MODULES = (
+    "ide",
+    "dev",
+    "bigdata",
+    "github",
+    "ai",
+    "network",
+    "pdf",
+    "jupyter",
+    "desktop",
+    "shell",
+    "virtualization",
+    "bench",
+    "serve",
+    "scheduler",
+    "plan",
+    "fetch",
+)
+# (name, aliases, module, help)
+MANIFEST = (
+    ("vim", (), "ide", "Install Vim."),
+    ("neovim", ("nvim",), "ide", "Install NeoVim."),
+    ("spacevim", ("svim",), "ide", "Install and configure SpaceVim."),
+    ("ideavim", ("ivim",), "ide", "Install IdeaVim for IntelliJ."),
+    ("visual_studio_code", ("vscode", "code"), "ide", "Install Visual Studio Code."),
+    ("intellij_idea", ("intellij", "idea"), "ide", "Install IntelliJ IDEA."),
+    ("bash_lsp", ("blsp",), "ide", "Install Bash Language Server."),
+    ("cmake", (), "dev", "Install and configure cmake."),
+    ("git", (), "dev", "Install and configure Git."),
+    ("nodejs", ("node",), "dev", "Install nodejs and npm."),
+    ("python", ("py", "py3", "python3"), "dev", "Install and configure Python (3)."),
+    ("sphinx", (), "dev", "Install and configure Sphinx."),
+    ("pyjnius", ("pyj",), "dev", "Install pyjnius for calling Java from Python."),
+    ("yapf", (), "dev", "Install Google's yapf (for formatting Python scripts)."),
+    ("pylint", (), "dev", "Install and configure pylint."),
+    ("flake8", (), "dev", "Install and configure flake8."),
+    ("darglint", (), "dev", "Install and configure darglint."),
+    ("pytype", (), "dev", "Install and configure pytype."),
+    ("pyenv", (), "dev", "Install and configure pyenv."),
+    ("openjdk8", ("jdk8",), "dev", "Install OpenJDK 8."),
+    ("sdkman", (), "dev", "Install sdkman. https://sdkman.io/install"),
+    ("poetry", ("pt",), "dev", "Install and configure Python poetry."),
+    (
+        "rustup", ("rust", "cargo"), "dev",
+        "Install rustup which is the version management tool for Rust."
+    ),
+    ("rustpython", ("rustpy",), "dev", "Install and configure RustPython."),
+    ("deno", (), "dev", "Install and configure Deno."),
+    ("antlr", (), "dev", "Install and configure Antrl4."),
+    ("jpype1", ("jpype", "jp"), "dev", "Install the Python package JPype."),
+    (
+        "pg_formatter", ("pgformatter", "pgfmt", "pgf"), "dev",
+        "Install and configure pgFormatter."
+    ),
+    ("dask", (), "bigdata", "Install the Python module dask."),
+    ("spark", (), "bigdata", "Install Spark."),
+    ("pyspark", (), "bigdata", "Install PySpark."),
+    ("dsutil", (), "github", "Install the Python package dsutil."),
+    ("xinstall", (), "github", "Install xonsh, a Python based shell."),
+    (
+        "install_py_github", ("inpygit", "pygit", "ipg"), "github",
+        "Install the latest versions of Python packages from GitHub."
+    ),
+    (
+        "github", ("gh",), "github",
+        "Download packages from GitHub and then install and configure it."
+    ),
+    ("kaggle", (), "ai", "Insert the Python package kaggle."),
+    ("lightgbm", (), "ai", "Insert the Python package kaggle."),
+    ("pytorch", (), "ai", "Insert PyTorch."),
+    ("autogluon", (), "ai", "Insert the Python package AutoGluon."),
+    ("pytext", (), "ai", "Insert the Python package PyText."),
+    (
+        "computer_vision", ("vision", "cv"), "ai",
+        "Insert computer vision Python packages: opencv-python, scikit-image and Pillow."
+    ),
+    (
+        "nlp", (), "ai",
+        "Install Python packages (PyTorch, transformers, pytext-nlp and fasttext) for NLP."
+    ),
+    ("ssh_server", ("sshs",), "network", "Install and configure SSH server."),
+    ("ssh_client", ("sshc",), "network", "Configure SSH client."),
+    ("proxychains", ("pchains", "pc"), "network", "Install and configure ProxyChains."),
+    ("dryscrape", (), "network", "Install and configure dryscrape."),
+    ("download_tools", ("dl", "dlt"), "network", "Install downloading tools."),
+    ("sshuttle", ("sshu",), "network", "Install sshuttle."),
+    ("pdftotext", ("ptt", "p2t"), "pdf", "Install the Python library pdftotext."),
+    ("ipython", ("ipy",), "jupyter", "Install IPython for Python 3."),
+    (
+        "beakerx", ("bkx", "bk"), "jupyter",
+        "Install/uninstall/configure the BeakerX kernels."
+    ),
+    ("jupyterlab_lsp", ("jlab-lsp", "jlab_lsp"), "jupyter", "Install jupyterlab-lsp."),
+    (
+        "itypescript", ("its",), "jupyter",
+        "Install and configure the ITypeScript kernel."
+    ),
+    (
+        "nbdime", ("nbd",), "jupyter",
+        "Install and configure nbdime for comparing difference of notebooks."
+    ),
+    (
+        "almond", ("al", "amd"), "jupyter",
+        "Install/uninstall/configure the Almond Scala kernel."
+    ),
+    (
+        "evcxr_jupyter", ("evcxr",), "jupyter",
+        "Install the evcxr Rust kernel for Jupyter/Lab server."
+    ),
+    ("jupyter_book", ("jb", "jbook"), "jupyter", "Install jupyter-book."),
+    (
+        "jupyterlab_vim", ("jlab_vim", "jlabvim", "jvim"), "jupyter",
+        "Install the jupyterlab_vim extension."
+    ),
+    ("nomachine", ("nm", "nx"), "desktop", "Install NoMachine."),
+    ("lxqt", (), "desktop", "Install the LXQt desktop environment."),
+    (
+        "pygetwindow", ("pgw", "getwindow", "gwin"), "desktop",
+        "Install and configure the Python package PyGetWindow."
+    ),
+    ("coreutils", ("cu",), "shell", "Install CoreUtils."),
+    ("change_shell", ("chsh", "cs"), "shell", "Change the default shell."),
+    (
+        "shell_utils", ("sh_utils", "shutils", "shu", "su"), "shell",
+        "Install Shell-related utils."
+    ),
+    (
+        "bash_it", ("bashit", "shit", "bit"), "shell",
+        "Install Bash-it, a community Bash framework. For more details, please refer to https://github.com/Bash-it/bash-it#installation."
+    ),
+    ("xonsh", (), "shell", "Install xonsh, a Python based shell."),
+    ("homebrew", ("brew",), "shell", "Install Homebrew."),
+    ("hyper", ("hp",), "shell", "Install the hyper.js terminal."),
+    ("openinterminal", ("oit",), "shell", "Install openinterminal."),
+    (
+        "bash_completion", ("completion", "comp", "cp"), "shell",
+        "Install and configure bash-complete."
+    ),
+    ("wajig", ("wj",), "shell", "Install wajig."),
+    ("exa", (), "shell", "Install exa which is an Rust-implemented alternative to ls."),
+    ("osquery", ("osq",), "shell", "Install osquery for Linux admin."),
+    (
+        "dust", (), "shell",
+        "Install dust which is du implemented in Rust. The cargo command must be available on the search path in order to install dust."
+    ),
+    (
+        "docker", ("dock", "dk"), "virtualization",
+        "Install and configure Docker container."
+    ),
+    (
+        "kubernetes", ("k8s",), "virtualization",
+        "Install and configure kubernetes command-line interface."
+    ),
+    ("minikube", ("mkb",), "virtualization", "Install MiniKube."),
+    ("virtualbox", ("vbox",), "virtualization", "Install VirtualBox."),
+    ("multipass", ("mp",), "virtualization", "Install Multipass."),
+    ("microk8s", ("mk8s",), "virtualization", "Install MicroK8S."),
+    ("bench", (), "bench", "Benchmark the startup time of xinstall sub commands."),
+    (
+        "serve", (), "serve",
+        "Run a daemon which serves commands forwarded by the xinstall client."
+    ),
+    (
+        "run", ("batch",), "scheduler",
+        "Run multiple sub commands (with dependencies) in one process."
+    ),
+    ("replay", (), "plan", "Replay a plan saved by xinstall --dry-run --save-plan."),
+    ("cache", (), "fetch", "Show statistics of (or clear) the download cache."),
+)
+_OWNERS = {
+    cmd: module
+    for name, aliases, module, _ in MANIFEST for cmd in (name, ) + aliases
+}
+_NAMES = {cmd: name for name, aliases, _, _ in MANIFEST for cmd in (name, ) + aliases}
+# sub command: (dependencies, phases of the sub command requiring the dependencies)
+DEPENDENCIES = {
+    "git": (("ssh_client", ), ("config", )),
+    "rustpython": (("rustup", ), ("install", "config")),
+    "evcxr_jupyter": (("rustup", "cmake"), ("install", )),
+    "minikube": (("virtualbox", "kubernetes"), ("install", "config")),
+}
+
+
+def owner(sub_cmd: str) -> str:
+    """Get the module owning a sub command.
+
+    :param sub_cmd: The name or an alias of a sub command.
+    :return: The name of the module owning the sub command
+        or an empty string if the sub command is not registered.
+    """
+    return _OWNERS.get(sub_cmd, "")
+
+
+def canonical(sub_cmd: str) -> str:
+    """Get the name of a sub command from its alias.
+
+    :param sub_cmd: The name or an alias of a sub command.
+    :return: The name of the sub command
+        or sub_cmd itself if the sub command is not registered.
+    """
+    return _NAMES.get(sub_cmd, sub_cmd)
+
+
+def _add_subparser_module(subparsers, module: str) -> None:
+    # __import__ (unlike importlib.import_module) is profiled by `python -X importtime`
+    mod = __import__(f"{__package__}.{module}", fromlist=(module, ))
+    getattr(mod, f"_add_subparser_{module}")(subparsers)
+
+
+def add_subparsers(subparsers, sub_cmd: Union[str, None] = "") -> None:
+    """Add sub parsers of all registered sub commands to the main parser.
+    Only the module owning the specified sub command is imported
+    and all other sub commands are added as placeholders using the manifest.
+
+    :param subparsers: The subparsers handler.
+    :param sub_cmd: The name or an alias of the sub command to be run.
+        If None, all modules are imported.
+    """
+    module = owner(sub_cmd) if sub_cmd else sub_cmd
+    for name, aliases, mod, help_ in MANIFEST:
+        if module is not None and mod != module:
+            subparsers.add_parser(name, aliases=aliases, help=help_)
+        elif name not in subparsers.choices:
+            _add_subparser_module(subparsers, mod)
+
+
+def summarize(doc: str) -> str:
+    """Get the summary (the first paragraph without fields such as :param)
+    of a docstring as a single line.
+
+    :param doc: A docstring.
+    :return: The summary of the docstring.
+    """
+    lines = []
+    for line in (doc or "").strip().splitlines():
+        line = line.strip()
+        if not line or line.startswith(":"):
+            break
+        lines.append(line)
+    return " ".join(" ".join(lines).split())
+
+
+def build_manifest(modules: Sequence[str] = MODULES) -> Tuple:
+    """Build the manifest by importing modules and adding their sub parsers.
+
+    :param modules: Modules to build the manifest from.
+    :return: A tuple of (name, aliases, module, help) of sub commands.
+    """
+    manifest = []
+    for module in modules:
+        parser = ArgumentParser()
+        subparsers = parser.add_subparsers()
+        _add_subparser_module(subparsers, module)
+        for action in subparsers._choices_actions:  # pylint: disable=W0212
+            name = action.dest
+            aliases = tuple(
+                cmd for cmd, sub in subparsers.choices.items()
+                if sub is subparsers.choices[name] and cmd != name
+            )
+            manifest.append((name, aliases, module, summarize(action.help)))
+    return tuple(manifest)
+
+
+if __name__ == "__main__":
+    for entry in build_manifest():
+        print(f"    {entry!r},")
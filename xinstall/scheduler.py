@@ -0,0 +1,239 @@
+"""Run sub commands (and their dependencies) in one process
+using a dependency-aware parallel scheduler.
+"""
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from argparse import Namespace
+import sys
+import time
+import shlex
+import logging
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from .registry import DEPENDENCIES, canonical
+from .coalesce import Coalescer, coalescing
+from . import plan, profiling
+from .main import parse_args
+
+_FLAGS = {"install": "-i", "config": "-c", "uninstall": "-u"}
+_NOT_INHERITED = ("sub_cmd", "func", "install", "config", "uninstall", "log")
+
+
+def _global_argv(args: Namespace) -> List[str]:
+    """Get global command-line options (before the sub command) from parsed arguments.
+    """
+    argv = ["--level", args.level, "--prefix", args.prefix]
+    if args.yes:
+        argv.append("--yes")
+    return argv
+
+
+def _target_args(
+    args: Namespace,
+    sub_cmd: str,
+    phases: Sequence[str],
+    options: Sequence[str] = ()
+) -> Namespace:
+    """Parse arguments of a sub command to run.
+
+    :param args: Parsed arguments of the main command (containing global options).
+    :param sub_cmd: The sub command to run.
+    :param phases: Phases (install, config and/or uninstall) of the sub command to run.
+    :param options: Options of the sub command (e.g., ["--pip", "pip3"]).
+        Options not supported by the sub command are rejected (by argparse).
+    :return: Parsed arguments of the sub command.
+    """
+    return parse_args(
+        _global_argv(args) + [sub_cmd] + list(options) +
+        [_FLAGS[phase] for phase in phases]
+    )
+
+
+def _dependency_args(args: Namespace, dep: str, phases: Sequence[str]) -> Namespace:
+    """Parse arguments of a dependency of a sub command.
+    Options shared by the dependency and the sub command are inherited.
+
+    :param args: Parsed arguments of the sub command.
+    :param dep: The dependency.
+    :param phases: Phases (install and/or config) of the dependency to run.
+    :return: Parsed arguments of the dependency.
+    """
+    dep_args = _target_args(args, dep, phases)
+    for key, val in vars(args).items():
+        if key not in _NOT_INHERITED and key in dep_args:
+            setattr(dep_args, key, val)
+    return dep_args
+
+
+def expand(
+    targets: Sequence[Namespace]
+) -> Tuple[Dict[str, Namespace], Dict[str, Set[str]]]:
+    """Expand dependencies of sub commands to run.
+    A dependency is run with the phases (install and/or config)
+    of its dependents which require it (uninstallation is never propagated).
+
+    :param targets: Parsed arguments of sub commands to run.
+    :return: A dict mapping sub commands to their parsed arguments
+        and a dict mapping sub commands to their dependencies.
+    """
+    nodes = {canonical(args.sub_cmd): args for args in targets}
+    explicit = set(nodes)
+    edges = {name: set() for name in nodes}
+    queue = list(nodes)
+    while queue:
+        name = queue.pop(0)
+        args = nodes[name]
+        deps, phases = DEPENDENCIES.get(name, ((), ()))
+        phases = [phase for phase in phases if getattr(args, phase)]
+        if not phases:
+            continue
+        for dep in deps:
+            edges[name].add(dep)
+            if dep not in nodes:
+                nodes[dep] = _dependency_args(args, dep, phases)
+                edges[dep] = set()
+                queue.append(dep)
+            elif dep not in explicit:
+                for phase in phases:
+                    setattr(nodes[dep], phase, True)
+    return nodes, edges
+
+
+def _toposort(edges: Dict[str, Set[str]]) -> List[str]:
+    order = []
+    done = set()
+    while len(order) < len(edges):
+        ready = [
+            name for name, deps in edges.items() if name not in done and deps <= done
+        ]
+        if not ready:
+            raise ValueError(f"Cyclic dependencies among: {set(edges) - done}")
+        order.extend(ready)
+        done.update(ready)
+    return order
+
+
+def _run_target(args: Namespace, coalescer: Optional[Coalescer] = None) -> float:
+    start = time.perf_counter()
+    with profiling.tagged(args), coalescer.worker() if coalescer else nullcontext():
+        args.func(args)
+    return time.perf_counter() - start
+
+
+def run_targets(targets: Sequence[Namespace], jobs: int = 1) -> None:
+    """Run sub commands and their dependencies.
+    A sub command is run after all its dependencies succeed.
+
+    :param targets: Parsed arguments of sub commands to run.
+    :param jobs: The number of sub commands to run concurrently.
+        If 1 (or when planning), sub commands are run sequentially in the current thread
+        and exceptions are propagated.
+        Otherwise, package requests (e.g., apt-get install/purge)
+        of sub commands running concurrently are coalesced into single transactions.
+    """
+    nodes, edges = expand(targets)
+    if jobs <= 1 or plan.is_planning():
+        for name in _toposort(edges):
+            _run_target(nodes[name])
+        return
+    _toposort(edges)
+    status = {}
+    pending = dict(edges)
+    with coalescing() as coalescer, ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        while pending or futures:
+            ready = []
+            changed = True
+            while changed:
+                changed = False
+                for name, deps in list(pending.items()):
+                    if any(
+                        status.get(dep, "") in ("failed", "skipped") for dep in deps
+                    ):
+                        status[name] = "skipped"
+                    elif all(status.get(dep, "") == "done" for dep in deps):
+                        if len(futures) + len(ready) >= jobs:
+                            continue
+                        ready.append(name)
+                    else:
+                        continue
+                    del pending[name]
+                    changed = True
+            # register all workers before any of them can make a request
+            coalescer.register(len(ready))
+            for name in ready:
+                futures[executor.submit(_run_target, nodes[name], coalescer)] = name
+            if not futures:
+                break
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures.pop(future)
+                err = future.exception()
+                if err is None:
+                    status[name] = "done"
+                    logging.info("%s is done in %.1f seconds.", name, future.result())
+                else:
+                    status[name] = "failed"
+                    logging.error("%s failed: %r", name, err)
+    failed = sorted(name for name, stat in status.items() if stat != "done")
+    if failed:
+        sys.exit(
+            "Failed or skipped sub commands: " +
+            ", ".join(f"{name} ({status[name]})" for name in failed)
+        )
+
+
+def batch(args) -> None:
+    """Run multiple sub commands in one process.
+    A target is a sub command optionally followed by its options
+    (e.g., "ipython --pip pip3").
+    """
+    phases = [phase for phase in _FLAGS if getattr(args, phase)]
+    targets = []
+    for target in args.targets:
+        sub_cmd, *options = shlex.split(target)
+        targets.append(_target_args(args, sub_cmd, phases, options))
+    run_targets(targets, jobs=args.jobs)
+
+
+def _add_subparser_run(subparsers) -> None:
+    subparser = subparsers.add_parser(
+        "run",
+        aliases=["batch"],
+        help="Run multiple sub commands (with dependencies) in one process."
+    )
+    subparser.add_argument(
+        dest="targets",
+        nargs="+",
+        help="Sub commands to run, each optionally followed by its options"
+        ' in quotes (e.g., "ipython --pip pip3").'
+    )
+    subparser.add_argument(
+        "-i", "--install", dest="install", action="store_true", help="Install targets."
+    )
+    subparser.add_argument(
+        "-u",
+        "--uninstall",
+        dest="uninstall",
+        action="store_true",
+        help="Uninstall targets."
+    )
+    subparser.add_argument(
+        "-c",
+        "--configure",
+        dest="config",
+        action="store_true",
+        help="Configure targets."
+    )
+    subparser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=4,
+        help="The number of sub commands to run concurrently."
+    )
+    subparser.set_defaults(func=batch)
+
+
+def _add_subparser_scheduler(subparsers) -> None:
+    _add_subparser_run(subparsers)
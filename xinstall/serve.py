@@ -0,0 +1,138 @@
+"""A resident daemon which runs xinstall commands forwarded by the thin client (xinstall.client).
+The daemon imports all modules, creates the parser and loads platform facts once.
+Each command is run in a process forked from the daemon
+which inherits the client's stdin/stdout/stderr (and thus its TTY),
+environment variables and working directory.
+"""
+from typing import Dict
+import os
+import sys
+import time
+import socket
+import select
+import logging
+import traceback
+from pathlib import Path
+from . import utils
+from .main import create_parser, run
+from .client import SOCKET, recv_request, send_message
+
+
+def _run_forked(conn: socket.socket, parser) -> None:
+    """Run a command forwarded by a client.
+    This function is called in a forked process and never returns.
+
+    :param conn: The socket connected to the client.
+    :param parser: The parser of command-line arguments.
+    """
+    code = 1
+    try:
+        req, fds = recv_request(conn)
+        send_message(conn, pid=os.getpid())
+        for fd, fd_client in zip((0, 1, 2), fds):
+            os.dup2(fd_client, fd)
+            os.close(fd_client)
+        os.environ.clear()
+        os.environ.update(req["env"])
+        os.chdir(req["cwd"])
+        logging.root.handlers.clear()
+        run(req["argv"], parser=parser)
+        code = 0
+    except SystemExit as err:
+        code = err.code
+        if code is None:
+            code = 0
+        elif not isinstance(code, int):
+            print(code, file=sys.stderr)
+            code = 1
+    except BaseException:  # pylint: disable=W0703
+        traceback.print_exc()
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        send_message(conn, exit=code)
+    finally:
+        os._exit(0)  # pylint: disable=W0212
+
+
+def _reap(children: Dict[int, float]) -> None:
+    for pid in list(children):
+        pid_, _ = os.waitpid(pid, os.WNOHANG)
+        if pid_:
+            del children[pid]
+
+
+def _is_serving(path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+            return True
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+
+
+def serve(args) -> None:
+    """Run the xinstall daemon which serves commands forwarded by the xinstall client.
+    """
+    if not hasattr(socket, "AF_UNIX") or not hasattr(os, "fork"):
+        sys.exit("The xinstall daemon is not supported on this platform!")
+    parser = create_parser(None)
+    utils.distro_id()
+    path = Path(args.socket)
+    if _is_serving(path):
+        sys.exit(f"A xinstall daemon is already listening on {path}!")
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    utils.remove_file_safe(path)
+    children = {}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(str(path))
+        path.chmod(0o600)
+        sock.listen(64)
+        logging.info("The xinstall daemon is listening on %s.", path)
+        last_active = time.monotonic()
+        try:
+            while True:
+                readable, _, _ = select.select([sock], [], [], 1)
+                _reap(children)
+                if children:
+                    last_active = time.monotonic()
+                if not readable:
+                    if time.monotonic() - last_active > args.idle_timeout:
+                        logging.info("Shutting down the idle xinstall daemon.")
+                        return
+                    continue
+                conn, _ = sock.accept()
+                sys.stdout.flush()
+                sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    sock.close()
+                    _run_forked(conn, parser)
+                conn.close()
+                children[pid] = time.monotonic()
+                last_active = time.monotonic()
+        finally:
+            utils.remove_file_safe(path)
+
+
+def _add_subparser_serve(subparsers) -> None:
+    subparser = subparsers.add_parser(
+        "serve",
+        help="Run a daemon which serves commands forwarded by the xinstall client."
+    )
+    subparser.add_argument(
+        "-s",
+        "--socket",
+        dest="socket",
+        default=SOCKET,
+        help="The path of the Unix domain socket to listen on."
+    )
+    subparser.add_argument(
+        "-t",
+        "--idle-timeout",
+        dest="idle_timeout",
+        type=float,
+        default=600,
+        help="Shut down the daemon after being idle for the specified seconds."
+    )
+    subparser.set_defaults(func=serve)
@@ -2,7 +2,6 @@
 """
 from pathlib import Path
 import logging
-import shutil
 import sys
 import os
 import textwrap
@@ -15,12 +14,21 @@ from .utils import (
     is_linux,
     is_fedora,
     update_apt_source,
+    apt_install,
+    apt_purge,
     brew_install_safe,
     is_macos,
     run_cmd,
+    copy_file,
+    remove_file,
+    write_file,
+    pip_install,
     add_subparser,
     option_pip_bundle,
+    yum_install,
+    yum_remove,
 )
+from . import gitcache
 
 
 def _add_subparser_shell(subparsers):
@@ -44,19 +52,18 @@ def coreutils(args) -> None:
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(f"{args.prefix} apt-get install {args.yes_s} coreutils")
+            apt_install(["coreutils"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             brew_install_safe("coreutils")
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum install coreutils")
+            yum_install(["coreutils"], prefix=args.prefix, yes=args.yes_s)
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} coreutils")
+            apt_purge(["coreutils"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew uninstall coreutils")
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum remove coreutils")
+            yum_remove(["coreutils"], prefix=args.prefix, yes=args.yes_s)
     if args.config:
         if is_macos():
             cmd = """export PATH=/usr/local/opt/findutils/libexec/gnubin:"$PATH" \
@@ -75,28 +82,33 @@ def shell_utils(args) -> None:
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(
-                f"""{args.prefix} apt-get install {args.yes_s} \
-                    bash-completion command-not-found man-db""",
+            apt_install(
+                ["bash-completion", "command-not-found", "man-db"],
+                prefix=args.prefix,
+                yes=args.yes_s,
             )
         elif is_macos():
             brew_install_safe(["bash-completion@2", "man-db"])
         elif is_centos_series():
-            run_cmd(
-                f"{args.prefix} yum install bash-completion command-not-found man-db"
+            yum_install(
+                ["bash-completion", "command-not-found", "man-db"],
+                prefix=args.prefix,
+                yes=args.yes_s,
             )
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(
-                f"""{args.prefix} apt-get purge {args.yes_s} \
-                    bash-completion command-not-found man-db""",
+            apt_purge(
+                ["bash-completion", "command-not-found", "man-db"],
+                prefix=args.prefix,
+                yes=args.yes_s,
             )
         elif is_macos():
             run_cmd("brew uninstall bash-completion man-db")
         elif is_centos_series():
-            run_cmd(
-                f"{args.prefix} yum remove bash-completion command-not-found man-db"
+            yum_remove(
+                ["bash-completion", "command-not-found", "man-db"],
+                prefix=args.prefix,
+                yes=args.yes_s,
             )
     if args.config:
         pass
@@ -156,15 +168,16 @@ def homebrew(args) -> None:
     if args.dep:
         args.install = True
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(
-                f"{args.prefix} apt-get install {args.yes_s} build-essential curl file git"
+            apt_install(
+                ["build-essential", "curl", "file", "git"],
+                prefix=args.prefix,
+                yes=args.yes_s,
             )
         elif is_centos_series():
             run_cmd(f"{args.prefix} yum groupinstall 'Development Tools'")
-            run_cmd(f"{args.prefix} yum install curl file git")
+            yum_install(["curl", "file", "git"], prefix=args.prefix, yes=args.yes_s)
             if is_fedora():
-                run_cmd(f"{args.prefix} yum install libxcrypt-compat")
+                yum_install(["libxcrypt-compat"], prefix=args.prefix, yes=args.yes_s)
     url = "https://raw.githubusercontent.com/Linuxbrew/install/master/install.sh"
     cmd_brew = f'sh -c "$(curl -fsSL {url})"'
     if args.install:
@@ -210,7 +223,7 @@ def hyper(args) -> None:
         if is_ubuntu_debian():
             update_apt_source(prefix=args.prefix)
         elif is_macos():
-            run_cmd("brew cask install hyper")
+            brew_install_safe(["hyper"], cask=True)
         elif is_centos_series():
             #!yum install hyper
             pass
@@ -223,9 +236,7 @@ def hyper(args) -> None:
             "Hyper plugins hypercwd, hyper-search, hyper-pane and hyperpower are installed."
         )
         path = f"{HOME}/.hyper.js"
-        #if os.path.exists(path):
-        #    os.remove(path)
-        shutil.copy2(os.path.join(BASE_DIR, "hyper/hyper.js"), path)
+        copy_file(BASE_DIR / "hyper/hyper.js", path)
         logging.info("%s is copied to %s.", BASE_DIR / "hyper/hyper.js", path)
     if args.uninstall:
         if is_ubuntu_debian():
@@ -247,7 +258,7 @@ def openinterminal(args) -> None:
     """
     if args.install:
         if is_macos():
-            run_cmd("brew cask install openinterminal")
+            brew_install_safe(["openinterminal"], cask=True)
     if args.config:
         pass
     if args.uninstall:
@@ -263,15 +274,11 @@ def xonsh(args) -> None:
     """Install xonsh, a Python based shell.
     """
     if args.install:
-        run_cmd(f"{args.pip} install {args.user_s} {args.pip_option} xonsh")
+        pip_install(["xonsh"], args.pip_install)
     if args.config:
         src = f"{BASE_DIR}/xonsh/xonshrc"
         dst = HOME / ".xonshrc"
-        try:
-            dst.unlink()
-        except FileNotFoundError:
-            pass
-        shutil.copy2(src, dst)
+        copy_file(src, dst)
         logging.info("%s is copied to %s.", src, dst)
     if args.uninstall:
         run_cmd(f"{args.pip} uninstall xonsh")
@@ -291,14 +298,11 @@ def bash_it(args) -> None:
     """
     if args.install:
         dir_ = Path.home() / ".bash_it"
-        try:
-            dir_.unlink()
-        except FileNotFoundError:
-            pass
-        cmd = f"""git clone --depth=1 https://github.com/Bash-it/bash-it.git {dir_} \
-                && {dir_}/install.sh --silent -f
-                """
-        run_cmd(cmd)
+        remove_file(dir_)
+        gitcache.clone(
+            "https://github.com/Bash-it/bash-it.git", dir_, depth=1, dissociate=True
+        )
+        run_cmd(f"{dir_}/install.sh --silent -f")
     if args.config:
         bash = textwrap.dedent(
             f"""
@@ -309,8 +313,7 @@ def bash_it(args) -> None:
             """
         )
         profile = HOME / (".bashrc" if is_linux() else ".bash_profile")
-        with profile.open("a") as fout:
-            fout.write(bash)
+        write_file(profile, bash, append=True)
         logging.info("'export PATH=%s:$PATH' is inserted into %s.", BIN_DIR, profile)
         if is_linux():
             bash = textwrap.dedent(
@@ -321,11 +324,10 @@ def bash_it(args) -> None:
                 fi
                 """
             )
-            with (HOME / ".bash_profile").open("w") as fout:
-                fout.write(bash)
+            write_file(HOME / ".bash_profile", bash)
     if args.uninstall:
         run_cmd("~/.bash_it/uninstall.sh")
-        shutil.rmtree(HOME / ".bash_it")
+        remove_file(HOME / ".bash_it")
 
 
 def _add_subparser_bash_it(subparsers) -> None:
@@ -341,21 +343,20 @@ def bash_completion(args) -> None:
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(f"{args.prefix} apt-get install {args.yes_s} bash-completion")
+            apt_install(["bash-completion"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             brew_install_safe(["bash-completion@2"])
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum install bash-completion")
+            yum_install(["bash-completion"], prefix=args.prefix, yes=args.yes_s)
     if args.config:
         pass
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge bash-completion")
+            apt_purge(["bash-completion"], prefix=args.prefix, yes="")
         elif is_macos():
             run_cmd("brew uninstall bash-completion")
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum remove bash-completion")
+            yum_remove(["bash-completion"], prefix=args.prefix, yes=args.yes_s)
 
 
 def _add_subparser_bash_complete(subparsers) -> None:
@@ -397,28 +398,27 @@ def osquery(args) -> None:
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            cmd = f"""{args.prefix} apt-get {args.yes_s} install dirmngr \
-                    && {args.prefix} apt-key adv --keyserver keyserver.ubuntu.com \
+            apt_install(["dirmngr"], prefix=args.prefix, yes=args.yes_s)
+            cmd = f"""{args.prefix} apt-key adv --keyserver keyserver.ubuntu.com \
                         --recv-keys 1484120AC4E9F8A1A577AEEE97A80C63C9D8B80B \
                     && {args.prefix} add-apt-repository \
-                        "deb [arch=amd64] https://pkg.osquery.io/deb deb main" \
-                    && {args.prefix} apt-get {args.yes_s} install osquery
+                        "deb [arch=amd64] https://pkg.osquery.io/deb deb main"
                 """
             run_cmd(cmd)
+            apt_install(["osquery"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             brew_install_safe(["osquery"])
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum install osquery")
+            yum_install(["osquery"], prefix=args.prefix, yes=args.yes_s)
     if args.config:
         pass
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} osquery")
+            apt_purge(["osquery"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew uninstall osquery")
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum remove osquery")
+            yum_remove(["osquery"], prefix=args.prefix, yes=args.yes_s)
 
 
 def _add_subparser_osquery(subparsers) -> None:
@@ -431,8 +431,7 @@ def wajig(args) -> None:
     if not is_ubuntu_debian():
         return
     if args.install:
-        update_apt_source(prefix=args.prefix)
-        run_cmd(f"{args.prefix} apt-get install {args.yes_s} wajig")
+        apt_install(["wajig"], prefix=args.prefix, yes=args.yes_s)
     if args.config:
         pass
     if args.proxy:
@@ -440,7 +439,7 @@ def wajig(args) -> None:
             | {args.prefix} tee -a /etc/apt/apt.conf"""
         run_cmd(cmd)
     if args.uninstall:
-        run_cmd(f"{args.prefix} apt-get purge {args.yes_s} wajig")
+        apt_purge(["wajig"], prefix=args.prefix, yes=args.yes_s)
 
 
 def _wajig_args(subparser) -> None:
@@ -465,7 +464,7 @@ def dust(args) -> None:
     """
     if args.install:
         if is_macos():
-            run_cmd("brew install dust")
+            brew_install_safe(["dust"])
         else:
             run_cmd("cargo install du-dust")
     if args.config:
@@ -0,0 +1,145 @@
+"""A key-value store of settings and states (e.g., update times) of xinstall
+backed by SQLite in WAL mode (~/.xinstall.db).
+
+Keys are read and written individually (values are JSON encoded)
+so that concurrent xinstall processes never lose updates of other keys
+or see a partially written store.
+Settings of users (the table settings) are kept apart from internal states
+(the table states, e.g., update times and cached tags) of xinstall.
+Settings in the legacy file ~/.xinstall.json are imported on the first write.
+Reading keys before the store is created has no side effect
+(values are read from the legacy file).
+"""
+from typing import Any, Dict
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+STORE_FILE = Path.home() / ".xinstall.db"
+LEGACY_FILE = Path.home() / ".xinstall.json"
+_LOCK = threading.Lock()
+_CONN = None
+_PID = 0
+
+
+def _connect() -> sqlite3.Connection:
+    """Connect to the store (once per process).
+    """
+    global _CONN, _PID  # pylint: disable=W0603
+    if _CONN is not None and _PID == os.getpid():
+        return _CONN
+    conn = sqlite3.connect(str(STORE_FILE), timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with conn:
+        for table in ("settings", "states"):
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+        if LEGACY_FILE.is_file():
+            _import_legacy(conn)
+    _CONN, _PID = conn, os.getpid()
+    return conn
+
+
+def _exists() -> bool:
+    """Check whether the store has been created (or connected to).
+    """
+    return (_CONN is not None and _PID == os.getpid()) or STORE_FILE.exists()
+
+
+def _load_legacy() -> Dict[str, Any]:
+    """Load settings from the legacy JSON file (empty if it does not exist).
+    """
+    if not LEGACY_FILE.is_file():
+        return {}
+    try:
+        with LEGACY_FILE.open() as fin:
+            return json.load(fin)
+    except ValueError:
+        return {}
+
+
+def _import_legacy(conn: sqlite3.Connection) -> None:
+    """Import settings from the legacy JSON file (once).
+    """
+    marker = "legacy_imported"
+    if conn.execute("SELECT 1 FROM states WHERE key = ?", (marker, )).fetchone():
+        return
+    conn.executemany(
+        "INSERT OR IGNORE INTO settings VALUES (?, ?)",
+        [(key, json.dumps(val)) for key, val in _load_legacy().items()],
+    )
+    conn.execute("INSERT OR REPLACE INTO states VALUES (?, ?)", (marker, "true"))
+
+
+def _get(table: str, key: str, default: Any) -> Any:
+    with _LOCK:
+        if not _exists():
+            return _load_legacy().get(key, default) if table == "settings" else default
+        row = _connect().execute(
+            f"SELECT value FROM {table} WHERE key = ?", (key, )
+        ).fetchone()
+    return default if row is None else json.loads(row[0])
+
+
+def _put(table: str, key: str, value: Any) -> None:
+    with _LOCK:
+        conn = _connect()
+        with conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {table} VALUES (?, ?)",
+                (key, json.dumps(value)),
+            )
+
+
+def get(key: str, default: Any = None) -> Any:
+    """Get the value of a setting.
+
+    :param key: The key.
+    :param default: The value to return if the key does not exist.
+    :return: The value of the key.
+    """
+    return _get("settings", key, default)
+
+
+def put(key: str, value: Any) -> None:
+    """Set the value of a setting (atomically).
+
+    :param key: The key.
+    :param value: A JSON serializable value.
+    """
+    _put("settings", key, value)
+
+
+def items() -> Dict[str, Any]:
+    """Get all settings (keys and their values).
+    Internal states are not included.
+    """
+    with _LOCK:
+        if not _exists():
+            return _load_legacy()
+        rows = _connect().execute("SELECT key, value FROM settings").fetchall()
+    return {key: json.loads(val) for key, val in rows}
+
+
+def get_state(key: str, default: Any = None) -> Any:
+    """Get the value of an internal state (e.g., the time of the last update).
+
+    :param key: The key.
+    :param default: The value to return if the key does not exist.
+    :return: The value of the key.
+    """
+    return _get("states", key, default)
+
+
+def put_state(key: str, value: Any) -> None:
+    """Set the value of an internal state (atomically).
+
+    :param key: The key.
+    :param value: A JSON serializable value.
+    """
+    _put("states", key, value)
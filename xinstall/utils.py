@@ -1,34 +1,95 @@
 """Helper functions.
 """
 from __future__ import annotations
-from typing import Union, List, Tuple, Sequence, Iterable, Any, Sized, Callable
+from typing import (
+    Union, List, Tuple, Sequence, Iterable, Any, Sized, Callable, Dict, FrozenSet
+)
 import os
 import sys
 import json
 from pathlib import Path
-import urllib.request
 import shutil
 import tempfile
 import re
-import datetime
+import shlex
+import time
+import hashlib
+import functools
+import contextlib
+import threading
 import subprocess as sp
 import logging
-import distro
+from . import coalesce, plan, profiling, store
 
 HOME = Path.home()
 USER = HOME.name
-FILE = Path(__file__).resolve()
+FILE = Path(__file__).absolute()
 BASE_DIR = FILE.parent / "data"
 LOCAL_DIR = HOME / ".local"
 BIN_DIR = LOCAL_DIR / "bin"
-BIN_DIR.mkdir(0o700, parents=True, exist_ok=True)
-DISTRO_ID = distro.id()
-# settings of xinstall
-SETTINGS_FILE = HOME / ".xinstall.json"
-SETTINGS = {}
-if os.path.isfile(SETTINGS_FILE):
-    with open(SETTINGS_FILE) as fin:
-        SETTINGS = json.load(fin)
+# deprecated: settings are kept in xinstall.store (~/.xinstall.db)
+# and this legacy file is imported into the store once
+SETTINGS_FILE = store.LEGACY_FILE
+# APT sources, package lists and a lock serializing `apt-get update` across processes
+APT_DIR = Path("/etc/apt")
+APT_LISTS_DIR = Path("/var/lib/apt/lists")
+APT_LOCK_FILE = HOME / ".xinstall.apt.lock"
+# the time-to-live (in seconds) of tags of latest releases of GitHub repositories
+LATEST_TAG_TTL = 3600
+# package managers hold exclusive locks and cannot be run concurrently
+_PKG_MANAGERS = re.compile(r"\b(apt-get|apt-key|add-apt-repository|dpkg|yum|brew|snap)\b")
+_PKG_LOCK = threading.RLock()
+# commands listing installed packages (and their status/version) one per line
+_PROBES = {
+    "dpkg": "dpkg-query -W -f '${Package} ${Status}\\n'",
+    "rpm": "rpm -qa --qf '%{NAME}\\n'",
+    "brew": "HOMEBREW_NO_AUTO_UPDATE=1 brew list --formula --versions",
+    "brew_cask": "HOMEBREW_NO_AUTO_UPDATE=1 brew list --cask --versions",
+}
+_INSTALLED: Dict[str, FrozenSet[str]] = {}
+
+
+def __getattr__(name):
+    """Compute deprecated module-level constants lazily.
+    """
+    if name == "DISTRO_ID":
+        return distro_id()
+    if name == "SETTINGS":
+        return settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@functools.lru_cache()
+def distro_id() -> str:
+    """Get the ID of the current OS distribution.
+    The distro module is imported and the ID is computed on the first call only.
+    """
+    import distro  # pylint: disable=C0415
+    return distro.id()
+
+
+def settings() -> dict:
+    """Get all settings of xinstall (a snapshot).
+    Reading settings does not create the store (~/.xinstall.db).
+    Use xinstall.store to read or write individual settings.
+    """
+    return store.items()
+
+
+@functools.lru_cache()
+def _bin_dir() -> Path:
+    BIN_DIR.mkdir(0o700, parents=True, exist_ok=True)
+    return BIN_DIR
+
+
+def bin_dir() -> Path:
+    """Get the directory ~/.local/bin which is created on the first call if it does not exist.
+    When planning, a step creating the directory is emitted instead.
+    """
+    if plan.is_planning():
+        run_cmd(f"mkdir -p {BIN_DIR}")
+        return BIN_DIR
+    return _bin_dir()
 
 
 def copy_if_exists(src: Union[Path, str], dst: Path = HOME) -> bool:
@@ -79,36 +140,151 @@ def remove_file_safe(path: Path) -> None:
         pass
 
 
-def run_cmd(cmd: Union[list, str], capture_output: bool = False) -> None:
+@plan.step("shell")
+def run_cmd(cmd: Union[list, str], capture_output: bool = False) -> sp.CompletedProcess:
     """Run a shell command.
 
+    Commands invoking package managers are serialized
+    so that sub commands can be run concurrently (in threads).
+
     :param cmd: The command to run.
     :param capture_output: Whether to capture stdout and stderr of the command.
+    :return: The completed process.
     """
-    proc = sp.run(
-        cmd, shell=isinstance(cmd, str), check=True, capture_output=capture_output
-    )
+    is_pkg = _PKG_MANAGERS.search(cmd if isinstance(cmd, str) else " ".join(cmd))
+    shell = isinstance(cmd, str)
+    with _PKG_LOCK if is_pkg else contextlib.nullcontext():
+        if profiling.is_enabled():
+            proc = profiling.run(cmd, shell=shell, capture_output=capture_output)
+            proc.check_returncode()
+        else:
+            proc = sp.run(cmd, shell=shell, check=True, capture_output=capture_output)
     logging.debug(proc.args)
+    return proc
+
+
+def _probe(manager: str) -> FrozenSet[str]:
+    try:
+        proc = run_cmd(_PROBES[manager], capture_output=True)
+    except sp.CalledProcessError:
+        return frozenset()
+    lines = proc.stdout.decode().splitlines()
+    if manager == "dpkg":
+        # e.g., "vim install ok installed" or "vim deinstall ok config-files"
+        return frozenset(
+            line.split()[0] for line in lines if line.endswith(" installed")
+        )
+    return frozenset(line.split()[0] for line in lines if line.strip())
 
 
-def brew_install_safe(pkgs: Union[str, list]) -> None:
+def installed_packages(manager: str) -> FrozenSet[str]:
+    """Get names of packages installed by a package manager.
+    All packages are probed by a single command (dpkg-query, rpm or brew list)
+    and the result is cached until a package is installed or removed.
+
+    :param manager: The package manager (dpkg, rpm, brew or brew_cask).
+    :return: A set of names of installed packages.
+    """
+    with _PKG_LOCK:
+        if manager not in _INSTALLED:
+            _INSTALLED[manager] = _probe(manager)
+        return _INSTALLED[manager]
+
+
+def invalidate_installed_packages() -> None:
+    """Invalidate cached installed packages (after packages are installed or removed).
+    """
+    with _PKG_LOCK:
+        _INSTALLED.clear()
+
+
+def _missing(pkgs: Sequence[str], manager: str) -> List[str]:
+    """Filter out packages which are already installed.
+    Packages with versions (e.g., vim=2:8.1) are always kept.
+    """
+    installed = installed_packages(manager)
+    return [pkg for pkg in pkgs if pkg.split("/")[-1] not in installed]
+
+
+def brew_update(seconds: float = 3600 * 12) -> None:
+    """Run brew update if it has not been run in the last `seconds` seconds.
+
+    :param seconds: The time-to-live (in seconds) of the last update.
+    """
+    key = "brew_update_timestamp"
+    with _PKG_LOCK:
+        now = time.time()
+        if now - store.get_state(key, 0) > seconds:
+            run_cmd("brew update")
+            store.put_state(key, now)
+
+
+def _brew_status(formulae: List[str]) -> Tuple[List[str], List[str]]:
+    """Get formulae which are not installed and installed formulae which are not linked.
+    """
+    proc = run_cmd(
+        "HOMEBREW_NO_AUTO_UPDATE=1 brew info --json=v2 " + " ".join(formulae),
+        capture_output=True
+    )
+    infos = json.loads(proc.stdout)["formulae"]
+    missing = [formula["name"] for formula in infos if not formula["installed"]]
+    unlinked = [
+        formula["name"] for formula in infos
+        if formula["installed"] and not (formula["linked_keg"] or formula["keg_only"])
+    ]
+    return missing, unlinked
+
+
+def _brew_install(pkgs: List[str], cask: bool) -> None:
+    brew_update()
+    cmd = f"HOMEBREW_NO_AUTO_UPDATE=1 brew install --force {'--cask' if cask else ''}"
+    try:
+        run_cmd(f"{cmd} {' '.join(pkgs)}")
+    except sp.CalledProcessError:
+        if cask:
+            raise
+        missing, unlinked = _brew_status(pkgs)
+        if missing or not unlinked:
+            raise
+        run_cmd(
+            "HOMEBREW_NO_AUTO_UPDATE=1 brew link --overwrite --force " +
+            " ".join(unlinked)
+        )
+        # the error is swallowed only if every formula is installed and linked now
+        missing, unlinked = _brew_status(pkgs)
+        if missing or unlinked:
+            raise
+    finally:
+        invalidate_installed_packages()
+
+
+@plan.step("package")
+def brew_install_safe(pkgs: Union[str, list], cask: bool = False) -> None:
     """Using Homebrew to install without throwing exceptions if a package to install already exists.
+    Packages already installed are skipped
+    and the others are installed in one brew call (without auto-update).
+    Homebrew is updated at most once per 12 hours
+    and formulae which fail to be linked are re-linked with overwriting.
+    When sub commands are run concurrently (xinstall run),
+    packages requested by them are installed in a single brew call.
 
     :param pkgs: A (list of) package(s) to install using Homebrew.
+    :param cask: If True, install casks instead of formulae.
     """
     if isinstance(pkgs, str):
         pkgs = [pkgs]
-    for pkg in pkgs:
-        run_cmd(
-            f"""brew install --force {pkg} \
-            || brew link --overwrite --force {pkg}"""
-        )
+    pkgs = _missing(pkgs, "brew_cask" if cask else "brew")
+    if not pkgs:
+        return
+    coalesce.submit(
+        ("brew install", cask), pkgs, lambda pkgs: _brew_install(pkgs, cask)
+    )
 
 
 def is_ubuntu_debian():
     """Check whehter the current OS is Ubuntu/Debian.
     """
-    return DISTRO_ID in ("ubuntu", "debian")
+    return distro_id() in ("ubuntu", "debian")
 
 
 def is_linux():
@@ -120,19 +296,19 @@ def is_linux():
 def is_centos_series():
     """Check whehter the current OS belongs to the CentOS series (CentOS, RedHat or Fedora).
     """
-    return DISTRO_ID in ("centos", "redhat", "fedora")
+    return distro_id() in ("centos", "redhat", "fedora")
 
 
 def is_fedora():
     """Check whehter the current OS is Fedora.
     """
-    return DISTRO_ID == "fedora"
+    return distro_id() == "fedora"
 
 
 def is_macos():
     """Check whehter the current OS is macOS.
     """
-    return DISTRO_ID == "darwin"
+    return sys.platform == "darwin"
 
 
 def is_win():
@@ -141,6 +317,7 @@ def is_win():
     return sys.platform == "win32"
 
 
+@plan.step("copy")
 def copy_file(srcfile, dstfile):
     """Copy file without throwing exceptions
     when a broken symbolic link already exists at the destination.
@@ -161,6 +338,37 @@ def _remove_file(path: str):
         shutil.rmtree(path)
 
 
+@plan.step("edit")
+def remove_file(path: Union[str, Path]) -> None:
+    """Remove a file, a symbolic link or a directory if it exists.
+
+    :param path: The path to remove.
+    """
+    _remove_file(path)
+
+
+@plan.step("edit")
+def mkdir(path: Union[str, Path], mode: int = 0o777) -> None:
+    """Create a directory (and its parents) if it does not exist.
+
+    :param path: The path of the directory to create.
+    :param mode: The mode (permissions) of the directory.
+    """
+    Path(path).mkdir(mode=mode, parents=True, exist_ok=True)
+
+
+@plan.step("edit")
+def write_file(path: Union[str, Path], text: str, append: bool = False) -> None:
+    """Write text into a file.
+
+    :param path: The path of the file to write.
+    :param text: The text to write.
+    :param append: If True, append text to the file instead of overwriting it.
+    """
+    with Path(path).open("a" if append else "w") as fout:
+        fout.write(text)
+
+
 def to_bool(value: Any) -> bool:
     """Convert an object to a bool value (True or False).
 
@@ -182,57 +390,361 @@ def to_bool(value: Any) -> bool:
     return False
 
 
+def _apt_sources_digest() -> str:
+    """Get the SHA-256 digest of APT sources (sources.list and sources.list.d/*).
+    """
+    sha = hashlib.sha256()
+    paths = [APT_DIR / "sources.list"] + sorted(APT_DIR.glob("sources.list.d/*"))
+    for path in paths:
+        if path.is_file():
+            sha.update(str(path).encode())
+            sha.update(path.read_bytes())
+    return sha.hexdigest()
+
+
+def _apt_lists_mtime() -> float:
+    """Get the last modification time of APT package lists (0 if there are none).
+    """
+    try:
+        return max(
+            (entry.stat().st_mtime for entry in os.scandir(APT_LISTS_DIR)
+             if entry.is_file() and entry.name != "lock"),
+            default=0,
+        )
+    except FileNotFoundError:
+        return 0
+
+
+def _is_apt_fresh(seconds: float) -> bool:
+    """Check whether APT package lists were updated in the last `seconds` seconds
+    and APT sources have not changed since then.
+    """
+    updated = max(_apt_lists_mtime(), store.get_state("apt_lists_update_time", 0))
+    return time.time() - updated <= seconds and store.get_state(
+        "apt_sources_digest"
+    ) == _apt_sources_digest()
+
+
+@contextlib.contextmanager
+def _file_lock(path: Path):
+    """Hold an exclusive lock (flock) of a file across processes.
+    """
+    import fcntl  # pylint: disable=C0415
+    with path.open("a") as fout:
+        fcntl.flock(fout, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fout, fcntl.LOCK_UN)
+
+
+@plan.step("package", record=False)
 def update_apt_source(prefix: str = "", yes: str = "--yes", seconds: float = 3600 * 12):
-    """Run apt-get update if necessary.
+    """Run apt-get update if APT package lists are stale (not updated in the last
+    `seconds` seconds per modification times of /var/lib/apt/lists)
+    or APT sources (sources.list*) have changed.
+    A file lock prevents xinstall processes from updating concurrently
+    and the freshness is checked again after acquiring the lock.
 
     :param prefix: The prefix command (e.g., sudo) to use.
     :param yes: The yes flag (-y, --yes or an empty string).
-    :param seconds: Do not run if this function has already been run `seconds` seconds ago.
+    :param seconds: The time-to-live (in seconds) of APT package lists.
     """
-    fmt = "%Y-%m-%d %H:%M:%S.%f"
-    key = "apt_source_update_time"
-    time = datetime.datetime.strptime(
-        SETTINGS.get(key, "2000-01-01 00:00:00.000000"), fmt
-    )
-    now = datetime.datetime.now()
-    if (now - time).seconds > seconds:
+    if _is_apt_fresh(seconds):
+        return
+    with _PKG_LOCK, _file_lock(APT_LOCK_FILE):
+        if _is_apt_fresh(seconds):
+            return
+        digest = _apt_sources_digest()
         run_cmd(f"{prefix} apt-get update {yes}")
-        SETTINGS[key] = now.strftime(fmt)
-        with open(SETTINGS_FILE, "w") as fout:
-            json.dump(SETTINGS, fout)
+        store.put_state("apt_lists_update_time", time.time())
+        store.put_state("apt_sources_digest", digest)
+
+
+def _apt_get(action: str, pkgs: List[str], prefix: str, yes: str) -> None:
+    if action == "install":
+        update_apt_source(prefix=prefix, yes=yes)
+    try:
+        run_cmd(f"{prefix} apt-get {action} {yes} {' '.join(pkgs)}")
+    finally:
+        invalidate_installed_packages()
+
+
+@plan.step("package")
+def apt_install(
+    pkgs: Union[str, Sequence[str]], prefix: str = "", yes: str = "--yes"
+) -> None:
+    """Install packages using apt-get (the APT source is updated if necessary).
+    Packages already installed are skipped.
+    When sub commands are run concurrently (xinstall run),
+    packages requested by them are installed in a single apt-get transaction.
+
+    :param pkgs: A (list of) package(s) to install.
+    :param prefix: The prefix command (e.g., sudo) to use.
+    :param yes: The yes flag (-y, --yes or an empty string).
+    """
+    if isinstance(pkgs, str):
+        pkgs = pkgs.split()
+    pkgs = _missing(pkgs, "dpkg")
+    if not pkgs:
+        return
+    coalesce.submit(
+        ("apt-get install", prefix, yes), pkgs,
+        lambda pkgs: _apt_get("install", pkgs, prefix, yes)
+    )
+
+
+@plan.step("package")
+def apt_purge(
+    pkgs: Union[str, Sequence[str]], prefix: str = "", yes: str = "--yes"
+) -> None:
+    """Purge packages using apt-get.
+    When sub commands are run concurrently (xinstall run),
+    packages requested by them are purged in a single apt-get transaction.
+
+    :param pkgs: A (list of) package(s) to purge.
+    :param prefix: The prefix command (e.g., sudo) to use.
+    :param yes: The yes flag (-y, --yes or an empty string).
+    """
+    if isinstance(pkgs, str):
+        pkgs = pkgs.split()
+    coalesce.submit(
+        ("apt-get purge", prefix, yes), pkgs,
+        lambda pkgs: _apt_get("purge", pkgs, prefix, yes)
+    )
+
+
+def _yum(action: str, pkgs: List[str], prefix: str, yes: str) -> None:
+    try:
+        run_cmd(f"{prefix} yum {action} {yes} {' '.join(pkgs)}")
+    finally:
+        invalidate_installed_packages()
+
+
+@plan.step("package")
+def yum_install(
+    pkgs: Union[str, Sequence[str]], prefix: str = "", yes: str = "--yes"
+) -> None:
+    """Install packages using yum.
+    Packages already installed are skipped.
+    When sub commands are run concurrently (xinstall run),
+    packages requested by them are installed in a single yum transaction.
+
+    :param pkgs: A (list of) package(s) to install.
+    :param prefix: The prefix command (e.g., sudo) to use.
+    :param yes: The yes flag (-y, --yes or an empty string).
+    """
+    if isinstance(pkgs, str):
+        pkgs = pkgs.split()
+    pkgs = _missing(pkgs, "rpm")
+    if not pkgs:
+        return
+    coalesce.submit(
+        ("yum install", prefix, yes), pkgs,
+        lambda pkgs: _yum("install", pkgs, prefix, yes)
+    )
+
+
+@plan.step("package")
+def yum_remove(
+    pkgs: Union[str, Sequence[str]], prefix: str = "", yes: str = "--yes"
+) -> None:
+    """Remove packages using yum.
+    When sub commands are run concurrently (xinstall run),
+    packages requested by them are removed in a single yum transaction.
+
+    :param pkgs: A (list of) package(s) to remove.
+    :param prefix: The prefix command (e.g., sudo) to use.
+    :param yes: The yes flag (-y, --yes or an empty string).
+    """
+    if isinstance(pkgs, str):
+        pkgs = pkgs.split()
+    coalesce.submit(
+        ("yum remove", prefix, yes), pkgs,
+        lambda pkgs: _yum("remove", pkgs, prefix, yes)
+    )
+
+
+def merge_requirements(reqs: Iterable[str]) -> List[str]:
+    """Merge requirements of the same project (and environment marker)
+    into one requirement with the union of extras and the intersection of specifiers.
+    A direct reference (name @ url) takes precedence over version specifiers.
+    Requirements which cannot be parsed (e.g., local paths) are kept as they are.
+
+    :param reqs: Requirements (e.g., "dask[complete]" or "mxnet<2.0.0").
+    :return: Merged requirements.
+    """
+    # pylint: disable=C0415
+    from packaging.requirements import Requirement, InvalidRequirement
+    from packaging.utils import canonicalize_name
+    merged = {}
+    others = []
+    for req in reqs:
+        try:
+            req = Requirement(req)
+        except InvalidRequirement:
+            if req not in others:
+                others.append(req)
+            continue
+        key = (canonicalize_name(req.name), str(req.marker or ""))
+        prev = merged.setdefault(key, req)
+        if prev is req:
+            continue
+        req.extras |= prev.extras
+        prev.extras = req.extras
+        if prev.url:
+            continue
+        if req.url:
+            merged[key] = req
+            continue
+        prev.specifier &= req.specifier
+    return [str(req) for req in merged.values()] + others
+
+
+def _pip_install(reqs: List[str], pip_install: str) -> None:
+    reqs = " ".join(shlex.quote(req) for req in merge_requirements(reqs))
+    run_cmd(f"{pip_install} {reqs}")
+
+
+@plan.step("pip")
+def pip_install(reqs: Union[str, Sequence[str]], pip_install: str) -> None:
+    """Install Python packages using pip.
+    When sub commands are run concurrently (xinstall run),
+    requirements of the same pip command (interpreter, --user and pip options)
+    are merged and installed by a single pip invocation.
+
+    :param reqs: A (list of) requirement(s) to install.
+    :param pip_install: The pip install command (e.g., args.pip_install)
+    including the prefix, --user and extra pip options.
+    """
+    if isinstance(reqs, str):
+        reqs = reqs.split()
+    pip_install = " ".join(pip_install.split())
+    coalesce.submit(
+        ("pip install", pip_install), reqs, lambda reqs: _pip_install(reqs, pip_install)
+    )
+
+
+@plan.step("download")
+def download(
+    urls: Union[str, Sequence[str]], path: Union[str, Path], checksum: str = ""
+) -> None:
+    """Download a file from (the fastest of) the specified URLs (e.g., mirrors).
+    Large files are fetched in segments in parallel
+    and downloaded files are verified and cached (see xinstall.fetch.download).
+
+    :param urls: A (list of) URL(s) of the file to download.
+    :param path: The path to save the downloaded file.
+    :param checksum: A checksum (<algorithm>:<hex>)
+        or the URL of a published checksum file (e.g., https://.../file.tgz.sha512).
+    """
+    from . import fetch  # pylint: disable=C0415
+    fetch.download(urls, path, checksum=checksum)
+
+
+@plan.step("download")
+def download_extract(
+    urls: Union[str, Sequence[str]],
+    dest: Union[str, Path],
+    checksum: str = "",
+    prefix: str = ""
+) -> None:
+    """Download a tarball from (the fastest of) the specified URLs
+    and extract it (into dest) while downloading (see xinstall.extract.extract).
+
+    :param urls: A (list of) URL(s) of the tarball.
+    :param dest: The directory to extract the tarball into.
+    :param checksum: A checksum (<algorithm>:<hex>)
+        or the URL of a published checksum file (e.g., https://.../file.tgz.sha512).
+    :param prefix: The prefix command (e.g., sudo) required to write into dest.
+        If specified, the tarball is extracted into a private temporary directory
+        which is then copied into dest using the prefix command.
+    """
+    from . import extract  # pylint: disable=C0415
+    if not prefix:
+        extract.extract(urls, dest, checksum=checksum)
+        return
+    with tempfile.TemporaryDirectory() as temp_dir:
+        extract.extract(urls, temp_dir, checksum=checksum)
+        run_cmd(f"{prefix} mkdir -p {dest} && {prefix} cp -R {temp_dir}/. {dest}")
 
 
 def _github_version(url) -> str:
-    url = f"{url}/releases/latest"
-    with urllib.request.urlopen(url) as resp:
-        return Path(resp.url).name
+    from . import http_client  # pylint: disable=C0415
+    # the latest release is redirected to its tag (without using the GitHub API)
+    resp = http_client.head(f"{url}/releases/latest", allow_redirects=True)
+    resp.raise_for_status()
+    return Path(resp.url).name
+
+
+def github_latest_tags(urls: Sequence[str],
+                       ttl: float = LATEST_TAG_TTL) -> Dict[str, str]:
+    """Get tags of the latest releases of GitHub repositories.
+    Tags resolved in the last `ttl` seconds are taken from the store
+    and the others are resolved concurrently
+    (and saved into the store unless planning).
+
+    :param urls: Root URLs of GitHub repositories.
+    :param ttl: The time-to-live (in seconds) of resolved tags.
+    :return: A dict mapping URLs to tags of their latest releases.
+    """
+    now = time.time()
+    tags = {}
+    for url in urls:
+        cached = store.get_state(f"github_latest_tag:{url}")
+        if cached and now - cached["time"] <= ttl:
+            tags[url] = cached["tag"]
+    stale = [url for url in urls if url not in tags]
+    if stale:
+        from concurrent.futures import ThreadPoolExecutor  # pylint: disable=C0415
+        with ThreadPoolExecutor(max_workers=min(8, len(stale))) as executor:
+            for url, tag in zip(stale, executor.map(_github_version, stale)):
+                tags[url] = tag
+                if not plan.is_planning():
+                    store.put_state(f"github_latest_tag:{url}", {"tag": tag, "time": now})
+    return tags
+
+
+def _wheelhouse() -> Path:
+    from . import fetch  # pylint: disable=C0415
+    return fetch.CACHE_DIR / "wheelhouse"
 
 
 def install_py_github(
-    url: str,
+    url: Union[str, Sequence[str]],
     user: bool = False,
     pip: str = "pip3",
     pip_option: str = "",
     extras: str = "",
     prefix: str = "",
 ) -> None:
-    """Automatically install the latest version of a Python package from its GitHub repository.
+    """Automatically install the latest versions of Python packages from GitHub.
+    Latest versions of repositories are resolved concurrently (see github_latest_tags)
+    and wheels are kept in a local wheelhouse so that pip installs them from disk.
 
-    :param url: The root URL of the GitHub repository.
+    :param url: The root URL(s) of the GitHub repository(ies).
     :param user: If True, install to user's local directory.
     This option is equivalant to 'pip install --user'.
     :param pip: The path (pip3 by default) to the pip executable.
     :param pip_option: Extra pip options.
-    :param extras: Extra components (separate by comma) of the package to install.
+    :param extras: Extra components (separate by comma) of the package(s) to install.
     :param prefix: Prefix (e.g., sudo, environment variable configuration, etc.) to the command.
     """
-    ver = _github_version(url)
-    ver_no_letter = re.sub("[a-zA-Z]", "", ver)
-    name = Path(url).name
-    url = f"{url}/releases/download/{ver}/{name}-{ver_no_letter}-py3-none-any.whl"
-    if extras:
-        url = f"'{name}[{extras}] @ {url}'"
-    cmd = f"{prefix} {pip} install {'--user' if user else ''} --upgrade {pip_option} {url}"
+    urls = [url] if isinstance(url, str) else list(url)
+    tags = github_latest_tags(urls)
+    wheelhouse = _wheelhouse()
+    reqs = []
+    for url_ in urls:
+        ver = tags[url_]
+        ver_no_letter = re.sub("[a-zA-Z]", "", ver)
+        name = Path(url_).name
+        wheel = f"{name}-{ver_no_letter}-py3-none-any.whl"
+        path = wheelhouse / wheel
+        if not path.is_file():
+            download(f"{url_}/releases/download/{ver}/{wheel}", path)
+        reqs.append(f"'{name}[{extras}] @ {path.as_uri()}'" if extras else str(path))
+    user_s = "--user" if user else ""
+    cmd = f"{prefix} {pip} install {user_s} --upgrade {pip_option} {' '.join(reqs)}"
     run_cmd(cmd)
 
 
@@ -249,8 +761,8 @@ def intellij_idea_plugin(version: str, url: str):
     plugins_dir.mkdir(mode=0o750, parents=True, exist_ok=True)
     file_dsptr, file = tempfile.mkstemp(suffix=".zip")
     os.close(file_dsptr)
-    cmd = f"curl -sSL {url} -O {file} && unzip {file} -d {plugins_dir}"
-    run_cmd(cmd)
+    download(url, file)
+    run_cmd(f"unzip {file} -d {plugins_dir}")
 
 
 def option_version(subparser, help: str = ""):
@@ -361,7 +873,8 @@ def add_subparser(
     :param func: The function corresponding to the sub parser.
     :param aliases: A list of aliases of the sub command.
     :type aliases: Sequence, optional
-    :param help_: Help doc of the sub command. If None, then the help doc of func is used.
+    :param help_: Help doc of the sub command.
+        If None, then the summary of the help doc of func is used.
     :type help_: Union[str, None], optional
     :param add_argument: A callable object to add aditional arguments
     (in addition to those default arguments), defaults to None
@@ -370,7 +883,9 @@ def add_subparser(
     """
     sub_cmd = re.sub(r"(\s+)|-", "_", name.lower())
     aliases = [alias for alias in aliases if alias != sub_cmd]
-    help_ = help_ if help_ else func.__doc__
+    if not help_:
+        from .registry import summarize  # pylint: disable=C0415
+        help_ = summarize(func.__doc__)
     subparser = subparsers.add_parser(sub_cmd, aliases=aliases, help=help_)
     subparser.add_argument(
         "-i", "--install", dest="install", action="store_true", help=f"install {name}."
@@ -402,6 +917,7 @@ def add_subparser(
     return subparser
 
 
+@plan.step("edit")
 def update_file(
     path: Union[str, Path],
     regex: List[Tuple[str, str]] = None,
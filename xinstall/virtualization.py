@@ -10,7 +10,11 @@ from .utils import (
     is_ubuntu_debian,
     is_win,
     update_apt_source,
+    apt_install,
+    apt_purge,
     brew_install_safe,
+    yum_install,
+    yum_remove,
 )
 
 
@@ -19,15 +23,14 @@ def virtualbox(args) -> None:
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(f"{args.prefix} apt-get install {args.yes_s} virtualbox-qt", )
+            apt_install(["virtualbox-qt"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
-            run_cmd("brew cask install virtualbox virtualbox-extension-pack")
+            brew_install_safe(["virtualbox", "virtualbox-extension-pack"], cask=True)
         elif is_centos_series():
             pass
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} virtualbox-qt", )
+            apt_purge(["virtualbox-qt"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew cask uninstall virtualbox virtualbox-extension-pack", )
         elif is_centos_series():
@@ -45,9 +48,8 @@ def docker(args):
     """
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix)
-            run_cmd(
-                f"{args.prefix} apt-get install {args.yes_s} docker.io docker-compose"
+            apt_install(
+                ["docker.io", "docker-compose"], prefix=args.prefix, yes=args.yes_s
             )
         elif is_macos():
             brew_install_safe([
@@ -56,7 +58,9 @@ def docker(args):
                 "bash-completion@2",
             ])
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum install docker docker-compose")
+            yum_install(
+                ["docker", "docker-compose"], prefix=args.prefix, yes=args.yes_s
+            )
     if args.config:
         if args.user_to_docker:
             if is_ubuntu_debian():
@@ -70,13 +74,15 @@ def docker(args):
                 run_cmd(cmd)
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} docker docker-compose", )
+            apt_purge(["docker", "docker-compose"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd(
                 "brew uninstall docker docker-completion docker-compose docker-compose-completion",
             )
         elif is_centos_series():
-            run_cmd(f"{args.prefix} yum remove docker docker-compose")
+            yum_remove(
+                ["docker", "docker-compose"], prefix=args.prefix, yes=args.yes_s
+            )
 
 
 def _docker_args(subparser):
@@ -111,15 +117,14 @@ def kubernetes(args):
                 f'''echo "deb https://apt.kubernetes.io/ kubernetes-xenial main" \
                     | {args.prefix} tee -a /etc/apt/sources.list.d/kubernetes.list''',
             )
-            update_apt_source(prefix=args.prefix, seconds=-1E10)
-            run_cmd(f"{args.prefix} apt-get install {args.yes_s} kubectl")
+            apt_install(["kubectl"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             brew_install_safe(["kubernetes-cli"])
         elif is_centos_series():
             pass
     if args.uninstall:
         if is_ubuntu_debian():
-            run_cmd(f"{args.prefix} apt-get purge {args.yes_s} kubectl")
+            apt_purge(["kubectl"], prefix=args.prefix, yes=args.yes_s)
         elif is_macos():
             run_cmd("brew uninstall kubectl")
         elif is_centos_series():
@@ -143,14 +148,12 @@ def _minikube_linux(args):
 def minikube(args) -> None:
     """Install MiniKube.
     """
-    virtualbox(args)
-    kubernetes(args)
     if args.install:
         if is_ubuntu_debian():
-            update_apt_source(prefix=args.prefix, seconds=-1E10)
+            update_apt_source(prefix=args.prefix, yes=args.yes_s)
             _minikube_linux(args)
         elif is_macos():
-            run_cmd("brew install minikube")
+            brew_install_safe(["minikube"])
         elif is_centos_series():
             _minikube_linux(args)
         elif is_win():
@@ -179,8 +182,7 @@ def multipass(args) -> None:
             cmd = f"{args.prefix} snap install multipass --classic"
             run_cmd(cmd)
         elif is_macos():
-            cmd = "brew cask install multipass"
-            run_cmd(cmd)
+            brew_install_safe(["multipass"], cask=True)
         elif is_centos_series():
             pass
         elif is_win():